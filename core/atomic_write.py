@@ -0,0 +1,64 @@
+"""Replace files atomically without changing who owns them.
+
+Sets, backups and presets are read by Move while the server edits them, so
+every write goes to a temporary file created with :func:`tempfile.mkstemp`
+next to the destination, is flushed to disk and then moved into place with
+:func:`os.replace`.  The unique name keeps concurrent writers (request
+threads share one pid) from clobbering each other's temporary file.
+
+An existing destination keeps its mode and owner; the server may run as
+root, and files it replaces must stay accessible to the Move user.  New files
+get :data:`NEW_FILE_MODE`.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import IO, Iterator, Union
+
+NEW_FILE_MODE = 0o644
+
+
+def _copy_metadata(path: str, tmp_path: str) -> None:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        os.chmod(tmp_path, NEW_FILE_MODE)
+        return
+    os.chmod(tmp_path, st.st_mode & 0o7777)
+    try:
+        os.chown(tmp_path, st.st_uid, st.st_gid)
+    except PermissionError:
+        # Only a privileged server can give the file back to its owner
+        pass
+
+
+@contextmanager
+def atomic_open(path: str, mode: str = "w", **kwargs) -> Iterator[IO]:
+    """Open a temporary file that replaces ``path`` when the block succeeds.
+
+    ``mode`` and ``kwargs`` are passed to :func:`open`.  If the block raises,
+    ``path`` is left untouched and the temporary file is removed.
+    """
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        with open(fd, mode, **kwargs) as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        _copy_metadata(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def write_atomic(path: str, data: Union[str, bytes], **kwargs) -> None:
+    """Atomically replace ``path`` with ``data`` (text or bytes)."""
+    with atomic_open(path, "wb" if isinstance(data, bytes) else "w", **kwargs) as f:
+        f.write(data)
@@ -0,0 +1,264 @@
+"""Restore many Move sets in one job.
+
+A batch is a list of uploaded ``.ablbundle``/``.abl`` files (or a single
+``.zip`` holding them) plus a pad/color plan.  The plan is validated once
+against the set registry, the sets are restored by a small worker pool and
+progress is reported through an ``emit(event, data)`` callback so the
+webserver can forward it over Socket.IO.  The Move library is refreshed a
+single time once every set has been placed.
+
+The job itself runs on a task started by a *runner*: any object with
+``start_background_task(target)`` and ``sleep(seconds)``, such as the
+webserver's ``SocketIO`` instance, so it cooperates with the configured async
+mode.  Restores happen on a thread pool that the job polls between sleeps.
+Finished jobs are forgotten after :data:`JOB_RETENTION` seconds.
+"""
+
+import os
+import time
+import uuid
+import shutil
+import logging
+import zipfile
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from core.set_registry import set_registry
+from core.restore_handler import restore_ablbundle, restore_abl, _safe_member_path
+from core.refresh_handler import refresh_library
+
+logger = logging.getLogger(__name__)
+
+SET_EXTENSIONS = (".ablbundle", ".abl")
+MAX_WORKERS = 4
+# Seconds between checks on the worker pool
+POLL_INTERVAL = 0.1
+# Seconds a finished job's status stays available
+JOB_RETENTION = 600
+
+_jobs: Dict[str, "BatchRestoreJob"] = {}
+_jobs_lock = threading.Lock()
+
+
+class _Threads:
+    """Default runner: plain daemon threads and ``time.sleep``."""
+
+    @staticmethod
+    def start_background_task(target, *args, **kwargs) -> threading.Thread:
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+        thread.start()
+        return thread
+
+    @staticmethod
+    def sleep(seconds: float) -> None:
+        time.sleep(seconds)
+
+
+def _prune_jobs() -> None:
+    """Forget jobs that finished more than ``JOB_RETENTION`` seconds ago.
+
+    Must be called with ``_jobs_lock`` held.
+    """
+    cutoff = time.monotonic() - JOB_RETENTION
+    for job_id in [j for j, job in _jobs.items() if job.finished_at is not None and job.finished_at < cutoff]:
+        del _jobs[job_id]
+
+
+def expand_uploads(paths: List[str], work_dir: str) -> List[str]:
+    """Return the set files contained in ``paths``.
+
+    ``.zip`` archives are unpacked into ``work_dir`` and any set files inside
+    them are returned in archive order; other files are passed through.
+    Unsupported files are ignored.
+    """
+    files = []
+    for path in paths:
+        if path.lower().endswith(".zip"):
+            with zipfile.ZipFile(path, "r") as zf:
+                for name in zf.namelist():
+                    if name.endswith("/") or not name.lower().endswith(SET_EXTENSIONS):
+                        continue
+                    dest = _safe_member_path(work_dir, name)
+                    os.makedirs(os.path.dirname(dest), exist_ok=True)
+                    with zf.open(name) as src, open(dest, "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+                    files.append(dest)
+        elif path.lower().endswith(SET_EXTENSIONS):
+            files.append(path)
+    return files
+
+
+def build_plan(
+    files: List[str],
+    entries: List[Dict[str, Any]],
+    free_ids: List[int],
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """Match uploaded files to pads and validate the whole plan at once.
+
+    ``entries`` is a list of ``{"file": name, "pad": 1-32, "color": 1-25}``
+    dicts keyed by file basename.  Files without an entry are assigned the
+    lowest remaining free pad with color 1.
+
+    Returns:
+        tuple: (plan, error) where ``plan`` is a list of
+        ``{"file", "path", "pad", "color"}`` dicts using 0-based pads.
+    """
+    by_name = {os.path.basename(f): f for f in files}
+    if len(by_name) != len(files):
+        return None, "Duplicate file names in upload."
+
+    free = set(free_ids)
+    taken = set()
+    plan = []
+    for entry in entries:
+        name = os.path.basename(str(entry.get("file", "")))
+        if name not in by_name:
+            return None, f"Plan references unknown file '{name}'."
+        try:
+            pad = int(entry.get("pad")) - 1
+            color = int(entry.get("color", 1))
+        except (TypeError, ValueError):
+            return None, f"Invalid pad or color for '{name}'."
+        if not (0 <= pad <= 31):
+            return None, f"Invalid pad for '{name}'. Must be between 1 and 32."
+        if not (1 <= color <= 25):
+            return None, f"Invalid color for '{name}'. Must be between 1 and 25."
+        if pad not in free:
+            return None, f"Pad {pad + 1} is already in use."
+        if pad in taken:
+            return None, f"Pad {pad + 1} is assigned more than once."
+        taken.add(pad)
+        plan.append({"file": name, "path": by_name.pop(name), "pad": pad, "color": color})
+
+    remaining = sorted(free - taken)
+    if len(by_name) > len(remaining):
+        return None, f"Not enough free pads for {len(files)} sets."
+    for (name, path), pad in zip(by_name.items(), remaining):
+        plan.append({"file": name, "path": path, "pad": pad, "color": 1})
+    return plan, None
+
+
+def _restore_one(item: Dict[str, Any], free_ids: List[int]) -> Dict[str, Any]:
+    restore = restore_ablbundle if item["path"].lower().endswith(".ablbundle") else restore_abl
+    try:
+        return restore(item["path"], item["pad"], item["color"], free_ids=free_ids)
+    except Exception as e:
+        return {"success": False, "message": f"Error restoring {item['file']}: {e}"}
+
+
+class BatchRestoreJob:
+    """Background job restoring a validated plan with a worker pool."""
+
+    def __init__(
+        self,
+        plan: List[Dict[str, Any]],
+        emit: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        work_dir: Optional[str] = None,
+        max_workers: int = MAX_WORKERS,
+        runner: Any = None,
+    ):
+        self.job_id = uuid.uuid4().hex
+        self.plan = plan
+        self.emit = emit
+        self.work_dir = work_dir
+        self.max_workers = max_workers
+        self.status = "pending"
+        self.results: List[Dict[str, Any]] = []
+        self.refresh_message: Optional[str] = None
+        self.runner = runner or _Threads
+        self.finished_at: Optional[float] = None
+        self._done = threading.Event()
+
+    def _emit(self, event: str, data: Dict[str, Any]) -> None:
+        if self.emit is None:
+            return
+        try:
+            self.emit(event, data)
+        except Exception as e:
+            logger.warning("Failed to emit %s for job %s: %s", event, self.job_id, e)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "total": len(self.plan),
+            "completed": len(self.results),
+            "results": list(self.results),
+            "refresh_message": self.refresh_message,
+        }
+
+    def start(self) -> "BatchRestoreJob":
+        """Register the job and run it as a background task of the runner."""
+        with _jobs_lock:
+            _prune_jobs()
+            _jobs[self.job_id] = self
+        self.runner.start_background_task(self.run)
+        return self
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until the job finished; returns whether it did."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not self._done.is_set():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            # Yield through the runner so a cooperative task can progress
+            self.runner.sleep(POLL_INTERVAL)
+        return True
+
+    def _result(self, future: Future) -> Any:
+        """Wait for ``future`` without blocking the runner."""
+        while not future.done():
+            self.runner.sleep(POLL_INTERVAL)
+        return future.result()
+
+    def run(self) -> None:
+        """Restore every planned set, then refresh the library once."""
+        self.status = "running"
+        total = len(self.plan)
+        # Every planned pad was free when the plan was validated, and the plan
+        # never reuses a pad, so workers can skip re-scanning the Sets folder.
+        free_ids = [item["pad"] for item in self.plan]
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                pending = {pool.submit(_restore_one, item, free_ids): item for item in self.plan}
+                while pending:
+                    done, _ = wait(pending, timeout=0)
+                    if not done:
+                        self.runner.sleep(POLL_INTERVAL)
+                        continue
+                    for future in done:
+                        item = pending.pop(future)
+                        result = future.result()
+                        entry = {
+                            "file": item["file"],
+                            "pad": item["pad"] + 1,
+                            "color": item["color"],
+                            "success": bool(result.get("success")),
+                            "message": result.get("message", ""),
+                        }
+                        self.results.append(entry)
+                        self._emit("restore_progress", dict(
+                            entry, job_id=self.job_id, completed=len(self.results), total=total
+                        ))
+                if any(r["success"] for r in self.results):
+                    _, self.refresh_message = self._result(pool.submit(refresh_library))
+            set_registry.invalidate()
+            failed = sum(1 for r in self.results if not r["success"])
+            self.status = "completed" if not failed else "completed_with_errors"
+        except Exception as e:
+            logger.error("Batch restore %s failed: %s", self.job_id, e)
+            self.status = "failed"
+        finally:
+            if self.work_dir:
+                shutil.rmtree(self.work_dir, ignore_errors=True)
+            self._emit("restore_complete", self.to_dict())
+            self.finished_at = time.monotonic()
+            self._done.set()
+
+
+def get_job(job_id: str) -> Optional[BatchRestoreJob]:
+    """Return the batch job with ``job_id`` or ``None``."""
+    with _jobs_lock:
+        _prune_jobs()
+        return _jobs.get(job_id)
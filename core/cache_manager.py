@@ -1,9 +1,18 @@
-"""Simple in-memory cache for library scans."""
+"""Simple in-memory cache for library scans.
 
+Entries may name the files or directories they were built from
+(``set_cache(key, value, paths=[...])``).  :func:`invalidate_paths` drops
+just the entries depending on changed paths, which lets
+:mod:`core.library_watcher` keep the cache warm across library refreshes.
+"""
+
+import os
 from threading import Lock
 import logging
 
 _cache = {}
+# key -> absolute paths the entry was built from
+_paths = {}
 _lock = Lock()
 logger = logging.getLogger(__name__)
 
@@ -19,24 +28,93 @@ def get_cache(key):
     return value
 
 
-def set_cache(key, value):
-    """Store value in cache."""
+def set_cache(key, value, paths=None):
+    """Store value in cache.
+
+    ``paths`` are the files or directories ``value`` was derived from; a
+    change at or below any of them invalidates the entry.
+    """
     with _lock:
         _cache[key] = value
+        if paths:
+            _paths[key] = tuple(os.path.abspath(p) for p in paths)
+        else:
+            _paths.pop(key, None)
     logger.debug("Updated cache for %s", key)
 
 
-def invalidate_cache(key=None):
+def invalidate_cache(key=None, prefix=None):
     """Invalidate the cache.
 
-    If ``key`` is ``None`` all cached entries are cleared.
+    If ``prefix`` is given all entries whose key starts with it are dropped.
+    Otherwise, if ``key`` is ``None`` all cached entries are cleared.
     """
     with _lock:
-        if key is None:
+        if prefix is not None:
+            for k in [k for k in _cache if k.startswith(prefix)]:
+                del _cache[k]
+                _paths.pop(k, None)
+        elif key is None:
             _cache.clear()
+            _paths.clear()
         else:
             _cache.pop(key, None)
-    if key is None:
+            _paths.pop(key, None)
+    if prefix is not None:
+        logger.debug("Invalidated cache entries with prefix %s", prefix)
+    elif key is None:
         logger.debug("Cleared entire cache")
     else:
         logger.debug("Invalidated cache for %s", key)
+
+
+def _within(path, root):
+    return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+
+def _related(a, b):
+    """Return whether ``a`` and ``b`` are the same path or one contains the other."""
+    return _within(a, b) or _within(b, a)
+
+
+def invalidate_paths(changed):
+    """Drop entries built from any of the ``changed`` paths.
+
+    An entry is affected when a changed path is one of its paths, lies
+    below one of them, or is a directory containing one (a removed or
+    renamed folder).  Returns the dropped keys.
+    """
+    changed = [os.path.abspath(p) for p in changed]
+    if not changed:
+        return []
+    with _lock:
+        dropped = [
+            k for k, deps in _paths.items()
+            if any(_related(c, d) for d in deps for c in changed)
+        ]
+        for k in dropped:
+            _cache.pop(k, None)
+            del _paths[k]
+    if dropped:
+        logger.debug("Invalidated %d cache entries for changed paths", len(dropped))
+    return dropped
+
+
+def invalidate_unwatched(roots):
+    """Drop every entry not built solely from paths below ``roots``.
+
+    Used on a library refresh while a watcher keeps ``roots`` up to date:
+    entries outside them, or without recorded paths, are cleared as before.
+    """
+    roots = [os.path.abspath(r) for r in roots]
+    with _lock:
+        dropped = [
+            k for k in _cache
+            if not _paths.get(k)
+            or not all(any(_within(d, r) for r in roots) for d in _paths[k])
+        ]
+        for k in dropped:
+            del _cache[k]
+            _paths.pop(k, None)
+    logger.debug("Invalidated %d cache entries outside watched roots", len(dropped))
+    return dropped
@@ -0,0 +1,288 @@
+"""Server side note transforms for Set Inspector clips.
+
+A clip's notes are loaded into a NumPy structured array (one row per note)
+and a chain of transforms is applied to whole columns at once, so a chain
+costs the same handful of array operations whether a clip has ten notes or
+ten thousand.  Each row remembers the index of the note it came from, which
+keeps keys the engine does not touch (e.g. ``automations``) when the notes
+are turned back into dicts.
+
+A chain is a list of operations applied in order:
+
+* ``{"op": "transpose", "semitones": 12}``
+* ``{"op": "quantize", "grid": 0.25, "strength": 1.0}`` – grid in beats
+* ``{"op": "humanize", "timing": 0.02, "velocity": 8, "seed": 1}``
+* ``{"op": "velocity", "scale": 1.2, "offset": 0}``
+* ``{"op": "reverse"}`` – mirror notes and envelopes within the clip region
+* ``{"op": "stretch", "factor": 2.0}`` – scale times, region and envelopes
+
+:func:`transform_clips` runs a chain over one clip, every clip of a track or
+every clip of the set and writes the set once.
+"""
+
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from core.set_inspector_handler import _write_song, track_param_map
+from core.song_cache import clip_for_update, load_song, song_version
+
+logger = logging.getLogger(__name__)
+
+NOTE_DTYPE = np.dtype([
+    ("idx", np.int32),
+    ("noteNumber", np.int16),
+    ("startTime", np.float64),
+    ("duration", np.float64),
+    ("velocity", np.float64),
+])
+
+
+class _ClipState:
+    """Notes of one clip plus the parts of the clip transforms may change."""
+
+    def __init__(self, clip: Dict[str, Any]):
+        self.source = clip.get("notes", [])
+        self.notes = notes_to_array(self.source)
+        region = clip.get("region", {})
+        loop = region.get("loop", {})
+        self.region_start = float(region.get("start", 0.0))
+        self.region_end = float(region.get("end", 4.0))
+        self.loop_start = float(loop.get("start", self.region_start))
+        self.loop_end = float(loop.get("end", self.region_end))
+        self.envelopes = clip.get("envelopes", [])
+        self.region_changed = False
+        self.envelopes_changed = False
+
+
+def notes_to_array(notes: List[Dict[str, Any]]) -> np.ndarray:
+    """Return ``notes`` as a :data:`NOTE_DTYPE` array."""
+    arr = np.empty(len(notes), dtype=NOTE_DTYPE)
+    arr["idx"] = np.arange(len(notes))
+    arr["noteNumber"] = [n.get("noteNumber", 60) for n in notes]
+    arr["startTime"] = [n.get("startTime", 0.0) for n in notes]
+    arr["duration"] = [n.get("duration", 0.0) for n in notes]
+    arr["velocity"] = [n.get("velocity", 100.0) for n in notes]
+    return arr
+
+
+def array_to_notes(arr: np.ndarray, source: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Turn rows of ``arr`` back into note dicts based on ``source``."""
+    notes = []
+    for idx, pitch, start, duration, velocity in arr.tolist():
+        note = dict(source[idx])
+        note["noteNumber"] = pitch
+        note["startTime"] = start
+        note["duration"] = duration
+        note["velocity"] = velocity
+        notes.append(note)
+    return notes
+
+
+def truncate_overlaps(arr: np.ndarray) -> np.ndarray:
+    """Vectorized :func:`core.set_inspector_handler._truncate_overlap_notes`.
+
+    Per pitch, a note that runs into the next one is shortened to end where
+    the next starts and dropped if nothing is left.  Notes keep their order.
+    """
+    if len(arr) == 0:
+        return arr
+    arr = arr.copy()
+    order = np.lexsort((np.arange(len(arr)), arr["startTime"], arr["noteNumber"]))
+    pitch = arr["noteNumber"][order]
+    start = arr["startTime"][order]
+    duration = arr["duration"][order]
+    same_pitch = pitch[:-1] == pitch[1:]
+    overlap = same_pitch & (start[:-1] + duration[:-1] > start[1:])
+    duration[:-1] = np.where(overlap, start[1:] - start[:-1], duration[:-1])
+    arr["duration"][order] = duration
+    return arr[arr["duration"] > 0]
+
+
+def _number(op: Dict[str, Any], key: str, default: Optional[float] = None) -> float:
+    value = op.get(key, default)
+    if value is None:
+        raise ValueError(f"{op.get('op')} needs '{key}'")
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid {key} for {op.get('op')}: {value!r}")
+    if not np.isfinite(value):
+        raise ValueError(f"Invalid {key} for {op.get('op')}: {value!r}")
+    return value
+
+
+def _transpose(state: _ClipState, op: Dict[str, Any]) -> None:
+    shift = int(_number(op, "semitones"))
+    state.notes["noteNumber"] = np.clip(state.notes["noteNumber"].astype(np.int32) + shift, 0, 127)
+
+
+def _quantize(state: _ClipState, op: Dict[str, Any]) -> None:
+    grid = _number(op, "grid")
+    strength = _number(op, "strength", 1.0)
+    if grid <= 0:
+        raise ValueError("quantize grid must be positive")
+    start = state.notes["startTime"]
+    state.notes["startTime"] = start + (np.round(start / grid) * grid - start) * strength
+
+
+def _humanize(state: _ClipState, op: Dict[str, Any]) -> None:
+    timing = abs(_number(op, "timing", 0.0))
+    velocity = abs(_number(op, "velocity", 0.0))
+    seed = op.get("seed")
+    rng = np.random.default_rng(int(seed) if seed is not None else None)
+    n = len(state.notes)
+    if timing:
+        start = state.notes["startTime"] + rng.uniform(-timing, timing, n)
+        state.notes["startTime"] = np.maximum(start, state.region_start)
+    if velocity:
+        vel = state.notes["velocity"] + rng.uniform(-velocity, velocity, n)
+        state.notes["velocity"] = np.clip(np.round(vel), 1, 127)
+
+
+def _velocity(state: _ClipState, op: Dict[str, Any]) -> None:
+    scale = _number(op, "scale", 1.0)
+    offset = _number(op, "offset", 0.0)
+    state.notes["velocity"] = np.clip(state.notes["velocity"] * scale + offset, 1, 127)
+
+
+def _reverse(state: _ClipState, op: Dict[str, Any]) -> None:
+    edge = state.region_start + state.region_end
+    state.notes["startTime"] = edge - (state.notes["startTime"] + state.notes["duration"])
+    envelopes = []
+    for env in state.envelopes:
+        points = [dict(bp, time=edge - bp.get("time", 0.0)) for bp in env.get("breakpoints", [])]
+        envelopes.append(dict(env, breakpoints=points[::-1]))
+    state.envelopes = envelopes
+    state.envelopes_changed = True
+
+
+def _stretch(state: _ClipState, op: Dict[str, Any]) -> None:
+    factor = _number(op, "factor")
+    if factor <= 0:
+        raise ValueError("stretch factor must be positive")
+    origin = state.region_start
+    state.notes["startTime"] = origin + (state.notes["startTime"] - origin) * factor
+    state.notes["duration"] = state.notes["duration"] * factor
+    state.region_end = origin + (state.region_end - origin) * factor
+    state.loop_start = origin + (state.loop_start - origin) * factor
+    state.loop_end = origin + (state.loop_end - origin) * factor
+    state.region_changed = True
+    envelopes = []
+    for env in state.envelopes:
+        points = [
+            dict(bp, time=origin + (bp.get("time", 0.0) - origin) * factor)
+            for bp in env.get("breakpoints", [])
+        ]
+        envelopes.append(dict(env, breakpoints=points))
+    state.envelopes = envelopes
+    state.envelopes_changed = True
+
+
+TRANSFORMS: Dict[str, Callable[[_ClipState, Dict[str, Any]], None]] = {
+    "transpose": _transpose,
+    "quantize": _quantize,
+    "humanize": _humanize,
+    "velocity": _velocity,
+    "reverse": _reverse,
+    "stretch": _stretch,
+}
+
+
+def validate_chain(chain: Any) -> Optional[str]:
+    """Return an error message if ``chain`` is not a usable transform chain."""
+    if not isinstance(chain, list) or not chain:
+        return "chain must be a non-empty list"
+    for op in chain:
+        if not isinstance(op, dict) or op.get("op") not in TRANSFORMS:
+            name = op.get("op") if isinstance(op, dict) else op
+            return f"Unknown transform: {name}"
+    return None
+
+
+def apply_chain(clip: Dict[str, Any], chain: List[Dict[str, Any]], drum: bool = False) -> None:
+    """Apply ``chain`` to ``clip`` in place, replacing (not mutating) its values."""
+    state = _ClipState(clip)
+    for op in chain:
+        TRANSFORMS[op["op"]](state, op)
+    notes = state.notes
+    # Nothing may start before the clip or run with a zero length
+    notes["startTime"] = np.maximum(notes["startTime"], state.region_start)
+    if drum:
+        notes = truncate_overlaps(notes)
+    clip["notes"] = array_to_notes(notes[notes["duration"] > 0], state.source)
+    if state.envelopes_changed:
+        clip["envelopes"] = state.envelopes
+    if state.region_changed:
+        region = dict(clip.get("region", {}))
+        region["end"] = state.region_end
+        region["loop"] = dict(region.get("loop", {}), start=state.loop_start, end=state.loop_end)
+        clip["region"] = region
+
+
+def _targets(song: Dict[str, Any], track: Optional[int], clip: Optional[int]) -> List[Tuple[int, int]]:
+    tracks = song.get("tracks", [])
+    if clip is not None and track is None:
+        raise ValueError("clip needs a track")
+    if track is not None and not (0 <= track < len(tracks)):
+        raise ValueError(f"Invalid track {track}")
+    targets = []
+    for ti, track_obj in enumerate(tracks):
+        if track is not None and ti != track:
+            continue
+        for ci, slot in enumerate(track_obj.get("clipSlots", [])):
+            if (clip is None or ci == clip) and slot.get("clip"):
+                targets.append((ti, ci))
+    if clip is not None and not targets:
+        raise ValueError(f"No clip at {track}:{clip}")
+    return targets
+
+
+def transform_clips(
+    set_path: str,
+    chain: List[Dict[str, Any]],
+    track: Optional[int] = None,
+    clip: Optional[int] = None,
+    version: Optional[str] = None,
+    defer: bool = False,
+) -> Dict[str, Any]:
+    """Run ``chain`` over one clip, one track (``clip=None``) or the whole set.
+
+    The set is written once however many clips change.  ``version`` and
+    ``defer`` behave as in :func:`core.set_inspector_handler.patch_clip`.
+    """
+    error = validate_chain(chain)
+    if error:
+        return {"success": False, "message": error}
+    try:
+        current = song_version(set_path)
+        if version is not None and version != current:
+            return {
+                "success": False,
+                "conflict": True,
+                "message": "Set was modified elsewhere; reload the clip",
+                "version": current,
+            }
+        song = load_song(set_path)
+        targets = _targets(song, track, clip)
+        if not targets:
+            return {"success": False, "message": "No clips to transform"}
+        changed = []
+        for ti, ci in targets:
+            song, track_obj, clip_obj = clip_for_update(song, ti, ci)
+            apply_chain(clip_obj, chain, drum=track_param_map(set_path, ti, track_obj.get("devices", []))["drum"])
+            changed.append({"track": ti, "clip": ci, "notes": len(clip_obj["notes"])})
+
+        _write_song(set_path, song, defer)
+    except ValueError as e:
+        return {"success": False, "message": str(e)}
+    except Exception as e:
+        logger.error("Failed to transform clips of %s: %s", set_path, e)
+        return {"success": False, "message": f"Failed to transform clips: {e}"}
+    return {
+        "success": True,
+        "message": f"Transformed {len(changed)} clip{'s' if len(changed) != 1 else ''}",
+        "clips": changed,
+        "version": song_version(set_path),
+    }
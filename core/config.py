@@ -5,6 +5,8 @@ sets and samples on the device. It also defines the valid numeric ranges
 accepted from users when restoring a set.  All ranges are inclusive.
 """
 
+import os
+
 # Path where Move sets are stored.  Each restored set is placed in a
 # unique UUID-named folder beneath this directory.
 MSETS_DIRECTORY = "/data/UserData/UserLibrary/Sets"
@@ -16,6 +18,9 @@ MSET_SAMPLE_PATH = "/data/UserData/UserLibrary/Samples"
 # Directory for samples placed when replacing Melodic Sampler presets.
 MELODIC_SAMPLER_SAMPLE_DIR = "/data/UserData/UserLibrary/Samples/melodicSampler"
 
+# Track and drum rack presets saved from Move or this server.
+TRACK_PRESETS_DIRECTORY = "/data/UserData/UserLibrary/Track Presets"
+
 # Base URI prefix inserted into Song.abl files to reference set contents.
 MSET_ABLETON_URI = "ableton:/user-library/Sets"
 
@@ -24,3 +29,10 @@ MSET_INDEX_RANGE = (0, 31)
 
 # Inclusive range of valid color IDs used by Move's UI (1–26).
 MSET_COLOR_RANGE = (1, 26)
+
+# SQLite databases of set contents (library search) and of preset files.
+# They live next to the server rather than in Move's library so Move never
+# sees them.
+INDEX_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache")
+SET_INDEX_PATH = os.path.join(INDEX_DIRECTORY, "set_index.sqlite3")
+PRESET_INDEX_PATH = os.path.join(INDEX_DIRECTORY, "preset_index.sqlite3")
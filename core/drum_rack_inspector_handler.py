@@ -4,6 +4,7 @@ import json
 import urllib.parse
 import logging
 from core.cache_manager import get_cache, set_cache
+from core.preset_index import preset_index
 
 logger = logging.getLogger(__name__)
 
@@ -175,7 +176,7 @@ def get_drum_cell_samples(preset_path):
         }
 
 def scan_for_drum_rack_presets():
-    """Scan ``Track Presets`` for drum rack presets with caching."""
+    """Scan ``Track Presets`` for drum rack presets using the preset index."""
     cache_key = "drum_rack_presets"
     cached = get_cache(cache_key)
     if cached is not None:
@@ -197,39 +198,13 @@ def scan_for_drum_rack_presets():
                 'presets': []
             }
 
-        # Recursively scan all preset files (.ablpreset or .json)
-        for root, _, files in os.walk(presets_dir):
-            for filename in files:
-                lower = filename.lower()
-                if lower.endswith('.ablpreset') or lower.endswith('.json'):
-                    filepath = os.path.join(root, filename)
-                    try:
-                        with open(filepath, 'r') as f:
-                            preset_data = json.load(f)
-                            
-                        # Function to recursively search for drumRack devices
-                        def has_drum_rack(data):
-                            if isinstance(data, dict):
-                                if data.get('kind') == 'drumRack':
-                                    return True
-                                return any(has_drum_rack(v) for v in data.values())
-                            elif isinstance(data, list):
-                                return any(has_drum_rack(item) for item in data)
-                            return False
-
-                        # If preset contains a drumRack, add it to our list
-                        if has_drum_rack(preset_data):
-                            preset_name = os.path.splitext(filename)[0]
-                            drum_rack_presets.append({
-                                'name': preset_name,
-                                'path': filepath
-                            })
-
-                    except Exception as e:
-                        logger.warning("Could not parse preset %s: %s", filename, e)
-                        continue
+        for filepath, _ in preset_index.find(presets_dir, ("drumRack",)):
+            drum_rack_presets.append({
+                'name': os.path.splitext(os.path.basename(filepath))[0],
+                'path': filepath
+            })
 
-        set_cache(cache_key, drum_rack_presets)
+        set_cache(cache_key, drum_rack_presets, paths=(presets_dir,))
         return {
             "success": True,
             "message": f"Found {len(drum_rack_presets)} drum rack presets",
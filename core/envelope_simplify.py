@@ -0,0 +1,121 @@
+"""Reduce the breakpoints of clip automation envelopes.
+
+Drawing automation in the clip editor produces a breakpoint every few
+pixels.  :func:`simplify_breakpoints` runs Ramer–Douglas–Peucker over a
+breakpoint list using the *value* error: a point is dropped only if linear
+interpolation between the points kept around it stays within ``tolerance`` of
+its value.  Both curves are piecewise linear, so the simplified envelope is
+within ``tolerance`` of the drawn one everywhere, not just at the removed
+points.
+
+Steps (two breakpoints sharing a ``time``) and points that go back in time
+are always kept, so jumps come out exactly as drawn.  Distances of a whole
+segment are computed with NumPy at once.
+
+:func:`simplify_envelopes` applies this to a clip's envelopes with the
+tolerance given as a fraction of each parameter's range.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Tolerance the Set Inspector's save form starts with, as a fraction of the
+# parameter's range (0.5%).
+DEFAULT_TOLERANCE = 0.005
+
+
+def _keep_mask(times: np.ndarray, values: np.ndarray, tolerance: float) -> np.ndarray:
+    count = len(times)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+    # Both ends of a step or of a jump back in time are anchors
+    step = np.flatnonzero(np.diff(times) <= 0)
+    keep[step] = True
+    keep[step + 1] = True
+
+    anchors = np.flatnonzero(keep)
+    stack = [(int(a), int(b)) for a, b in zip(anchors[:-1], anchors[1:]) if b - a > 1]
+    while stack:
+        start, end = stack.pop()
+        t0, t1 = times[start], times[end]
+        v0, v1 = values[start], values[end]
+        inner_t = times[start + 1:end]
+        expected = v0 + (v1 - v0) * (inner_t - t0) / (t1 - t0)
+        error = np.abs(values[start + 1:end] - expected)
+        worst = int(np.argmax(error))
+        if error[worst] > tolerance:
+            split = start + 1 + worst
+            keep[split] = True
+            if split - start > 1:
+                stack.append((start, split))
+            if end - split > 1:
+                stack.append((split, end))
+    return keep
+
+
+def simplify_breakpoints(
+    breakpoints: List[Dict[str, Any]], tolerance: float
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Return ``(kept_breakpoints, removed_count)`` for one envelope.
+
+    ``tolerance`` is in the envelope's value units.  The kept breakpoints are
+    the original dicts, in their original order.
+    """
+    if len(breakpoints) < 3 or tolerance < 0:
+        return list(breakpoints), 0
+    try:
+        times = np.fromiter((float(bp["time"]) for bp in breakpoints), np.float64, len(breakpoints))
+        values = np.fromiter((float(bp["value"]) for bp in breakpoints), np.float64, len(breakpoints))
+    except (KeyError, TypeError, ValueError):
+        # Leave envelopes we do not understand untouched
+        return list(breakpoints), 0
+    keep = _keep_mask(times, values, tolerance)
+    kept = [bp for bp, k in zip(breakpoints, keep.tolist()) if k]
+    return kept, len(breakpoints) - len(kept)
+
+
+def envelope_tolerance(
+    breakpoints: List[Dict[str, Any]],
+    fraction: float,
+    value_range: Optional[Dict[str, Any]] = None,
+) -> float:
+    """Convert ``fraction`` of a parameter's range into value units.
+
+    Without a known ``value_range`` the span of the envelope's own values is
+    used instead.
+    """
+    if value_range and value_range.get("max") is not None and value_range.get("min") is not None:
+        span = float(value_range["max"]) - float(value_range["min"])
+    else:
+        try:
+            values = [float(bp["value"]) for bp in breakpoints]
+        except (KeyError, TypeError, ValueError):
+            values = []
+        span = max(values) - min(values) if values else 0.0
+    return abs(span) * fraction
+
+
+def simplify_envelopes(
+    envelopes: List[Dict[str, Any]],
+    fraction: float,
+    ranges: Optional[Dict[int, Dict[str, Any]]] = None,
+) -> Tuple[List[Dict[str, Any]], int]:
+    """Simplify every envelope in ``envelopes``.
+
+    ``ranges`` maps ``parameterId`` to ``{"min", "max"}``.  Returns new
+    envelope dicts (unchanged ones are passed through) and the total number
+    of breakpoints removed.
+    """
+    ranges = ranges or {}
+    result = []
+    removed = 0
+    for env in envelopes:
+        breakpoints = env.get("breakpoints") or []
+        tolerance = envelope_tolerance(breakpoints, fraction, ranges.get(env.get("parameterId")))
+        kept, count = simplify_breakpoints(breakpoints, tolerance)
+        if count:
+            env = dict(env, breakpoints=kept)
+            removed += count
+        result.append(env)
+    return result, removed
@@ -1,68 +1,85 @@
 import os
-import json
-from typing import Callable, Tuple, Union, Optional
+import re
+import mmap
+from functools import lru_cache
+from typing import Callable, Iterator, Tuple, Union, Optional
 
 from core.cache_manager import get_cache, set_cache
+from core.preset_index import PRESET_EXTENSIONS, preset_index
 
 _CACHE_PREFIX = "file_browser:"
 
+# Entries per page of the JSON directory listing
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
 
 def _list_directory(base_dir: str, rel_path: str) -> Tuple[list[str], list[str]]:
-    """List subdirectories and files for the given path with caching.
+    """List subdirectories and files for the given path.
 
-    Cached entries are automatically invalidated if the directory's
-    modification time or entry count changes.
+    Entry types come from ``os.scandir`` (the directory entry's ``d_type``),
+    so only symlinks and filesystems without type information cost a
+    ``stat`` per entry.
     """
     abs_path = os.path.join(base_dir, rel_path)
-    key = f"{_CACHE_PREFIX}{abs_path}"
-    cached = get_cache(key)
+    dirs: list[str] = []
+    files: list[str] = []
     try:
-        mtime = os.stat(abs_path).st_mtime_ns
-        entries = os.listdir(abs_path)
-    except FileNotFoundError:
+        with os.scandir(abs_path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    elif entry.is_file():
+                        files.append(entry.name)
+                except OSError:
+                    continue
+    except (FileNotFoundError, NotADirectoryError):
         return [], []
+    dirs.sort()
+    files.sort()
+    return dirs, files
 
-    if cached is not None and cached.get("mtime") == mtime and cached.get("count") == len(entries):
-        return cached["dirs"], cached["files"]
 
-
-    dirs: list[str] = []
-    files: list[str] = []
-    for name in sorted(entries):
-        full = os.path.join(abs_path, name)
-        if os.path.isdir(full):
-            dirs.append(name)
-        elif os.path.isfile(full):
-            files.append(name)
-
-    set_cache(key, {"dirs": dirs, "files": files, "mtime": mtime, "count": len(entries)})
-    return dirs, files
+@lru_cache(maxsize=None)
+def _kind_token(kind: str) -> "re.Pattern[bytes]":
+    return re.compile(rb'"kind"\s*:\s*"' + re.escape(kind.encode()) + rb'"')
 
 
-def _check_json_file(file_path: str, kind: str) -> bool:
-    """Check JSON file for a specific ``kind`` with caching.
+def _kind_prefilter(file_path: str, kind: str) -> Optional[bool]:
+    """Rule out presets without a ``kind`` device by searching the raw bytes.
 
-    Cached results are revalidated if the file's modification time changes.
+    Returns ``False`` if the file cannot contain the ``"kind": "<kind>"``
+    token and ``None`` if it has to be parsed to be sure: when the token is
+    present or when ``\\u`` escapes could be spelling it.  Negative answers
+    are cached until the file's modification time or size changes.
     """
-    key = f"{_CACHE_PREFIX}{kind}:{file_path}"
-    cached = get_cache(key)
+    key = f"{_CACHE_PREFIX}nokind:{kind}:{file_path}"
     try:
-        mtime = os.stat(file_path).st_mtime_ns
-    except FileNotFoundError:
-        return False
+        with open(file_path, "rb") as f:
+            st = os.fstat(f.fileno())
+            stamp = (st.st_mtime_ns, st.st_size)
+            cached = get_cache(key)
+            if cached is not None and cached.get("stamp") == stamp:
+                return False
+            if st.st_size:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if _kind_token(kind).search(data) or data.find(b"\\u") != -1:
+                        return None
+    except (OSError, ValueError):
+        return None
+    set_cache(key, {"stamp": stamp}, paths=(file_path,))
+    return False
 
-    if cached is not None and cached.get("mtime") == mtime:
-        return cached.get("result", False)
 
-    try:
-        with open(file_path, "r") as f:
-            data = json.load(f)
-        result = _has_kind(data, kind)
-    except Exception:
-        result = False
+def _check_json_file(file_path: str, kind: str) -> bool:
+    """Check a preset file for a specific ``kind``.
 
-    set_cache(key, {"result": result, "mtime": mtime})
-    return result
+    Files indexed in their current state are answered by the preset index,
+    others are ruled out by :func:`_kind_prefilter` where possible and only
+    parsed (and indexed) when the token is present.
+    """
+    return _kind_filter([file_path], kind, check_extension=False)(file_path)
 
 
 def _has_kind(data: Union[dict, list], kind: str) -> bool:
@@ -75,31 +92,125 @@ def _has_kind(data: Union[dict, list], kind: str) -> bool:
     return False
 
 
+# Filters matching presets that contain a device kind
+KIND_FILTERS: dict[str, str] = {
+    "drift": "drift",
+    "wavetable": "wavetable",
+    "drumrack": "drumRack",
+    "melodicsampler": "melodicSampler",
+}
+
+
+def _is_preset(p: str) -> bool:
+    return p.lower().endswith(PRESET_EXTENSIONS)
+
+
 FILTERS: dict[str, Callable[[str], bool]] = {
     "wav": lambda p: p.lower().endswith(".wav"),
-    "drift": lambda p: (
-        p.lower().endswith(".ablpreset")
-        or p.lower().endswith(".json")
-    )
-    and _check_json_file(p, "drift"),
-    "wavetable": lambda p: (
-        p.lower().endswith(".ablpreset")
-        or p.lower().endswith(".json")
-    )
-    and _check_json_file(p, "wavetable"),
-    "drumrack": lambda p: (
-        p.lower().endswith(".ablpreset")
-        or p.lower().endswith(".json")
-    )
-    and _check_json_file(p, "drumRack"),
-    "melodicsampler": lambda p: (
-        p.lower().endswith(".ablpreset")
-        or p.lower().endswith(".json")
-    )
-    and _check_json_file(p, "melodicSampler"),
+    **{
+        key: (lambda p, kind=kind: _is_preset(p) and _check_json_file(p, kind))
+        for key, kind in KIND_FILTERS.items()
+    },
 }
 
 
+def _kind_filter(paths: list[str], kind: str, check_extension: bool = True) -> Callable[[str], bool]:
+    """Return a filter for ``paths`` matching presets with a ``kind`` device."""
+    presets = [p for p in paths if _is_preset(p)] if check_extension else list(paths)
+    entries = preset_index.cached(presets)
+    unknown = [p for p in presets if p not in entries and _kind_prefilter(p, kind) is not False]
+    if unknown:
+        entries.update(preset_index.lookup(unknown))
+    matching = {p for p, entry in entries.items() if kind in entry["kinds"]}
+    return matching.__contains__
+
+
+def _file_filter(base_dir: str, rel_path: str, files: list[str], filter_key: Optional[str]) -> Callable[[str], bool]:
+    """Return the filter for ``filter_key`` over ``files`` of one directory."""
+    if filter_key in KIND_FILTERS:
+        return _kind_filter([os.path.join(base_dir, rel_path, f) for f in files], KIND_FILTERS[filter_key])
+    return FILTERS.get(filter_key, lambda p: True)
+
+
+def _matching_files(
+    base_dir: str, rel_path: str, files: list[str], filter_key: Optional[str]
+) -> Iterator[Tuple[str, str]]:
+    """Yield ``(name, full_path)`` of ``files`` passing ``filter_key``, in order.
+
+    Files are filtered a page at a time, so kind filters only look at as many
+    presets as the caller consumes.
+    """
+    for start in range(0, len(files), DEFAULT_PAGE_SIZE):
+        chunk = files[start:start + DEFAULT_PAGE_SIZE]
+        filter_func = _file_filter(base_dir, rel_path, chunk, filter_key)
+        for name in chunk:
+            full = os.path.join(base_dir, rel_path, name)
+            if filter_func(full):
+                yield name, full
+
+
+def list_directory_page(
+    base_dir: str,
+    rel_path: str,
+    filter_key: Optional[str] = None,
+    *,
+    offset: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+    query: str = "",
+    path_prefix: str = "",
+) -> dict:
+    """Return one page of a directory listing as a JSON-ready dict.
+
+    Subdirectories come first, then the files passing ``filter_key``; both
+    are narrowed to names containing ``query`` (case-insensitive) before
+    ``offset``/``limit`` paging.  Each entry has ``type`` (``"dir"`` or
+    ``"file"``), ``name`` and ``path``: the ``data-path`` to browse for
+    directories and the full path to submit for files.
+
+    Kind filters stop once the page (and one more match, for ``has_more``)
+    is found, so ``total`` is ``None`` when later files were not checked.
+    """
+    dirs, files = _list_directory(base_dir, rel_path)
+    needle = query.lower()
+    if needle:
+        dirs = [d for d in dirs if needle in d.lower()]
+        files = [f for f in files if needle in f.lower()]
+    offset = max(0, offset)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    entries = []
+    for d in dirs[offset:offset + limit]:
+        sub_rel = os.path.join(rel_path, d) if rel_path else d
+        entries.append({
+            "type": "dir",
+            "name": d,
+            "path": os.path.join(path_prefix, sub_rel) if path_prefix else sub_rel,
+        })
+
+    # Files passing the filter so far, including those before this page
+    matched = 0
+    skip = max(0, offset - len(dirs))
+    exhausted = True
+    for name, full in _matching_files(base_dir, rel_path, files, filter_key):
+        if matched >= skip and len(entries) < limit:
+            entries.append({"type": "file", "name": name, "path": full})
+        elif len(entries) >= limit and filter_key in KIND_FILTERS:
+            # One match past the page is enough to know there is more
+            exhausted = False
+            break
+        matched += 1
+
+    total = len(dirs) + matched if exhausted else None
+    return {
+        "path": os.path.join(path_prefix, rel_path) if path_prefix or rel_path else "",
+        "entries": entries,
+        "offset": offset,
+        "limit": limit,
+        "total": total,
+        "has_more": not exhausted or offset + len(entries) < total,
+    }
+
+
 def generate_dir_html(
     base_dir: str,
     rel_path: str,
@@ -115,18 +226,18 @@ def generate_dir_html(
     ``path_prefix`` is prepended to all ``data-path`` attributes so that
     virtual directory roots can be implemented.
     """
-    filter_func = FILTERS.get(filter_key, lambda p: True)
     dirs, files = _list_directory(base_dir, rel_path)
+    filter_func = _file_filter(base_dir, rel_path, files, filter_key)
     root_path = os.path.join(path_prefix, rel_path) if path_prefix or rel_path else ""
-    html = (
+    parts = [
         f'<ul class="file-tree" data-path="{root_path}">'
         if path_prefix or rel_path
         else '<ul class="file-tree root" data-path="">'
-    )
+    ]
     for d in dirs:
         sub_rel = os.path.join(rel_path, d) if rel_path else d
         data_path = os.path.join(path_prefix, sub_rel) if path_prefix else sub_rel
-        html += (
+        parts.append(
             f'<li class="dir closed" data-path="{data_path}">'
             f'<span>📁 {d}</span>'
             '<ul class="hidden"></ul></li>'
@@ -134,15 +245,14 @@ def generate_dir_html(
     for f in files:
         full = os.path.join(base_dir, rel_path, f)
         if filter_func(full):
-            rel = os.path.join(rel_path, f) if rel_path else f
-            html += (
+            parts.append(
                 '<li class="file">'
                 f'<form method="post" action="{action_url}" class="file-entry">'
-                f'<input type="hidden" name="action" value="{action_value}">'\
-                f'<input type="hidden" name="{field_name}" value="{full}">'\
+                f'<input type="hidden" name="action" value="{action_value}">'
+                f'<input type="hidden" name="{field_name}" value="{full}">'
                 f'<button type="submit">📄 {f}</button>'
                 '</form>'
                 '</li>'
             )
-    html += '</ul>'
-    return html
+    parts.append('</ul>')
+    return ''.join(parts)
@@ -0,0 +1,31 @@
+"""SQLite databases holding derived indexes (set search, presets).
+
+The indexes only cache facts read from files on disk, so there is no
+migration: a database whose ``user_version`` does not match the schema
+version of the code is dropped and rebuilt from scratch.
+"""
+
+import os
+import sqlite3
+from typing import Iterable
+
+
+def open_index_db(path: str, schema: str, version: int, tables: Iterable[str]) -> sqlite3.Connection:
+    """Open (creating if needed) the index database at ``path``.
+
+    ``schema`` is the ``CREATE`` script for ``tables``.  The connection may
+    be used from several threads; callers serialize access with a lock.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, check_same_thread=False)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    except sqlite3.DatabaseError:
+        pass
+    if conn.execute("PRAGMA user_version").fetchone()[0] != version:
+        with conn:
+            for table in tables:
+                conn.execute(f"DROP TABLE IF EXISTS {table}")
+            conn.executescript(schema)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+    return conn
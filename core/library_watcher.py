@@ -0,0 +1,328 @@
+"""Watch the user library and invalidate only the cache entries that changed.
+
+Library scans cached through :mod:`core.cache_manager` record the paths they
+were built from.  :class:`LibraryWatcher` follows ``Samples``, ``Track
+Presets`` and ``Sets`` below ``/data/UserData/UserLibrary`` and passes every
+changed path to :func:`core.cache_manager.invalidate_paths`, so files added
+on the device itself show up without a manual refresh and a library refresh
+no longer throws away every scan.
+
+Linux ``inotify`` is used through :mod:`ctypes`.  Where it is unavailable
+(another OS, no free watches) the watcher falls back to comparing
+``(st_mtime_ns, st_size)`` snapshots every :data:`POLL_INTERVAL` seconds.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from core.cache_manager import invalidate_paths, invalidate_unwatched
+from core.config import MSET_SAMPLE_PATH, MSETS_DIRECTORY, TRACK_PRESETS_DIRECTORY
+
+logger = logging.getLogger(__name__)
+
+POLL_INTERVAL = 5.0
+# How often the inotify thread looks for watched roots that do not exist yet
+ROOT_RETRY_INTERVAL = 5.0
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+# IN_MODIFY is left out: IN_CLOSE_WRITE reports a finished write once.
+# IN_ATTRIB covers the xattrs Move keeps set names and colours in.
+WATCH_MASK = (
+    IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE
+    | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+)
+
+_EVENT = struct.Struct("iIII")
+
+
+class _Inotify:
+    """Minimal ctypes binding of the inotify system calls."""
+
+    def __init__(self):
+        name = ctypes.util.find_library("c") or "libc.so.6"
+        libc = ctypes.CDLL(name, use_errno=True)
+        self._add = libc.inotify_add_watch
+        self._add.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        self._rm = libc.inotify_rm_watch
+        self._rm.argtypes = (ctypes.c_int, ctypes.c_int)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def add_watch(self, path: str) -> int:
+        wd = self._add(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        self._rm(self.fd, wd)
+
+    def read(self) -> List[Tuple[int, int, str]]:
+        """Return the queued ``(wd, mask, name)`` events without blocking."""
+        events = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return events
+            if not data:
+                return events
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                events.append((wd, mask, os.fsdecode(name)))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class LibraryWatcher:
+    """Background thread turning library changes into cache invalidations."""
+
+    def __init__(self, roots: Iterable[str], poll_interval: float = POLL_INTERVAL, use_inotify: bool = True):
+        self.roots = tuple(os.path.abspath(r) for r in roots)
+        self.poll_interval = poll_interval
+        self.use_inotify = use_inotify
+        self.mode: Optional[str] = None
+        self._listeners: List[Callable[[List[str]], None]] = [invalidate_paths]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._inotify: Optional[_Inotify] = None
+        self._watches: Dict[int, str] = {}
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        self._wake: Optional[Tuple[int, int]] = None
+
+    # -- lifecycle --------------------------------------------------------
+
+    def start(self) -> bool:
+        """Start watching unless already running; returns whether it started."""
+        with self._lock:
+            if self.running:
+                return False
+            self._stop.clear()
+            self._wake = os.pipe()
+            self.mode = "poll"
+            if self.use_inotify:
+                try:
+                    self._inotify = _Inotify()
+                    self._watch_roots()
+                    self.mode = "inotify"
+                except (OSError, AttributeError) as exc:
+                    logger.warning("inotify unavailable, polling the library instead: %s", exc)
+                    self._close_inotify()
+            if self.mode == "poll":
+                self._snapshot = self._scan()
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        logger.info("Watching library for changes (%s)", self.mode)
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._wake is not None:
+            os.write(self._wake[1], b"x")
+        thread = self._thread
+        if thread is not None:
+            thread.join()
+        with self._lock:
+            self._close_inotify()
+            if self._wake is not None:
+                for fd in self._wake:
+                    os.close(fd)
+                self._wake = None
+            self._thread = None
+            self.mode = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_listener(self, callback: Callable[[List[str]], None]) -> None:
+        """Also call ``callback(changed_paths)`` for every batch of changes."""
+        self._listeners.append(callback)
+
+    def sync(self) -> List[str]:
+        """Handle changes made so far right away and return the changed paths.
+
+        inotify queues an event before the write that caused it returns, so
+        after ``sync`` the cache reflects every change the caller made.
+        """
+        with self._lock:
+            if self.mode == "inotify":
+                changed = self._drain()
+            elif self.mode == "poll":
+                changed = self._poll()
+            else:
+                return []
+            self._notify(changed)
+        return changed
+
+    def refresh_caches(self) -> bool:
+        """Invalidate caches after a library refresh.
+
+        Entries inside the watched roots are only dropped for the paths that
+        actually changed; everything else is cleared.  Returns ``False``
+        without doing anything when the watcher is not running, in which
+        case the caller should clear the whole cache.
+        """
+        if not self.running:
+            return False
+        self.sync()
+        invalidate_unwatched(self.roots)
+        return True
+
+    # -- internals --------------------------------------------------------
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                if self.mode == "inotify":
+                    ready, _, _ = select.select(
+                        [self._inotify.fd, self._wake[0]], [], [], ROOT_RETRY_INTERVAL
+                    )
+                    if self._stop.is_set():
+                        return
+                    with self._lock:
+                        changed = self._drain() if ready else []
+                        self._notify(changed + self._watch_roots())
+                else:
+                    if self._stop.wait(self.poll_interval):
+                        return
+                    with self._lock:
+                        self._notify(self._poll())
+            except Exception as exc:
+                logger.error("Library watcher error: %s", exc)
+                if self._stop.wait(self.poll_interval):
+                    return
+
+    def _notify(self, changed: List[str]) -> None:
+        """Call the listeners with ``changed``.
+
+        Runs with ``self._lock`` held, so :meth:`sync` only returns once
+        changes already read by the thread have been handled.
+        """
+        if not changed:
+            return
+        logger.debug("Library changed: %s", changed[:10])
+        for callback in self._listeners:
+            try:
+                callback(changed)
+            except Exception as exc:
+                logger.error("Library change listener failed: %s", exc)
+
+    def _close_inotify(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._watches.clear()
+
+    def _watch_tree(self, top: str) -> None:
+        """Watch ``top`` and every directory below it."""
+        for dirpath, dirnames, _ in os.walk(top):
+            try:
+                wd = self._inotify.add_watch(dirpath)
+            except OSError as exc:
+                if exc.errno in (errno.ENOENT, errno.ENOTDIR):
+                    continue
+                raise
+            self._watches[wd] = dirpath
+
+    def _unwatch_tree(self, top: str) -> None:
+        """Stop watching ``top`` and below, e.g. after it was renamed."""
+        prefix = os.path.join(top, "")
+        for wd, path in list(self._watches.items()):
+            if path == top or path.startswith(prefix):
+                self._inotify.rm_watch(wd)
+                del self._watches[wd]
+
+    def _watch_roots(self) -> List[str]:
+        """Watch roots that appeared since the last call and return them."""
+        watched = set(self._watches.values())
+        added = []
+        for root in self.roots:
+            if root not in watched and os.path.isdir(root):
+                self._watch_tree(root)
+                added.append(root)
+        return added
+
+    def _drain(self) -> List[str]:
+        changed: Dict[str, None] = {}
+        for wd, mask, name in self._inotify.read():
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; treat every root as changed
+                logger.warning("inotify queue overflowed")
+                changed.update(dict.fromkeys(self.roots))
+                continue
+            directory = self._watches.get(wd)
+            if directory is None:
+                continue
+            if mask & IN_IGNORED:
+                del self._watches[wd]
+                continue
+            path = os.path.join(directory, name) if name else directory
+            changed[path] = None
+            if mask & IN_ISDIR and mask & IN_MOVED_FROM:
+                self._unwatch_tree(path)
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                # Files may land in a new folder before it is watched
+                self._watch_tree(path)
+                for dirpath, _, filenames in os.walk(path):
+                    changed.update(dict.fromkeys(os.path.join(dirpath, f) for f in filenames))
+        return list(changed)
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        stack = [r for r in self.roots if os.path.isdir(r)]
+        while stack:
+            directory = stack.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+        return snapshot
+
+    def _poll(self) -> List[str]:
+        snapshot = self._scan()
+        old = self._snapshot
+        self._snapshot = snapshot
+        changed: Set[str] = {p for p, stamp in snapshot.items() if old.get(p) != stamp}
+        changed.update(p for p in old if p not in snapshot)
+        return sorted(changed)
+
+
+library_watcher = LibraryWatcher((MSET_SAMPLE_PATH, TRACK_PRESETS_DIRECTORY, MSETS_DIRECTORY))
@@ -1,35 +1,95 @@
 import os
-import subprocess
+import logging
 from core.config import MSETS_DIRECTORY
+from core.cache_manager import get_cache, set_cache, invalidate_cache
+
+logger = logging.getLogger(__name__)
+
+_CACHE_PREFIX = "msets:"
+
 
 def get_xattr_value(relative_path, attr):
     """
     Retrieve the extended attribute value for a given file or directory.
-    
+
     Args:
-        relative_path (str): Path to the target file or directory.
+        relative_path (str): Path to the target file or directory, relative
+            to ``MSETS_DIRECTORY``.
         attr (str): The name of the extended attribute to retrieve.
-    
+
     Returns:
         str: The value of the extended attribute, or "Unknown" if retrieval fails.
     """
     try:
-        output = subprocess.check_output(
-            ["getfattr", "--only-values", "-n", attr, relative_path],
-            cwd=MSETS_DIRECTORY,
-            encoding="utf-8"
-        ).strip()
-        return output
-    except subprocess.CalledProcessError:
+        value = os.getxattr(os.path.join(MSETS_DIRECTORY, relative_path), attr)
+        return value.decode("utf-8", errors="replace").strip()
+    except (OSError, AttributeError):
         return "Unknown"
 
+
+def _read_mset_entry(uuid, uuid_path):
+    """Read name and extended attributes for the set stored in ``uuid_path``."""
+    # Retrieve Move set name (if available)
+    mset_folders = [
+        e.name for e in os.scandir(uuid_path) if e.is_dir(follow_symlinks=False)
+    ]
+    mset_name = mset_folders[0] if mset_folders else "Unknown"
+
+    # Retrieve extended attributes
+    mset_id = get_xattr_value(uuid, "user.song-index")
+    mset_color = get_xattr_value(uuid, "user.song-color")
+    mset_cloudstate = get_xattr_value(uuid, "user.local-cloud-state")
+    mset_modifiedtime = get_xattr_value(uuid, "user.last-modified-time")
+    mset_extmodified = get_xattr_value(uuid, "user.was-externally-modified")
+
+    mset_id_value = int(mset_id) if mset_id.isdigit() else 9999
+    return {
+        "uuid": uuid,
+        "mset_name": mset_name,
+        "mset_id": mset_id_value,
+        "mset_color": mset_color if mset_color.isdigit() else "Unknown",
+        "mset_cloudstate": mset_cloudstate,
+        "mset_modifiedtime": mset_modifiedtime,
+        "mset_extmodified": mset_extmodified
+    }
+
+
+def _get_mset_entry(uuid, uuid_path, st):
+    """Return the indexed entry for ``uuid_path`` re-reading it only if stale.
+
+    Entries are validated against the directory's ``st_ctime_ns`` (changed by
+    any xattr write) and ``st_mtime_ns`` (changed when the set folder inside
+    is created, renamed or removed).
+    """
+    key = f"{_CACHE_PREFIX}{uuid_path}"
+    stamp = (st.st_ctime_ns, st.st_mtime_ns)
+    cached = get_cache(key)
+    if cached is not None and cached.get("stamp") == stamp:
+        return cached["entry"]
+
+    entry = _read_mset_entry(uuid, uuid_path)
+    set_cache(key, {"stamp": stamp, "entry": entry}, paths=(uuid_path,))
+    return entry
+
+
+def invalidate_mset(uuid=None):
+    """Drop the indexed entry for ``uuid`` or the whole set index if ``None``."""
+    if uuid is None:
+        invalidate_cache(prefix=_CACHE_PREFIX)
+    else:
+        invalidate_cache(f"{_CACHE_PREFIX}{os.path.join(MSETS_DIRECTORY, uuid)}")
+
+
 def list_msets(return_free_ids=False):
     """
     Retrieve a list of stored Move sets and available IDs.
-    
+
+    Set metadata is served from an index keyed on each UUID directory's
+    ctime/mtime so unchanged sets are never re-read.
+
     Args:
         return_free_ids (bool): Whether to also return available IDs.
-    
+
     Returns:
         list: A list of dictionaries containing Move set metadata.
         dict (optional): A dictionary containing used and free slot IDs.
@@ -37,39 +97,30 @@ def list_msets(return_free_ids=False):
     msets = []
     used_ids = set()
 
-    if not os.path.isdir(MSETS_DIRECTORY):
+    try:
+        entries = list(os.scandir(MSETS_DIRECTORY))
+    except (FileNotFoundError, NotADirectoryError):
+        entries = None
+
+    if entries is None:
         if return_free_ids:
             free = list(range(32))
             return msets, {"used": used_ids, "free": free}
         return msets
 
-    for uuid in os.listdir(MSETS_DIRECTORY):
-        uuid_path = os.path.join(MSETS_DIRECTORY, uuid)
-        if os.path.isdir(uuid_path):
-            # Retrieve Move set name (if available)
-            mset_folders = [f for f in os.listdir(uuid_path) if os.path.isdir(os.path.join(uuid_path, f))]
-            mset_name = mset_folders[0] if mset_folders else "Unknown"
-
-            # Retrieve extended attributes
-            mset_id = get_xattr_value(uuid, "user.song-index")
-            mset_color = get_xattr_value(uuid, "user.song-color")
-            mset_cloudstate = get_xattr_value(uuid, "user.local-cloud-state")
-            mset_modifiedtime = get_xattr_value(uuid, "user.last-modified-time")
-            mset_extmodified = get_xattr_value(uuid, "user.was-externally-modified")
-
-            mset_id_value = int(mset_id) if mset_id.isdigit() else 9999
-            msets.append({
-                "uuid": uuid,
-                "mset_name": mset_name,
-                "mset_id": mset_id_value,
-                "mset_color": mset_color if mset_color.isdigit() else "Unknown",
-                "mset_cloudstate": mset_cloudstate,
-                "mset_modifiedtime": mset_modifiedtime,
-                "mset_extmodified": mset_extmodified
-            })
-
-            if 0 <= mset_id_value <= 31:
-                used_ids.add(mset_id_value)
+    for dir_entry in entries:
+        try:
+            if not dir_entry.is_dir():
+                continue
+            st = dir_entry.stat()
+            entry = _get_mset_entry(dir_entry.name, dir_entry.path, st)
+        except OSError as e:
+            logger.debug("Skipping set folder %s: %s", dir_entry.path, e)
+            continue
+
+        msets.append(dict(entry))
+        if 0 <= entry["mset_id"] <= 31:
+            used_ids.add(entry["mset_id"])
 
     msets_sorted = sorted(msets, key=lambda x: x["mset_id"])
 
@@ -82,7 +133,7 @@ def list_msets(return_free_ids=False):
 def list_msets_free():
     """
     Return a list of available Move set IDs.
-    
+
     Returns:
         list: A list of free slot indices (0-31).
     """
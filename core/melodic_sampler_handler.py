@@ -1,11 +1,11 @@
 #!/usr/bin/env python3
 """Utilities for MelodicSampler presets."""
-import json
 import urllib.parse
 import os
 import shutil
 import logging
 from core.config import MELODIC_SAMPLER_SAMPLE_DIR
+from core.preset_document import preset_document
 
 logger = logging.getLogger(__name__)
 
@@ -13,8 +13,7 @@ logger = logging.getLogger(__name__)
 def get_melodic_sampler_sample(preset_path):
     """Return the sample name and path for a MelodicSampler preset."""
     try:
-        with open(preset_path, "r") as f:
-            preset_data = json.load(f)
+        preset_data = preset_document(preset_path).data
 
         sample_uri = None
 
@@ -89,8 +88,8 @@ def replace_melodic_sampler_sample(preset_path, new_sample_path,
         else:
             sample_uri = 'file://' + encoded
 
-        with open(preset_path, 'r') as f:
-            data = json.load(f)
+        document = preset_document(preset_path)
+        data = document.data
 
         updated = False
 
@@ -117,13 +116,12 @@ def replace_melodic_sampler_sample(preset_path, new_sample_path,
                 'message': 'MelodicSampler device not found in preset'
             }
 
-        with open(preset_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        document.commit()
 
         return {
             'success': True,
             'message': f'Replaced sample with {filename}',
-            'path': preset_path,
+            'path': document.path,
             'sample_path': dest_path,
         }
 
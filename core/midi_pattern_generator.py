@@ -7,13 +7,16 @@ import json
 from typing import Dict, List, Any, Tuple, Optional
 
 from core.utils import load_set_template
+from core.restore_handler import place_song
 
 def generate_pattern_set(
     set_name: str,
     pattern: List[Dict[str, Any]],
     clip_length: float = 4.0,
     tempo: float = 120.0,
-    output_dir: Optional[str] = None
+    output_dir: Optional[str] = None,
+    pad_index: Optional[int] = None,
+    pad_color: int = 1
 ) -> Dict[str, Any]:
     """
     Generate an Ableton Live set with a custom pattern of notes.
@@ -30,6 +33,9 @@ def generate_pattern_set(
         output_dir: Optional directory to save the generated set. Uses the
             ``MOVE_SET_DIR`` environment variable or the default Move path if
             not provided.
+        pad_index: Optional pad (0-31). When given the set is placed
+            directly on that pad instead of being written to ``output_dir``.
+        pad_color: Pad color used together with ``pad_index``
         
     Returns:
         Result dictionary with success status and message
@@ -82,6 +88,9 @@ def generate_pattern_set(
         
         # Update set metadata
         song['tempo'] = tempo
+
+        if pad_index is not None:
+            return place_song(song, set_name, pad_index, pad_color)
         
         # Save the modified set
         if output_dir is None:
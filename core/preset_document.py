@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""Load a preset once, apply several edits in memory and write it once.
+
+The preset helpers in :mod:`core.synth_preset_inspector_handler`,
+:mod:`core.synth_param_editor_handler` and :mod:`core.melodic_sampler_handler`
+accept either a path or a :class:`PresetDocument`:
+
+* given a path, a helper reads the file and, if it edits it, writes the
+  result straight back (the behaviour callers have always relied on);
+* given a document, it works on ``document.data`` and only marks the
+  document dirty, so a whole ``save_params`` request parses the preset once,
+  writes it once with :meth:`PresetDocument.save` and renders the response
+  from the same tree.
+
+Files are written through :func:`core.atomic_write.atomic_open`, so Move
+never sees a half written preset.
+"""
+import json
+import logging
+
+from core.atomic_write import atomic_open
+
+logger = logging.getLogger(__name__)
+
+
+def write_preset(path, data):
+    """Atomically write ``data`` as indented JSON to ``path``."""
+    with atomic_open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+class PresetDocument:
+    """An in-memory preset with the path it will be saved to."""
+
+    def __init__(self, path, data, autosave=False):
+        self.path = path
+        self.data = data
+        self.dirty = False
+        # Documents made from a bare path by preset_document() write every
+        # commit straight through.
+        self.autosave = autosave
+
+    @classmethod
+    def load(cls, path, autosave=False):
+        with open(path, "r") as f:
+            return cls(path, json.load(f), autosave=autosave)
+
+    def commit(self, dest=None):
+        """Record an edit, to be written to ``dest`` (default: ``self.path``).
+
+        Returns the destination.  Autosave documents are written right away.
+        """
+        if dest:
+            self.path = dest
+        self.dirty = True
+        if self.autosave:
+            self.save()
+        return self.path
+
+    def save(self, dest=None):
+        """Write the document to ``dest`` or its current path if it changed."""
+        if dest:
+            if dest != self.path:
+                self.dirty = True
+            self.path = dest
+        if self.dirty:
+            write_preset(self.path, self.data)
+            self.dirty = False
+            logger.debug("Saved preset %s", self.path)
+        return self.path
+
+
+def preset_document(source):
+    """Return ``source`` if it is a document, else load the preset at ``source``."""
+    if isinstance(source, PresetDocument):
+        return source
+    return PresetDocument.load(source, autosave=True)
+
+
+def preset_source(path):
+    """Return a document for rendering ``path``, or ``path`` if it cannot be read.
+
+    Passing the bare path on lets the extract helpers report the error in
+    their usual result dicts.
+    """
+    try:
+        return PresetDocument.load(path)
+    except Exception as exc:
+        logger.warning("Could not load preset %s: %s", path, exc)
+        return path
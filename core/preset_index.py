@@ -0,0 +1,247 @@
+"""Persistent index of preset files in Track Presets and the Core Library.
+
+Finding the Drift, Wavetable or drum rack presets among a library used to
+mean ``json.load``-ing every ``.ablpreset`` whenever the in-memory cache was
+cold, which :func:`core.refresh_handler.refresh_library` clears after every
+change.  :class:`PresetIndex` records for each preset file
+
+* the device ``kind`` values it contains, in document order,
+* custom macro names (``{index: name}``), and
+* the ``sampleUri`` values it references,
+
+together with the file's ``st_mtime_ns`` and ``st_size``.  Lookups stat the
+files involved and only re-read those that changed, and the index lives in a
+SQLite database so it survives restarts.
+"""
+
+import json
+import os
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from core.config import PRESET_INDEX_PATH
+from core.index_db import open_index_db
+
+logger = logging.getLogger(__name__)
+
+# Bump when the tables or what is extracted from a preset change
+SCHEMA_VERSION = 1
+PRESET_EXTENSIONS = (".ablpreset", ".json")
+# SQLite limits the number of ``?`` placeholders in one statement
+_QUERY_CHUNK = 500
+
+_SCHEMA = """
+CREATE TABLE presets (
+    path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, valid INTEGER,
+    kinds TEXT, macros TEXT, samples TEXT
+);
+CREATE TABLE preset_kinds (path TEXT, kind TEXT, position INTEGER);
+CREATE INDEX preset_kinds_kind ON preset_kinds (kind);
+CREATE INDEX preset_kinds_path ON preset_kinds (path);
+"""
+_TABLES = ("presets", "preset_kinds")
+
+
+def describe_preset(data: Any) -> Dict[str, Any]:
+    """Return the device kinds, macro names and sample URIs of a preset."""
+    kinds: List[str] = []
+    macros: Dict[int, str] = {}
+    samples: List[str] = []
+
+    def walk(obj):
+        if isinstance(obj, dict):
+            kind = obj.get("kind")
+            if isinstance(kind, str) and kind not in kinds:
+                kinds.append(kind)
+            uri = obj.get("sampleUri")
+            if isinstance(uri, str) and uri and uri not in samples:
+                samples.append(uri)
+            for key, value in obj.items():
+                if key.startswith("Macro") and key[5:].isdigit() and isinstance(value, dict):
+                    name = value.get("customName")
+                    if isinstance(name, str):
+                        macros[int(key[5:])] = name
+                if isinstance(value, (dict, list)):
+                    walk(value)
+        elif isinstance(obj, list):
+            for item in obj:
+                walk(item)
+
+    walk(data)
+    return {"kinds": kinds, "macros": macros, "samples": samples}
+
+
+def _entry(row: Sequence[Any]) -> Dict[str, Any]:
+    return {
+        "valid": bool(row[3]),
+        "kinds": json.loads(row[4]),
+        "macros": {int(k): v for k, v in json.loads(row[5]).items()},
+        "samples": json.loads(row[6]),
+    }
+
+
+class PresetIndex:
+    """SQLite backed, stat-validated facts about preset files."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        """Return the connection; must be called with ``self._lock`` held."""
+        if self._conn is None:
+            self._conn = open_index_db(self.db_path, _SCHEMA, SCHEMA_VERSION, _TABLES)
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def _rows(self, conn, paths: List[str]) -> Dict[str, Tuple]:
+        rows = {}
+        for i in range(0, len(paths), _QUERY_CHUNK):
+            chunk = paths[i:i + _QUERY_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for row in conn.execute(
+                f"SELECT path, mtime_ns, size, valid, kinds, macros, samples FROM presets WHERE path IN ({marks})",
+                chunk,
+            ):
+                rows[row[0]] = row
+        return rows
+
+    def _read(self, path: str, st: os.stat_result) -> Tuple:
+        try:
+            with open(path, "r") as f:
+                info = describe_preset(json.load(f))
+            valid = 1
+        except Exception as exc:
+            logger.warning("Could not parse preset %s: %s", os.path.basename(path), exc)
+            info = {"kinds": [], "macros": {}, "samples": []}
+            valid = 0
+        return (
+            path, st.st_mtime_ns, st.st_size, valid,
+            json.dumps(info["kinds"]), json.dumps(info["macros"]), json.dumps(info["samples"]),
+        )
+
+    def _check(self, paths: Iterable[str]):
+        """Return ``(stats, rows, stale)`` for the existing files in ``paths``."""
+        stats = {}
+        for path in dict.fromkeys(paths):
+            try:
+                stats[path] = os.stat(path)
+            except OSError:
+                pass
+        with self._lock:
+            rows = self._rows(self._connect(), list(stats))
+        stale = [
+            path for path, st in stats.items()
+            if path not in rows or rows[path][1:3] != (st.st_mtime_ns, st.st_size)
+        ]
+        return stats, rows, stale
+
+    def cached(self, paths: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Like :meth:`lookup` but only for files indexed in their current state.
+
+        Never reads a file, so callers can cheaply rule out stale files some
+        other way before asking for a full :meth:`lookup`.
+        """
+        stats, rows, stale = self._check(paths)
+        stale = set(stale)
+        return {path: _entry(rows[path]) for path in stats if path not in stale}
+
+    def lookup(self, paths: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return ``{path: {"valid", "kinds", "macros", "samples"}}``.
+
+        Files that changed since they were indexed are re-read; missing
+        files are left out.
+        """
+        stats, rows, stale = self._check(paths)
+        if stale:
+            fresh = [self._read(path, stats[path]) for path in stale]
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.executemany("INSERT OR REPLACE INTO presets VALUES (?, ?, ?, ?, ?, ?, ?)", fresh)
+                    conn.executemany("DELETE FROM preset_kinds WHERE path = ?", [(p,) for p in stale])
+                    conn.executemany(
+                        "INSERT INTO preset_kinds VALUES (?, ?, ?)",
+                        [(row[0], kind, pos) for row in fresh for pos, kind in enumerate(json.loads(row[4]))],
+                    )
+            rows.update((row[0], row) for row in fresh)
+            logger.debug("Indexed %d preset files", len(fresh))
+        return {path: _entry(rows[path]) for path in stats}
+
+    def _files(self, root: str, extensions: Sequence[str]) -> List[str]:
+        files = []
+        suffixes = tuple(extensions)
+        for dirpath, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.lower().endswith(suffixes):
+                    files.append(os.path.join(dirpath, filename))
+        return files
+
+    def scan(self, root: str, extensions: Sequence[str] = PRESET_EXTENSIONS) -> Dict[str, Dict[str, Any]]:
+        """Bring every preset below ``root`` up to date and return them.
+
+        Rows of files with one of ``extensions`` that no longer exist are
+        dropped; presets of other types are left for their own scans.
+        """
+        files = self._files(root, extensions)
+        entries = self.lookup(files)
+        prefix = os.path.join(root, "")
+        suffixes = tuple(extensions)
+        with self._lock:
+            conn = self._connect()
+            gone = [
+                (path,)
+                for (path,) in conn.execute(
+                    "SELECT path FROM presets WHERE substr(path, 1, ?) = ?", (len(prefix), prefix)
+                )
+                if path not in entries and path.lower().endswith(suffixes)
+            ]
+            if gone:
+                with conn:
+                    conn.executemany("DELETE FROM presets WHERE path = ?", gone)
+                    conn.executemany("DELETE FROM preset_kinds WHERE path = ?", gone)
+        return entries
+
+    def find(
+        self,
+        root: str,
+        kinds: Iterable[str],
+        extensions: Sequence[str] = PRESET_EXTENSIONS,
+    ) -> List[Tuple[str, str]]:
+        """Return ``(path, kind)`` for presets below ``root`` containing a kind.
+
+        ``kind`` is the first of ``kinds`` to appear in the preset.  Results
+        are sorted by path.
+        """
+        kinds = list(kinds)
+        if not kinds:
+            return []
+        entries = self.scan(root, extensions)
+        marks = ",".join("?" * len(kinds))
+        prefix = os.path.join(root, "")
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT path, kind FROM preset_kinds WHERE kind IN ({marks})"
+                " AND substr(path, 1, ?) = ? ORDER BY path, position",
+                (*kinds, len(prefix), prefix),
+            ).fetchall()
+        found: Dict[str, str] = {}
+        for path, kind in rows:
+            if path in entries:
+                found.setdefault(path, kind)
+        return list(found.items())
+
+    def has_kind(self, path: str, kind: str) -> bool:
+        """Return whether the preset at ``path`` contains a ``kind`` device."""
+        entry = self.lookup([path]).get(path)
+        return entry is not None and kind in entry["kinds"]
+
+
+preset_index = PresetIndex(PRESET_INDEX_PATH)
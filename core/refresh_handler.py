@@ -1,6 +1,7 @@
 import subprocess
 import logging
 from core.cache_manager import invalidate_cache
+from core.library_watcher import library_watcher
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +34,9 @@ def refresh_library():
         ]
         # Execute command and capture output
         subprocess.check_output(cmd, stderr=subprocess.STDOUT)
-        invalidate_cache()
+        # With the watcher running only entries for changed paths are dropped
+        if not library_watcher.refresh_caches():
+            invalidate_cache()
         logger.info("Library refreshed successfully.")
         return True, "Library refreshed successfully."
     except subprocess.CalledProcessError as e:
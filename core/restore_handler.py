@@ -1,13 +1,17 @@
+import io
 import os
-import zipfile
+import json
 import re
+import grp
+import pwd
 import shutil
-import subprocess
+import zipfile
 import uuid
 import logging
 import urllib.parse
 from datetime import datetime, timezone
-from core.list_msets_handler import list_msets_free
+from functools import lru_cache
+from core.set_registry import set_registry
 from core.config import MSETS_DIRECTORY, MSET_INDEX_RANGE, MSET_COLOR_RANGE, MSET_SAMPLE_PATH, MSET_ABLETON_URI
 
 
@@ -21,156 +25,325 @@ logging.basicConfig(
     ]
 )
 
-def restore_ablbundle(ablbundle_path, mset_restoreid, mset_restorecolor):
-    """
-    Restores an Ableton Move set (.ablbundle) to a specified pad.
-    
-    Args:
-        ablbundle_path (str): Path to the uploaded .ablbundle file.
-        mset_restoreid (int): Pad index where the set should be restored.
-        mset_restorecolor (int): Color index (1-26) assigned to the set.
+# Owner of restored set folders on the device.
+SET_OWNER = ("ableton", "users")
 
-    Returns:
-        dict: Result of the operation, including success status and message.
-    """
-    if not os.path.exists(ablbundle_path):
-        return {"success": False, "message": f"Error: {ablbundle_path} does not exist."}
+# Relative sample references inside bundles that get redirected into the set folder.
+_SAMPLE_URI_RE = re.compile(r'(\"sampleUri\"\s*:\s*\")Samples/')
+_SAMPLE_URI_KEY = '"sampleUri"'
+
+# Size of text chunks processed by the streaming sample URI rewrite and the
+# trailing window searched for a ``"sampleUri"`` key that may be incomplete.
+_REWRITE_CHUNK = 64 * 1024
+_REWRITE_WINDOW = 1024
 
-    # Get available IDS
-    free_ids = list_msets_free()
 
-    # Validate if the ID is within the allowed range
+class RestoreError(Exception):
+    """Raised when a set cannot be placed on the device."""
+
+
+def validate_restore_target(mset_restoreid, mset_restorecolor, free_ids=None):
+    """Return an error message if the pad/color combination is invalid.
+
+    ``free_ids`` defaults to the free pads reported by the set registry.
+    """
     if not (MSET_INDEX_RANGE[0] <= mset_restoreid <= MSET_INDEX_RANGE[1]):
-        return {"success": False, "message": f"Invalid set index {mset_restoreid}. Must be between {MSET_INDEX_RANGE[0]} and {MSET_INDEX_RANGE[1]}."}
+        return f"Invalid set index {mset_restoreid}. Must be between {MSET_INDEX_RANGE[0]} and {MSET_INDEX_RANGE[1]}."
 
-    # Validate if the ID is actually free
+    if free_ids is None:
+        free_ids = set_registry.snapshot().free
     if mset_restoreid not in free_ids:
-        return {"success": False, "message": f"Invalid set index {mset_restoreid}. ID already in use."}
+        return f"Invalid set index {mset_restoreid}. ID already in use."
 
-    # Validate color range
     if not (MSET_COLOR_RANGE[0] <= mset_restorecolor <= MSET_COLOR_RANGE[1]):
-        return {"success": False, "message": f"Invalid set color {mset_restorecolor}. Must be between {MSET_COLOR_RANGE[0]} and {MSET_COLOR_RANGE[1]}."}
+        return f"Invalid set color {mset_restorecolor}. Must be between {MSET_COLOR_RANGE[0]} and {MSET_COLOR_RANGE[1]}."
+    return None
 
-    
-    # Generate unique directory for set storage (UUIDv4)
-    mset_uuid = str(uuid.uuid4())
-    uuid_dir = os.path.join(MSETS_DIRECTORY, mset_uuid)
-    os.makedirs(uuid_dir, exist_ok=True)
-    
-    # Extract Move set name from filename
-    ablbundle_filename = os.path.basename(ablbundle_path)
-    mset_name, _ = os.path.splitext(ablbundle_filename)
-    mset_name_encoded = urllib.parse.quote(mset_name)
-    mset_folder = os.path.join(uuid_dir, mset_name)
-    
-    # Prevent overwriting existing sets
-    if os.path.exists(mset_folder):
-        return {"success": False, "message": f"Error: Set folder {mset_folder} already exists. Choose a different ID."}
-    
-    os.makedirs(mset_folder, exist_ok=True)
 
-    # Extract .ablbundle contents
+@lru_cache(maxsize=1)
+def _set_owner_ids():
+    """Return ``(uid, gid)`` for :data:`SET_OWNER` or ``None`` if unavailable."""
     try:
-        with zipfile.ZipFile(ablbundle_path, 'r') as zip_ref:
-            zip_ref.extractall(mset_folder)
-    except zipfile.BadZipFile:
-        return {"success": False, "message": "Error: Invalid .ablbundle file."}
-
-    song_abl_path = os.path.join(mset_folder, "Song.abl")
-    if not os.path.exists(song_abl_path):
-        return {"success": False, "message": "Error: Song.abl file missing from bundle."}
-
-    # Update sample paths in Song.abl to reference the samples inside the Move Set folder,
-    # rather than pointing to the global sample library on the Move.
-    with open(song_abl_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-
-    content = re.sub(
-        r'(\"sampleUri\"\s*:\s*\")Samples/([^\"]+)',
-        rf'\1{MSET_ABLETON_URI}/{mset_uuid}/{mset_name_encoded}/Samples/\2',
-        content
+        return pwd.getpwnam(SET_OWNER[0]).pw_uid, grp.getgrnam(SET_OWNER[1]).gr_gid
+    except KeyError:
+        logging.debug("Owner %s:%s not found; skipping chown", *SET_OWNER)
+        return None
+
+
+def _chown(path):
+    """Give ``path`` to the Move user if that account exists."""
+    ids = _set_owner_ids()
+    if ids is not None:
+        os.chown(path, *ids, follow_symlinks=False)
+
+
+def sample_uri_prefix(mset_uuid, mset_name):
+    """Return the URI that replaces ``Samples/`` for a set folder."""
+    return f"{MSET_ABLETON_URI}/{mset_uuid}/{urllib.parse.quote(mset_name)}/Samples/"
+
+
+def set_sample_uri_pattern(mset_uuid):
+    """Match absolute sample references into the ``Samples`` folder of ``mset_uuid``.
+
+    The set name segment is matched loosely because Move and
+    :func:`sample_uri_prefix` may quote it differently. Group 1 captures the
+    ``"sampleUri": "`` part as required by :func:`iter_rewritten_sample_uris`.
+    """
+    return re.compile(
+        r'(\"sampleUri\"\s*:\s*\")'
+        + re.escape(f"{MSET_ABLETON_URI}/{mset_uuid}/")
+        + r'[^/"]+/Samples/'
     )
 
-    with open(song_abl_path, 'w', encoding='utf-8') as file:
-        file.write(content)
-    
-    # Set extended attributes for Move system
-    last_modified_timestamp = datetime.fromtimestamp(os.path.getmtime(song_abl_path), tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
-    try:
-        subprocess.run(["chown", "-R", "ableton:users", uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.song-index", "-v", str(mset_restoreid), uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.song-color", "-v", str(mset_restorecolor), uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.last-modified-time", "-v", last_modified_timestamp, uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.was-externally-modified", "-v", "false", uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.local-cloud-state", "-v", "notSynced", uuid_dir], check=True)
-    except subprocess.CalledProcessError as e:
-        return {"success": False, "message": f"Error setting attributes: {e}"}
-    
-    logging.info(f"Successfully restored {ablbundle_path} to {uuid_dir}")
-    return {"success": True, "message": f"Successfully restored {mset_name} to pad {mset_restoreid}"} # with color {mset_restorecolor}"}
-
-
-def restore_abl(abl_path, mset_restoreid, mset_restorecolor):
-    """Restore a raw Ableton set (.abl) to the device.
 
-    This mirrors :func:`restore_ablbundle` but operates on a single ``.abl`` file
-    instead of a zipped bundle.
+def iter_rewritten_sample_uris(src, uri_prefix, pattern=_SAMPLE_URI_RE):
+    """Yield the text of ``src`` with sample URIs matched by ``pattern`` replaced.
+
+    ``pattern`` must capture the ``"sampleUri": "`` part in group 1; the rest
+    of the match is replaced by ``uri_prefix``. The text is processed in a
+    single pass over fixed-size chunks. Any trailing ``"sampleUri"`` key is
+    held back until the next chunk arrives so a reference split across a
+    chunk boundary is still rewritten.
     """
-    if not os.path.exists(abl_path):
-        return {"success": False, "message": f"Error: {abl_path} does not exist."}
+    replacement = lambda m: m.group(1) + uri_prefix
+    pending = ""
+    while True:
+        chunk = src.read(_REWRITE_CHUNK)
+        if not chunk:
+            break
+        pending += chunk
+        hold = pending.rfind(_SAMPLE_URI_KEY, max(0, len(pending) - _REWRITE_WINDOW))
+        if hold == -1:
+            hold = max(0, len(pending) - len(_SAMPLE_URI_KEY) + 1)
+        if hold:
+            yield pattern.sub(replacement, pending[:hold])
+        pending = pending[hold:]
+    if pending:
+        yield pattern.sub(replacement, pending)
 
-    free_ids = list_msets_free()
-    if not (MSET_INDEX_RANGE[0] <= mset_restoreid <= MSET_INDEX_RANGE[1]):
-        return {"success": False, "message": f"Invalid set index {mset_restoreid}. Must be between {MSET_INDEX_RANGE[0]} and {MSET_INDEX_RANGE[1]}."}
-    if mset_restoreid not in free_ids:
-        return {"success": False, "message": f"Invalid set index {mset_restoreid}. ID already in use."}
-    if not (MSET_COLOR_RANGE[0] <= mset_restorecolor <= MSET_COLOR_RANGE[1]):
-        return {"success": False, "message": f"Invalid set color {mset_restorecolor}. Must be between {MSET_COLOR_RANGE[0]} and {MSET_COLOR_RANGE[1]}."}
 
+def rewrite_sample_uris(src, dst, uri_prefix):
+    """Copy text from ``src`` to ``dst`` rewriting relative sample URIs.
+
+    ``src`` and ``dst`` are text streams. See
+    :func:`iter_rewritten_sample_uris` for how chunk boundaries are handled.
+    """
+    for piece in iter_rewritten_sample_uris(src, uri_prefix):
+        dst.write(piece)
+
+
+def _create_set_folder(mset_name):
+    """Create ``<uuid>/<mset_name>`` under ``MSETS_DIRECTORY``.
+
+    Returns:
+        tuple: ``(mset_uuid, uuid_dir, mset_folder)``
+    """
     mset_uuid = str(uuid.uuid4())
     uuid_dir = os.path.join(MSETS_DIRECTORY, mset_uuid)
-    os.makedirs(uuid_dir, exist_ok=True)
-
-    abl_filename = os.path.basename(abl_path)
-    mset_name, _ = os.path.splitext(abl_filename)
-    mset_name_encoded = urllib.parse.quote(mset_name)
     mset_folder = os.path.join(uuid_dir, mset_name)
-
     if os.path.exists(mset_folder):
-        return {"success": False, "message": f"Error: Set folder {mset_folder} already exists. Choose a different ID."}
+        raise RestoreError(f"Error: Set folder {mset_folder} already exists. Choose a different ID.")
+    os.makedirs(mset_folder)
+    _chown(uuid_dir)
+    _chown(mset_folder)
+    return mset_uuid, uuid_dir, mset_folder
 
-    os.makedirs(mset_folder, exist_ok=True)
-    song_abl_path = os.path.join(mset_folder, "Song.abl")
-    try:
-        shutil.copy(abl_path, song_abl_path)
-    except Exception as e:
-        return {"success": False, "message": f"Error copying set file: {e}"}
 
-    if not os.path.exists(song_abl_path):
-        return {"success": False, "message": "Error copying set file."}
+def _safe_member_path(root, name):
+    """Return the extraction path for archive member ``name`` inside ``root``."""
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".", "..")]
+    if not parts:
+        return None
+    return os.path.join(root, *parts)
+
 
-    with open(song_abl_path, "r", encoding="utf-8") as file:
-        content = file.read()
+def _extract_bundle(zip_ref, mset_folder, uri_prefix):
+    """Extract ``zip_ref`` into ``mset_folder`` rewriting ``Song.abl`` on the fly."""
+    for info in zip_ref.infolist():
+        target = _safe_member_path(mset_folder, info.filename)
+        if target is None:
+            continue
+        if info.is_dir():
+            os.makedirs(target, exist_ok=True)
+            _chown(target)
+            continue
 
-    content = re.sub(
-        r'(\"sampleUri\"\s*:\s*\")Samples/([^\"]+)',
-        rf'\1{MSET_ABLETON_URI}/{mset_uuid}/{mset_name_encoded}/Samples/\2',
-        content,
+        parent = os.path.dirname(target)
+        if not os.path.isdir(parent):
+            os.makedirs(parent, exist_ok=True)
+            # Own every intermediate directory we just created
+            rel = os.path.relpath(parent, mset_folder)
+            path = mset_folder
+            for part in rel.split(os.sep):
+                path = os.path.join(path, part)
+                _chown(path)
+
+        with zip_ref.open(info) as src:
+            if target == os.path.join(mset_folder, "Song.abl"):
+                text_src = io.TextIOWrapper(src, encoding="utf-8", newline="")
+                with open(target, "w", encoding="utf-8", newline="") as dst:
+                    rewrite_sample_uris(text_src, dst, uri_prefix)
+            else:
+                with open(target, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+        _chown(target)
+
+
+def apply_set_attributes(uuid_dir, song_abl_path, mset_restoreid, mset_restorecolor):
+    """Write the extended attributes Move expects on a set's UUID folder."""
+    last_modified_timestamp = datetime.fromtimestamp(
+        os.path.getmtime(song_abl_path), tz=timezone.utc
+    ).strftime('%Y-%m-%dT%H:%M:%SZ')
+    attrs = (
+        ("user.song-index", str(mset_restoreid)),
+        ("user.song-color", str(mset_restorecolor)),
+        ("user.last-modified-time", last_modified_timestamp),
+        ("user.was-externally-modified", "false"),
+        ("user.local-cloud-state", "notSynced"),
     )
+    for name, value in attrs:
+        os.setxattr(uuid_dir, name, value.encode("utf-8"))
+
 
-    with open(song_abl_path, "w", encoding="utf-8") as file:
-        file.write(content)
+def _rewrite_song_sample_uris(obj, uri_prefix):
+    """Rewrite relative ``sampleUri`` values of a parsed song in place."""
+    if isinstance(obj, dict):
+        for key, val in obj.items():
+            if key == "sampleUri" and isinstance(val, str) and val.startswith("Samples/"):
+                obj[key] = uri_prefix + val[len("Samples/"):]
+            else:
+                _rewrite_song_sample_uris(val, uri_prefix)
+    elif isinstance(obj, list):
+        for item in obj:
+            _rewrite_song_sample_uris(item, uri_prefix)
 
-    last_modified_timestamp = datetime.fromtimestamp(os.path.getmtime(song_abl_path), tz=timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+def _restore(mset_name, mset_restoreid, mset_restorecolor, populate, source=None, free_ids=None):
+    """Shared placement flow for bundles, raw sets and generated songs.
+
+    ``populate(mset_folder, uri_prefix)`` writes the set contents and must
+    leave a ``Song.abl`` behind.
+    """
+    error = validate_restore_target(mset_restoreid, mset_restorecolor, free_ids)
+    if error:
+        return {"success": False, "message": error}
+
+    uuid_dir = None
     try:
-        subprocess.run(["chown", "-R", "ableton:users", uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.song-index", "-v", str(mset_restoreid), uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.song-color", "-v", str(mset_restorecolor), uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.last-modified-time", "-v", last_modified_timestamp, uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.was-externally-modified", "-v", "false", uuid_dir], check=True)
-        subprocess.run(["setfattr", "-n", "user.local-cloud-state", "-v", "notSynced", uuid_dir], check=True)
-    except subprocess.CalledProcessError as e:
-        return {"success": False, "message": f"Error setting attributes: {e}"}
-
-    logging.info(f"Successfully restored {abl_path} to {uuid_dir}")
-    return {"success": True, "message": f"Successfully restored {mset_name} to pad {mset_restoreid}"}
+        mset_uuid, uuid_dir, mset_folder = _create_set_folder(mset_name)
+        populate(mset_folder, sample_uri_prefix(mset_uuid, mset_name))
+
+        song_abl_path = os.path.join(mset_folder, "Song.abl")
+        if not os.path.exists(song_abl_path):
+            raise RestoreError("Error: Song.abl file missing from bundle.")
+
+        try:
+            apply_set_attributes(uuid_dir, song_abl_path, mset_restoreid, mset_restorecolor)
+        except OSError as e:
+            raise RestoreError(f"Error setting attributes: {e}")
+    except Exception as e:
+        if uuid_dir and os.path.isdir(uuid_dir):
+            shutil.rmtree(uuid_dir, ignore_errors=True)
+        message = str(e) if isinstance(e, RestoreError) else f"Error restoring set: {e}"
+        return {"success": False, "message": message}
+    finally:
+        if uuid_dir:
+            set_registry.invalidate(os.path.basename(uuid_dir))
+
+    logging.info(f"Successfully restored {source or mset_name} to {uuid_dir}")
+    return {
+        "success": True,
+        "message": f"Successfully restored {mset_name} to pad {mset_restoreid}",
+        "path": song_abl_path,
+    }
+
+
+def place_song(song, mset_name, mset_restoreid, mset_restorecolor):
+    """Write an in-memory set straight into a new set folder on the device.
+
+    This is the direct counterpart of :func:`restore_ablbundle` for sets built
+    in Python: ``song`` is serialized once into its final ``Song.abl`` with
+    relative sample URIs redirected into the set folder, and the set
+    attributes are applied without an intermediate file or archive.
+
+    Args:
+        song (dict): Parsed ``Song.abl`` document. Sample URIs are rewritten
+            in place.
+        mset_name (str): Name of the set folder. A trailing ``.abl`` is dropped.
+        mset_restoreid (int): Pad index where the set should be placed.
+        mset_restorecolor (int): Color index assigned to the set.
+
+    Returns:
+        dict: Result of the operation, including success status, message and
+        the ``path`` of the written ``Song.abl`` on success.
+    """
+    if mset_name.endswith(".abl"):
+        mset_name = mset_name[:-len(".abl")]
+    if not mset_name or os.path.basename(mset_name) != mset_name or mset_name in (".", ".."):
+        return {"success": False, "message": f"Invalid set name: {mset_name}"}
+
+    def populate(mset_folder, uri_prefix):
+        _rewrite_song_sample_uris(song, uri_prefix)
+        song_abl_path = os.path.join(mset_folder, "Song.abl")
+        with open(song_abl_path, "w") as f:
+            json.dump(song, f, indent=2)
+        _chown(song_abl_path)
+
+    return _restore(mset_name, mset_restoreid, mset_restorecolor, populate)
+
+
+def restore_ablbundle(ablbundle_path, mset_restoreid, mset_restorecolor, free_ids=None):
+    """
+    Restores an Ableton Move set (.ablbundle) to a specified pad.
+
+    Archive members are extracted one by one with ownership applied as they
+    are written. ``Song.abl`` is streamed through :func:`rewrite_sample_uris`
+    so sample paths reference the samples inside the Move Set folder rather
+    than the global sample library on the Move.
+
+    Args:
+        ablbundle_path (str): Path to the uploaded .ablbundle file.
+        mset_restoreid (int): Pad index where the set should be restored.
+        mset_restorecolor (int): Color index (1-26) assigned to the set.
+        free_ids (list, optional): Pads already known to be free. Callers that
+            validated a whole plan up front pass it to skip the registry lookup.
+
+    Returns:
+        dict: Result of the operation, including success status and message.
+    """
+    if not os.path.exists(ablbundle_path):
+        return {"success": False, "message": f"Error: {ablbundle_path} does not exist."}
+
+    def populate(mset_folder, uri_prefix):
+        try:
+            with zipfile.ZipFile(ablbundle_path, 'r') as zip_ref:
+                _extract_bundle(zip_ref, mset_folder, uri_prefix)
+        except zipfile.BadZipFile:
+            raise RestoreError("Error: Invalid .ablbundle file.")
+
+    # Extract Move set name from filename
+    mset_name, _ = os.path.splitext(os.path.basename(ablbundle_path))
+    return _restore(mset_name, mset_restoreid, mset_restorecolor, populate, ablbundle_path, free_ids)
+
+
+def restore_abl(abl_path, mset_restoreid, mset_restorecolor, free_ids=None):
+    """Restore a raw Ableton set (.abl) to the device.
+
+    This mirrors :func:`restore_ablbundle` but operates on a single ``.abl`` file
+    instead of a zipped bundle.
+    """
+    if not os.path.exists(abl_path):
+        return {"success": False, "message": f"Error: {abl_path} does not exist."}
+
+    def populate(mset_folder, uri_prefix):
+        song_abl_path = os.path.join(mset_folder, "Song.abl")
+        try:
+            with open(abl_path, "r", encoding="utf-8", newline="") as src, \
+                    open(song_abl_path, "w", encoding="utf-8", newline="") as dst:
+                rewrite_sample_uris(src, dst, uri_prefix)
+        except OSError as e:
+            raise RestoreError(f"Error copying set file: {e}")
+        _chown(song_abl_path)
+
+    mset_name, _ = os.path.splitext(os.path.basename(abl_path))
+    return _restore(mset_name, mset_restoreid, mset_restorecolor, populate, abl_path, free_ids)
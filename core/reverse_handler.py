@@ -18,7 +18,7 @@ def get_wav_files(directory):
                 relative_path = os.path.relpath(os.path.join(root, file), directory)
                 audio_files.append(relative_path)
 
-    set_cache(cache_key, audio_files)
+    set_cache(cache_key, audio_files, paths=(directory,))
     return audio_files
 
 
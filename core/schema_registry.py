@@ -0,0 +1,115 @@
+"""Shared, memoized instrument parameter schemas.
+
+The Drift, Wavetable and MelodicSampler schemas in ``static/schemas`` are
+read on almost every editor and Set Inspector request.  :func:`load_schema`
+parses each file once and hands out the same dict until the file's
+``(st_mtime_ns, st_size)`` changes, so callers must treat it as read-only.
+Lookups derived from a schema are computed once per loaded version:
+
+* :func:`schema_ranges` – ``{name: {"min", "max", "unit"}}`` for numeric params
+* :func:`schema_enums` – ``{name: (option, ...)}`` for enum params
+* :func:`schema_json` – the schema serialized for embedding in a page
+
+The derived helpers accept any schema dict; only ones returned by
+:func:`load_schema` are memoized.
+"""
+
+import os
+import json
+import logging
+from threading import Lock
+from typing import Any, Callable, Dict, Tuple
+
+logger = logging.getLogger(__name__)
+
+# path -> {"stamp", "schema", "derived"}
+_schemas: Dict[str, Dict[str, Any]] = {}
+# id(schema) -> entry, for schemas handed out by load_schema
+_by_id: Dict[int, Dict[str, Any]] = {}
+_lock = Lock()
+
+
+def load_schema(path: str) -> Dict[str, Any]:
+    """Return the parsed schema at ``path`` or ``{}`` if it cannot be read."""
+    try:
+        st = os.stat(path)
+    except OSError as exc:
+        logger.warning("Could not load schema %s: %s", path, exc)
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _lock:
+        entry = _schemas.get(path)
+        if entry is not None and entry["stamp"] == stamp:
+            return entry["schema"]
+
+    try:
+        with open(path, "r") as f:
+            schema = json.load(f)
+    except Exception as exc:
+        logger.warning("Could not load schema %s: %s", path, exc)
+        return {}
+
+    entry = {"stamp": stamp, "schema": schema, "derived": {}}
+    with _lock:
+        old = _schemas.get(path)
+        if old is not None:
+            _by_id.pop(id(old["schema"]), None)
+        _schemas[path] = entry
+        _by_id[id(schema)] = entry
+    logger.debug("Loaded schema %s", path)
+    return schema
+
+
+def _derived(schema: Dict[str, Any], name: str, build: Callable[[Dict[str, Any]], Any]):
+    with _lock:
+        entry = _by_id.get(id(schema))
+        if entry is None or entry["schema"] is not schema:
+            entry = None
+        elif name in entry["derived"]:
+            return entry["derived"][name]
+    value = build(schema)
+    if entry is not None:
+        with _lock:
+            entry["derived"][name] = value
+    return value
+
+
+def _build_ranges(schema: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    ranges = {}
+    for name, info in schema.items():
+        if not isinstance(info, dict):
+            continue
+        min_v, max_v = info.get("min"), info.get("max")
+        if isinstance(min_v, (int, float)) and isinstance(max_v, (int, float)):
+            ranges[name] = {"min": float(min_v), "max": float(max_v), "unit": info.get("unit")}
+    return ranges
+
+
+def _build_enums(schema: Dict[str, Any]) -> Dict[str, Tuple[Any, ...]]:
+    return {
+        name: tuple(info.get("options") or ())
+        for name, info in schema.items()
+        if isinstance(info, dict) and info.get("type") == "enum"
+    }
+
+
+def schema_ranges(schema: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Return numeric ranges of ``schema``; do not mutate the result."""
+    return _derived(schema, "ranges", _build_ranges)
+
+
+def schema_enums(schema: Dict[str, Any]) -> Dict[str, Tuple[Any, ...]]:
+    """Return the option tuples of enum parameters in ``schema``."""
+    return _derived(schema, "enums", _build_enums)
+
+
+def schema_json(schema: Dict[str, Any]) -> str:
+    """Return ``json.dumps(schema)``."""
+    return _derived(schema, "json", json.dumps)
+
+
+def clear_schemas() -> None:
+    """Forget every loaded schema."""
+    with _lock:
+        _schemas.clear()
+        _by_id.clear()
@@ -1,42 +1,149 @@
+"""Backups of set files edited in the Set Inspector.
+
+Backups live in a ``backups`` folder next to ``Song.abl``.  Each snapshot is
+gzip-compressed and stored once under its SHA-256 in ``backups/objects``, so
+saving an unchanged set or going back and forth between versions costs no
+extra space.  ``backups/index.json`` lists the snapshots oldest first with
+their name, content hash and timestamps; listing, restoring and pruning only
+read the index.  Backup names keep the ``Song.abl.<timestamp>.ablbak`` form
+used by earlier releases, whose plain-copy backups are moved into the store
+the first time the index is needed.
+"""
+
 import os
-import shutil
+import gzip
+import json
+import hashlib
+import logging
+import threading
 from datetime import datetime
-from typing import Optional
+from typing import Any, Dict, List, Optional
+
+from core.atomic_write import write_atomic
+from core.song_cache import invalidate_song
+
+logger = logging.getLogger(__name__)
 
 BACKUP_EXT = '.ablbak'
+INDEX_NAME = 'index.json'
+OBJECTS_DIR = 'objects'
+
+# Snapshots kept per set.  Compressed JSON is around a tenth of the original
+# size, so this holds several times the history the old ten plain copies did.
+MAX_BACKUPS = 50
+# Backups shown in the Set Inspector.
+LIST_LIMIT = 10
+
+_lock = threading.RLock()
+
+
+def _backup_dir(set_path: str) -> str:
+    return os.path.join(os.path.dirname(set_path), 'backups')
+
+
+def _store_object(backup_dir: str, data: bytes) -> str:
+    """Store ``data`` compressed under its hash and return the hash."""
+    digest = hashlib.sha256(data).hexdigest()
+    objects = os.path.join(backup_dir, OBJECTS_DIR)
+    os.makedirs(objects, exist_ok=True)
+    path = os.path.join(objects, digest + '.gz')
+    if not os.path.isfile(path):
+        write_atomic(path, gzip.compress(data, compresslevel=6, mtime=0))
+    return digest
+
+
+def _read_object(backup_dir: str, digest: str) -> bytes:
+    with gzip.open(os.path.join(backup_dir, OBJECTS_DIR, digest + '.gz'), 'rb') as f:
+        return f.read()
+
+
+def _migrate_legacy(backup_dir: str) -> List[Dict[str, Any]]:
+    """Move plain ``.ablbak`` copies into the object store."""
+    names = sorted(
+        (f for f in os.listdir(backup_dir) if f.endswith(BACKUP_EXT)),
+        key=lambda f: os.path.getmtime(os.path.join(backup_dir, f)),
+    )
+    entries = []
+    for name in names:
+        path = os.path.join(backup_dir, name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        entries.append({
+            'name': name,
+            'hash': _store_object(backup_dir, data),
+            'size': len(data),
+            'mtime': os.path.getmtime(path),
+        })
+    return entries
+
+
+def _load_index(backup_dir: str) -> List[Dict[str, Any]]:
+    """Return the snapshot entries of ``backup_dir``, oldest first."""
+    index_path = os.path.join(backup_dir, INDEX_NAME)
+    if os.path.isfile(index_path):
+        try:
+            with open(index_path) as f:
+                return json.load(f)['backups']
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning("Rebuilding unreadable backup index %s: %s", index_path, e)
+    if not os.path.isdir(backup_dir):
+        return []
+    entries = _migrate_legacy(backup_dir)
+    if entries:
+        _save_index(backup_dir, entries)
+        for entry in entries:
+            os.remove(os.path.join(backup_dir, entry['name']))
+    return entries
+
+
+def _save_index(backup_dir: str, entries: List[Dict[str, Any]]) -> None:
+    data = json.dumps({'version': 1, 'backups': entries}, indent=1).encode('utf-8')
+    write_atomic(os.path.join(backup_dir, INDEX_NAME), data)
+
+
+def _prune(backup_dir: str, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drop entries beyond :data:`MAX_BACKUPS` and objects nothing refers to."""
+    dropped = entries[:-MAX_BACKUPS] if len(entries) > MAX_BACKUPS else []
+    if not dropped:
+        return entries
+    kept = entries[len(dropped):]
+    live = {e['hash'] for e in kept}
+    for digest in {e['hash'] for e in dropped} - live:
+        try:
+            os.remove(os.path.join(backup_dir, OBJECTS_DIR, digest + '.gz'))
+        except OSError:
+            pass
+    return kept
 
 
 def backup_set(set_path: str) -> str:
-    """Create a timestamped backup of the given set file and keep last 10.
+    """Store a snapshot of the given set file and return its backup name.
 
     This should be called **before** modifying the set so the previous
-    version can be restored. ``backup_set`` only creates the backup file and
+    version can be restored. ``backup_set`` only records the snapshot and
     does not alter ``latest.txt`` which tracks the timestamp of the current
     version.
     """
     if not os.path.isfile(set_path):
         raise FileNotFoundError(f"{set_path} not found")
 
-    backup_dir = os.path.join(os.path.dirname(set_path), 'backups')
+    backup_dir = _backup_dir(set_path)
     os.makedirs(backup_dir, exist_ok=True)
     timestamp = datetime.now().strftime('%Y%m%dT%H%M%S%f')
     backup_name = os.path.basename(set_path) + f'.{timestamp}' + BACKUP_EXT
-    backup_path = os.path.join(backup_dir, backup_name)
-    shutil.copy2(set_path, backup_path)
-
+    with open(set_path, 'rb') as f:
+        data = f.read()
 
-
-    backups = sorted(
-        [f for f in os.listdir(backup_dir) if f.endswith(BACKUP_EXT)],
-        key=lambda f: os.path.getmtime(os.path.join(backup_dir, f)),
-        reverse=True,
-    )
-    for old in backups[10:]:
-        try:
-            os.remove(os.path.join(backup_dir, old))
-        except Exception:
-            pass
-    return backup_path
+    with _lock:
+        entries = _load_index(backup_dir)
+        entries.append({
+            'name': backup_name,
+            'hash': _store_object(backup_dir, data),
+            'size': len(data),
+            'mtime': os.path.getmtime(set_path),
+        })
+        _save_index(backup_dir, _prune(backup_dir, entries))
+    return backup_name
 
 
 def write_latest_timestamp(set_path: str, timestamp: Optional[str] = None) -> None:
@@ -72,37 +179,43 @@ def get_current_timestamp(set_path: str) -> Optional[str]:
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
 
-def list_backups(set_path: str):
+def list_backups(set_path: str, limit: int = LIST_LIMIT):
     """Return a list of backups with display names sorted newest first."""
-    backup_dir = os.path.join(os.path.dirname(set_path), 'backups')
-    if not os.path.isdir(backup_dir):
-        return []
-    backups = sorted(
-        [f for f in os.listdir(backup_dir) if f.endswith(BACKUP_EXT)],
-        key=lambda f: os.path.getmtime(os.path.join(backup_dir, f)),
-        reverse=True,
-    )[:10]
+    with _lock:
+        entries = _load_index(_backup_dir(set_path))
     result = []
-    for name in backups:
-        path = os.path.join(backup_dir, name)
-        ts = datetime.fromtimestamp(os.path.getmtime(path)).strftime('%Y-%m-%d %H:%M:%S')
-        result.append({'name': name, 'display': ts})
+    for entry in reversed(entries[-limit:] if limit else entries):
+        ts = datetime.fromtimestamp(entry['mtime']).strftime('%Y-%m-%d %H:%M:%S')
+        result.append({'name': entry['name'], 'display': ts})
     return result
 
 
+def read_backup(set_path: str, backup_name: str) -> Optional[Dict[str, Any]]:
+    """Return ``{"name", "hash", "data"}`` for a backup or ``None``."""
+    backup_dir = _backup_dir(set_path)
+    with _lock:
+        entry = next((e for e in _load_index(backup_dir) if e['name'] == backup_name), None)
+        if entry is None:
+            return None
+        try:
+            data = _read_object(backup_dir, entry['hash'])
+        except OSError as e:
+            logger.error("Backup %s is unreadable: %s", backup_name, e)
+            return None
+    return {'name': backup_name, 'hash': entry['hash'], 'data': data}
+
+
 def restore_backup(set_path: str, backup_name: str) -> bool:
     """Restore the specified backup over the set file."""
-    backup_dir = os.path.join(os.path.dirname(set_path), "backups")
-    # Prevent path traversal by only allowing base names
-    if os.path.basename(backup_name) != backup_name:
-        return False
-    backup_path = os.path.join(backup_dir, backup_name)
-    if not os.path.isfile(backup_path):
+    backup = read_backup(set_path, backup_name)
+    if backup is None:
         return False
-    shutil.copy2(backup_path, set_path)
+    data = backup['data']
+    write_atomic(set_path, data)
+    # The file may be rewritten within the cached stamp's resolution
+    invalidate_song(set_path)
     # update latest timestamp to match restored backup
-    base = os.path.basename(backup_name)
-    parts = base.split(".")
+    parts = backup_name.split(".")
     if len(parts) >= 3:
         ts = parts[-2]
         write_latest_timestamp(set_path, ts)
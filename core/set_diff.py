@@ -0,0 +1,283 @@
+"""Compare two versions of a set at track, clip, note and envelope level.
+
+Used by the Set Inspector to preview what changed since a backup before
+restoring it.  Every clip is reduced to a digest first so clips that did not
+change are skipped without looking at their notes; only the remaining clips
+get a note and envelope delta.  Parsed backups and clip digests are cached
+(backups are immutable and keyed by their content hash) so moving through the
+backup dropdown stays cheap.
+"""
+
+import json
+import hashlib
+import logging
+from collections import Counter, OrderedDict
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.set_backup_handler import read_backup
+from core.song_cache import load_song
+
+logger = logging.getLogger(__name__)
+
+# Parsed backups and per-document clip digests kept in memory.
+MAX_CACHED = 4
+# Notes listed per side in a clip delta; counts are always complete.
+MAX_LISTED_NOTES = 50
+
+_backups: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_digests: "OrderedDict[int, Tuple[Dict[str, Any], Dict[Tuple[int, int], str]]]" = OrderedDict()
+_lock = Lock()
+
+
+def _remember(cache: OrderedDict, key, value) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > MAX_CACHED:
+        cache.popitem(last=False)
+
+
+def _digest(obj: Any) -> str:
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def clip_digests(song: Dict[str, Any]) -> Dict[Tuple[int, int], str]:
+    """Return ``{(track, clip): digest}`` for every clip in ``song``."""
+    with _lock:
+        cached = _digests.get(id(song))
+        if cached is not None and cached[0] is song:
+            _digests.move_to_end(id(song))
+            return cached[1]
+    digests = {}
+    for ti, track in enumerate(song.get("tracks", [])):
+        for ci, slot in enumerate(track.get("clipSlots", [])):
+            clip = slot.get("clip")
+            if clip:
+                digests[(ti, ci)] = _digest(clip)
+    with _lock:
+        # Keep the document alive so its id cannot be reused while cached
+        _remember(_digests, id(song), (song, digests))
+    return digests
+
+
+def _clip(song: Dict[str, Any], track: int, clip: int) -> Dict[str, Any]:
+    return song["tracks"][track]["clipSlots"][clip]["clip"]
+
+
+def _note_key(note: Dict[str, Any]) -> Tuple[int, float]:
+    return note.get("noteNumber"), round(float(note.get("startTime", 0.0)), 6)
+
+
+def _full_key(note: Dict[str, Any]) -> str:
+    return json.dumps(note, sort_keys=True)
+
+
+def diff_notes(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Return the note delta between two note lists.
+
+    Identical notes are ignored.  A remaining note at the same pitch and start
+    counts as ``modified``; one with the same pitch and duration at another
+    start counts as ``moved`` (matched to the nearest start); the rest are
+    ``added`` or ``removed``.
+    """
+    counts = Counter(_full_key(n) for n in old)
+    counts.subtract(_full_key(n) for n in new)
+    old_left = []
+    for n in old:
+        key = _full_key(n)
+        if counts[key] > 0:
+            counts[key] -= 1
+            old_left.append(n)
+    counts = Counter(_full_key(n) for n in new)
+    counts.subtract(_full_key(n) for n in old)
+    new_left = []
+    for n in new:
+        key = _full_key(n)
+        if counts[key] > 0:
+            counts[key] -= 1
+            new_left.append(n)
+
+    modified = []
+    by_pos: Dict[Tuple[int, float], List[Dict[str, Any]]] = {}
+    for n in old_left:
+        by_pos.setdefault(_note_key(n), []).append(n)
+    unmatched_new = []
+    for n in new_left:
+        candidates = by_pos.get(_note_key(n))
+        if candidates:
+            modified.append({"from": candidates.pop(), "to": n})
+        else:
+            unmatched_new.append(n)
+    unmatched_old = [n for group in by_pos.values() for n in group]
+
+    moved = []
+    by_shape: Dict[Tuple[Any, float], List[Dict[str, Any]]] = {}
+    for n in unmatched_old:
+        shape = (n.get("noteNumber"), round(float(n.get("duration", 0.0)), 6))
+        by_shape.setdefault(shape, []).append(n)
+    added = []
+    for n in unmatched_new:
+        shape = (n.get("noteNumber"), round(float(n.get("duration", 0.0)), 6))
+        candidates = by_shape.get(shape)
+        if candidates:
+            start = float(n.get("startTime", 0.0))
+            best = min(candidates, key=lambda c: abs(float(c.get("startTime", 0.0)) - start))
+            candidates.remove(best)
+            moved.append({"from": best, "to": n})
+        else:
+            added.append(n)
+    removed = [n for group in by_shape.values() for n in group]
+
+    return {
+        "counts": {
+            "added": len(added),
+            "removed": len(removed),
+            "moved": len(moved),
+            "modified": len(modified),
+        },
+        "added": added[:MAX_LISTED_NOTES],
+        "removed": removed[:MAX_LISTED_NOTES],
+        "moved": moved[:MAX_LISTED_NOTES],
+        "modified": modified[:MAX_LISTED_NOTES],
+    }
+
+
+def diff_envelopes(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, List[Any]]:
+    """Return parameter ids whose envelopes were added, removed or changed."""
+    old_map = {e.get("parameterId"): e.get("breakpoints", []) for e in old}
+    new_map = {e.get("parameterId"): e.get("breakpoints", []) for e in new}
+    return {
+        "added": [pid for pid in new_map if pid not in old_map],
+        "removed": [pid for pid in old_map if pid not in new_map],
+        "changed": [pid for pid in new_map if pid in old_map and new_map[pid] != old_map[pid]],
+    }
+
+
+def _plural(count: int, word: str) -> str:
+    return f"{count} {word}{'s' if count != 1 else ''}"
+
+
+def _clip_summary(label: str, delta: Dict[str, Any]) -> str:
+    if delta["status"] != "changed":
+        return f"{label} {delta['status']}"
+    parts = []
+    counts = delta["notes"]["counts"]
+    for kind in ("moved", "added", "removed", "modified"):
+        if counts[kind]:
+            parts.append(f"{_plural(counts[kind], 'note')} {kind}")
+    env = delta["envelopes"]
+    for kind in ("changed", "added", "removed"):
+        if env[kind]:
+            parts.append(f"{_plural(len(env[kind]), 'envelope')} {kind}")
+    if delta["region_changed"]:
+        parts.append("region/loop changed")
+    if delta["other_changed"]:
+        parts.append("settings changed")
+    return f"{label}, " + ", ".join(parts)
+
+
+def diff_songs(old: Dict[str, Any], new: Dict[str, Any]) -> Dict[str, Any]:
+    """Compare two parsed sets.
+
+    Returns:
+        dict: ``{"summary", "tracks", "clips", "unchanged_clips"}``.
+        ``summary`` is a list of short human readable lines; ``clips`` holds
+        a delta per changed clip with 0-based ``track``/``clip`` indices.
+    """
+    old_digests, new_digests = clip_digests(old), clip_digests(new)
+    summary = []
+    tracks = []
+    old_tracks, new_tracks = old.get("tracks", []), new.get("tracks", [])
+    for ti in range(max(len(old_tracks), len(new_tracks))):
+        if ti >= len(old_tracks):
+            tracks.append({"track": ti, "status": "added"})
+        elif ti >= len(new_tracks):
+            tracks.append({"track": ti, "status": "removed"})
+        else:
+            o, n = old_tracks[ti], new_tracks[ti]
+            changes = []
+            if o.get("name") != n.get("name"):
+                changes.append("renamed")
+            if o.get("devices") is not n.get("devices") and o.get("devices") != n.get("devices"):
+                changes.append("devices changed")
+            if changes:
+                tracks.append({"track": ti, "status": "changed", "changes": changes})
+    for t in tracks:
+        detail = ", ".join(t.get("changes", [])) or t["status"]
+        summary.append(f"track {t['track'] + 1} {detail}")
+
+    clips = []
+    unchanged = 0
+    for key in sorted(set(old_digests) | set(new_digests)):
+        before, after = old_digests.get(key), new_digests.get(key)
+        if before == after:
+            unchanged += 1
+            continue
+        ti, ci = key
+        delta: Dict[str, Any] = {"track": ti, "clip": ci}
+        if before is None:
+            delta["status"] = "added"
+            delta["name"] = _clip(new, ti, ci).get("name")
+        elif after is None:
+            delta["status"] = "removed"
+            delta["name"] = _clip(old, ti, ci).get("name")
+        else:
+            o, n = _clip(old, ti, ci), _clip(new, ti, ci)
+            delta["status"] = "changed"
+            delta["name"] = n.get("name")
+            delta["notes"] = diff_notes(o.get("notes", []), n.get("notes", []))
+            delta["envelopes"] = diff_envelopes(o.get("envelopes", []), n.get("envelopes", []))
+            delta["region_changed"] = o.get("region") != n.get("region")
+            rest = ("notes", "envelopes", "region")
+            delta["other_changed"] = (
+                {k: v for k, v in o.items() if k not in rest}
+                != {k: v for k, v in n.items() if k not in rest}
+            )
+        label = f"clip {ti + 1}:{ci + 1}"
+        if delta.get("name"):
+            label += f" ({delta['name']})"
+        delta["summary"] = _clip_summary(label, delta)
+        summary.append(delta["summary"])
+        clips.append(delta)
+
+    return {"summary": summary, "tracks": tracks, "clips": clips, "unchanged_clips": unchanged}
+
+
+def _load_backup(set_path: str, backup_name: str) -> Optional[Dict[str, Any]]:
+    backup = read_backup(set_path, backup_name)
+    if backup is None:
+        return None
+    with _lock:
+        song = _backups.get(backup["hash"])
+        if song is not None:
+            _backups.move_to_end(backup["hash"])
+            return song
+    song = json.loads(backup["data"])
+    with _lock:
+        _remember(_backups, backup["hash"], song)
+    return song
+
+
+def diff_backup(set_path: str, backup_name: str, other: Optional[str] = None) -> Dict[str, Any]:
+    """Describe what changed between a backup and the current set.
+
+    ``other`` names a second backup to compare against instead of the
+    current version.
+    """
+    try:
+        old = _load_backup(set_path, backup_name)
+        if old is None:
+            return {"success": False, "message": f"Backup {backup_name} not found"}
+        if other:
+            new = _load_backup(set_path, other)
+            if new is None:
+                return {"success": False, "message": f"Backup {other} not found"}
+        else:
+            new = load_song(set_path)
+        result = diff_songs(old, new)
+    except Exception as e:
+        logger.error("Failed to diff %s against %s: %s", set_path, backup_name, e)
+        return {"success": False, "message": f"Failed to compare versions: {e}"}
+    message = "No differences" if not result["summary"] else f"{_plural(len(result['clips']), 'clip')} changed"
+    return dict(result, success=True, message=message)
@@ -0,0 +1,120 @@
+"""Stream a Move set off the device as an ``.ablbundle``.
+
+The bundle is produced by :func:`iter_set_bundle` chunk by chunk: a
+``zipfile.ZipFile`` writes into an unseekable sink (so members use data
+descriptors and nothing is buffered on disk), and the sink is drained after
+every write.  ``Song.abl`` is streamed through
+:func:`core.restore_handler.iter_rewritten_sample_uris` so absolute
+``ableton:/user-library/Sets/...`` sample URIs become relative ``Samples/``
+paths again, which is what :func:`core.restore_handler.restore_ablbundle`
+expects.  Referenced samples are then stored uncompressed.
+"""
+
+import io
+import os
+import re
+import logging
+import zipfile
+import urllib.parse
+from typing import Iterator, List, Optional
+
+from core.restore_handler import iter_rewritten_sample_uris, set_sample_uri_pattern
+from core.set_registry import set_registry, song_path_for
+
+logger = logging.getLogger(__name__)
+
+# Relative references left after the rewrite; group 1 is the quoted path.
+_RELATIVE_SAMPLE_RE = re.compile(r'\"sampleUri\"\s*:\s*\"Samples/([^"]+)\"')
+
+_COPY_CHUNK = 256 * 1024
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, unseekable buffer drained by the export generator."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _sample_path(mset_folder: str, quoted: str) -> Optional[str]:
+    """Map a relative sample URI to a file inside ``mset_folder``."""
+    parts = [p for p in urllib.parse.unquote(quoted).split("/") if p not in ("", ".", "..")]
+    if not parts:
+        return None
+    path = os.path.join(mset_folder, "Samples", *parts)
+    return path if os.path.isfile(path) else None
+
+
+def iter_set_bundle(song_path: str) -> Iterator[bytes]:
+    """Yield an ``.ablbundle`` zip for the set whose ``Song.abl`` is ``song_path``."""
+    sink = _ChunkSink()
+    for _ in _write_bundle(song_path, sink):
+        data = sink.drain()
+        if data:
+            yield data
+
+
+def _write_bundle(song_path: str, sink: _ChunkSink) -> Iterator[None]:
+    """Write the bundle into ``sink``, pausing after each member write."""
+    mset_folder = os.path.dirname(song_path)
+    uri_re = set_sample_uri_pattern(os.path.basename(os.path.dirname(mset_folder)))
+    referenced = {}
+    with zipfile.ZipFile(sink, "w") as zf:
+        info = zipfile.ZipInfo.from_file(song_path, "Song.abl")
+        info.compress_type = zipfile.ZIP_DEFLATED
+        with open(song_path, "r", encoding="utf-8") as src, zf.open(info, "w") as member:
+            for piece in iter_rewritten_sample_uris(src, "Samples/", uri_re):
+                for match in _RELATIVE_SAMPLE_RE.finditer(piece):
+                    referenced.setdefault(match.group(1), None)
+                member.write(piece.encode("utf-8"))
+                yield
+
+        for quoted in referenced:
+            path = _sample_path(mset_folder, quoted)
+            if path is None:
+                logger.warning("Referenced sample %s missing from %s", quoted, mset_folder)
+                continue
+            arcname = os.path.relpath(path, mset_folder).replace(os.sep, "/")
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED
+            with open(path, "rb") as src, zf.open(info, "w") as member:
+                while True:
+                    chunk = src.read(_COPY_CHUNK)
+                    if not chunk:
+                        break
+                    member.write(chunk)
+                    yield
+    yield
+
+
+def export_set(mset_uuid: str):
+    """Look up a set by folder UUID for export.
+
+    Returns:
+        dict: ``{"success", "message"}`` plus ``"filename"`` and ``"stream"``
+        (an iterator of zip bytes) on success.
+    """
+    entry = set_registry.snapshot().by_uuid(mset_uuid)
+    if entry is None:
+        return {"success": False, "message": f"Set {mset_uuid} not found"}
+    song_path = song_path_for(entry)
+    if not os.path.isfile(song_path):
+        return {"success": False, "message": f"Song.abl missing for set {entry['mset_name']}"}
+    return {
+        "success": True,
+        "message": f"Exporting {entry['mset_name']}",
+        "filename": f"{entry['mset_name']}.ablbundle",
+        "stream": iter_set_bundle(song_path),
+    }
@@ -1,8 +1,11 @@
-import json
 import os
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 from core.set_backup_handler import backup_set, write_latest_timestamp
+from core.song_cache import load_song, load_clip, clip_for_update, save_song, song_version, track_value
+from core import set_writer
+from core.envelope_simplify import envelope_tolerance, simplify_breakpoints, simplify_envelopes
+from core.schema_registry import schema_ranges
 from core.synth_preset_inspector_handler import (
     load_drift_schema,
     load_wavetable_schema,
@@ -23,26 +26,29 @@ def _collect_param_ids(
     mapping: Dict[int, str],
     context: Dict[int, str],
     prefix: str = "Track",
+    pad_counter: Optional[List[int]] = None,
 ) -> None:
     """Recursively collect parameter identifiers from a device tree.
 
     ``mapping`` maps ``parameterId`` integers to their display names while
     ``context`` stores the track or pad name where the parameter originated.
-    Drum rack pads are automatically numbered to provide meaningful context.
+    Drum rack pads are automatically numbered to provide meaningful context;
+    ``pad_counter`` carries the next pad number through one walk.
     """
+    if pad_counter is None:
+        pad_counter = [1]
     if isinstance(obj, dict):
         if obj.get("kind") == "drumCell":
-            pad_num = _collect_param_ids.pad_counter[0]
-            _collect_param_ids.pad_counter[0] += 1
-            prefix = f"Pad{pad_num}"
+            prefix = f"Pad{pad_counter[0]}"
+            pad_counter[0] += 1
         for key, val in obj.items():
             if isinstance(val, dict) and "id" in val and isinstance(val["id"], int):
                 mapping[val["id"]] = val.get("customName") or key
                 context[val["id"]] = prefix
-            _collect_param_ids(val, mapping, context, prefix)
+            _collect_param_ids(val, mapping, context, prefix, pad_counter)
     elif isinstance(obj, list):
         for item in obj:
-            _collect_param_ids(item, mapping, context, prefix)
+            _collect_param_ids(item, mapping, context, prefix, pad_counter)
 
 
 def _track_display_name(track_obj: Dict[str, Any], idx: int) -> str:
@@ -101,11 +107,53 @@ def _truncate_overlap_notes(notes: List[Dict[str, Any]]) -> List[Dict[str, Any]]
     return result
 
 
+def track_param_map(set_path: str, track: int, devices: Any) -> Dict[str, Any]:
+    """Return the parameter map of track ``track`` of ``set_path``.
+
+    ``devices`` is the track's device tree.  The map is cached with the set
+    by :func:`core.song_cache.track_value`, so clip edits and partial clip
+    reads reuse it.  It holds ``names`` and ``context`` (``parameterId`` to
+    display name and to ``"Track"``/``"PadN"``) and ``drum`` (whether the tree
+    contains a drum rack).  It is shared between callers; do not modify it.
+    """
+    def build() -> Dict[str, Any]:
+        names: Dict[int, str] = {}
+        context: Dict[int, str] = {}
+        _collect_param_ids(devices, names, context)
+        return {
+            "names": names,
+            "context": context,
+            "drum": _contains_drum_rack(devices),
+            "ranges": (None, {}),
+        }
+
+    return track_value(set_path, track, "param_map", build)
+
+
+def _param_ranges(info: Dict[str, Any]) -> Dict[int, Dict[str, Any]]:
+    """Return ``parameterId`` ranges for a :func:`track_param_map` result."""
+    schemas = []
+    for loader in (load_drift_schema, load_wavetable_schema, load_melodic_sampler_schema):
+        try:
+            schemas.append(loader() or {})
+        except Exception:
+            schemas.append({})
+    # The registry hands out the same schema dicts until a file changes
+    cached_schemas, ranges = info["ranges"]
+    if cached_schemas is not None and all(a is b for a, b in zip(cached_schemas, schemas)):
+        return ranges
+    by_name: Dict[str, Dict[str, Any]] = {}
+    for schema in schemas:
+        by_name.update(schema_ranges(schema))
+    ranges = {pid: by_name[name] for pid, name in info["names"].items() if name in by_name}
+    info["ranges"] = (tuple(schemas), ranges)
+    return ranges
+
+
 def list_clips(set_path: str) -> Dict[str, Any]:
     """Return list of clips in the set."""
     try:
-        with open(set_path, "r") as f:
-            song = json.load(f)
+        song = load_song(set_path)
         clips = []
         tracks = song.get("tracks", [])
         for ti, track in enumerate(tracks):
@@ -123,12 +171,11 @@ def list_clips(set_path: str) -> Dict[str, Any]:
 def get_clip_data(set_path: str, track: int, clip: int) -> Dict[str, Any]:
     """Return notes and envelopes for the specified clip."""
     try:
-        with open(set_path, "r") as f:
-            song = json.load(f)
-        track_obj = song["tracks"][track]
-        clip_obj = track_obj["clipSlots"][clip]["clip"]
+        track_obj, clip_obj = load_clip(set_path, track, clip)
         notes = clip_obj.get("notes", [])
-        envelopes = clip_obj.get("envelopes", [])
+        # Envelopes get display ranges attached below; copy them so the
+        # cached document stays untouched.
+        envelopes = [dict(env) for env in clip_obj.get("envelopes", [])]
         region_info = clip_obj.get("region", {})
         region_end = region_info.get("end", 4.0)
         loop_info = region_info.get("loop", {})
@@ -138,33 +185,11 @@ def get_clip_data(set_path: str, track: int, clip: int) -> Dict[str, Any]:
         region_length = region_end
         track_name = _track_display_name(track_obj, track)
         clip_name = clip_obj.get("name") or f"Clip {clip + 1}"
-        drum_track = _contains_drum_rack(track_obj.get("devices", []))
-        param_map: Dict[int, str] = {}
-        param_context: Dict[int, str] = {}
-        _collect_param_ids.pad_counter = [1]
-        _collect_param_ids(track_obj.get("devices", []), param_map, param_context)
-
-        # Load parameter metadata from available instrument schemas
-        schemas: Dict[str, Dict[str, Any]] = {}
-        for loader in (load_drift_schema, load_wavetable_schema, load_melodic_sampler_schema):
-            try:
-                schemas.update(loader() or {})
-            except Exception:
-                pass
-
-        param_ranges: Dict[int, Dict[str, float]] = {}
-        for pid, name in param_map.items():
-            info = schemas.get(name)
-            if not info:
-                continue
-            min_v = info.get("min")
-            max_v = info.get("max")
-            if isinstance(min_v, (int, float)) and isinstance(max_v, (int, float)):
-                param_ranges[pid] = {
-                    "min": float(min_v),
-                    "max": float(max_v),
-                    "unit": info.get("unit"),
-                }
+        info = track_param_map(set_path, track, track_obj.get("devices", []))
+        drum_track = info["drum"]
+        param_map: Dict[int, str] = info["names"]
+        param_context: Dict[int, str] = info["context"]
+        param_ranges = _param_ranges(info)
 
         # Attach range and domain info to envelopes
         for env in envelopes:
@@ -198,40 +223,60 @@ def get_clip_data(set_path: str, track: int, clip: int) -> Dict[str, Any]:
             "track_name": track_name,
             "clip_name": clip_name,
             "is_drum_track": drum_track,
+            "version": song_version(set_path),
         }
     except Exception as e:
         return {"success": False, "message": f"Failed to read clip: {e}"}
 
 
+def _write_song(set_path: str, song: Dict[str, Any], defer: bool) -> None:
+    """Persist an edited document, either now or through the write-behind buffer."""
+    if defer:
+        set_writer.stage(set_path, song)
+        return
+    backup_set(set_path)
+    save_song(set_path, song)
+    write_latest_timestamp(set_path)
+
+
 def save_envelope(
     set_path: str,
     track: int,
     clip: int,
     parameter_id: int,
     breakpoints: List[Dict[str, float]],
+    defer: bool = False,
+    tolerance: Optional[float] = None,
 ) -> Dict[str, Any]:
-    """Update or create an envelope and write the set back to disk."""
-    try:
-        with open(set_path, "r") as f:
-            song = json.load(f)
+    """Update or create an envelope and write the set back to disk.
 
-        clip_obj = (
-            song["tracks"][track]["clipSlots"][clip]["clip"]
-        )
-        envelopes = clip_obj.setdefault("envelopes", [])
-        for env in envelopes:
+    With ``defer`` the write goes through :mod:`core.set_writer`.  A
+    ``tolerance`` (fraction of the parameter's range) simplifies the
+    breakpoints first; see :mod:`core.envelope_simplify`.
+    """
+    try:
+        song, track_obj, clip_obj = clip_for_update(load_song(set_path), track, clip)
+        removed = 0
+        if tolerance is not None:
+            ranges = _param_ranges(track_param_map(set_path, track, track_obj.get("devices", [])))
+            breakpoints, removed = simplify_breakpoints(
+                breakpoints, envelope_tolerance(breakpoints, tolerance, ranges.get(parameter_id))
+            )
+        envelopes = list(clip_obj.get("envelopes", []))
+        for i, env in enumerate(envelopes):
             if env.get("parameterId") == parameter_id:
-                env["breakpoints"] = breakpoints
+                envelopes[i] = dict(env, breakpoints=breakpoints)
                 break
         else:
             envelopes.append({"parameterId": parameter_id, "breakpoints": breakpoints})
+        clip_obj["envelopes"] = envelopes
 
-        backup_set(set_path)
-        with open(set_path, "w") as f:
-            json.dump(song, f, indent=2)
-        write_latest_timestamp(set_path)
+        _write_song(set_path, song, defer)
 
-        return {"success": True, "message": "Envelope saved"}
+        message = "Envelope saved"
+        if removed:
+            message += f" ({removed} breakpoints simplified away)"
+        return {"success": True, "message": message, "removed_points": removed}
     except Exception as e:
         return {"success": False, "message": f"Failed to save envelope: {e}"}
 
@@ -245,40 +290,208 @@ def save_clip(
     region_end: float,
     loop_start: float,
     loop_end: float,
+    defer: bool = False,
+    tolerance: Optional[float] = None,
 ) -> Dict[str, Any]:
-    """Replace notes/envelopes and update region/loop settings."""
-    try:
-        with open(set_path, "r") as f:
-            song = json.load(f)
+    """Replace notes/envelopes and update region/loop settings.
 
-        track_obj = song["tracks"][track]
-        clip_obj = track_obj["clipSlots"][clip]["clip"]
+    With ``defer`` the write goes through :mod:`core.set_writer`.  A
+    ``tolerance`` (fraction of each parameter's range) simplifies the
+    envelopes whose breakpoints differ from the stored ones; see
+    :mod:`core.envelope_simplify`.
+    """
+    try:
+        song, track_obj, clip_obj = clip_for_update(load_song(set_path), track, clip)
+        info = track_param_map(set_path, track, track_obj.get("devices", []))
 
-        if _contains_drum_rack(track_obj.get("devices", [])):
+        if info["drum"]:
             notes = _truncate_overlap_notes(notes)
 
         clip_obj["notes"] = notes
         for env in envelopes:
             for key in ("rangeMin", "rangeMax", "domainMin", "domainMax", "unit"):
                 env.pop(key, None)
+        removed = 0
+        if tolerance is not None:
+            # Only simplify what was edited; recorded automation is left alone
+            stored = {e.get("parameterId"): e.get("breakpoints") for e in clip_obj.get("envelopes", [])}
+            edited = [
+                i for i, env in enumerate(envelopes)
+                if env.get("breakpoints") != stored.get(env.get("parameterId"))
+            ]
+            simplified, removed = simplify_envelopes(
+                [envelopes[i] for i in edited], tolerance, _param_ranges(info)
+            )
+            envelopes = list(envelopes)
+            for i, env in zip(edited, simplified):
+                envelopes[i] = env
         clip_obj["envelopes"] = envelopes
-        region_info = clip_obj.setdefault("region", {})
+        region_info = dict(clip_obj.get("region", {}))
         region_info["start"] = region_info.get("start", 0.0)
         region_info["end"] = region_end
-        loop_info = region_info.get("loop", {})
+        loop_info = dict(region_info.get("loop", {}))
         loop_info["start"] = loop_start
         loop_info["end"] = loop_end
         region_info["loop"] = loop_info
+        clip_obj["region"] = region_info
 
-        backup_set(set_path)
-        with open(set_path, "w") as f:
-            json.dump(song, f, indent=2)
-        write_latest_timestamp(set_path)
+        _write_song(set_path, song, defer)
 
-        return {"success": True, "message": "Clip saved"}
+        message = "Clip saved"
+        if removed:
+            message += f" ({removed} envelope breakpoints simplified away)"
+        return {"success": True, "message": message, "removed_points": removed}
     except Exception as e:
         return {"success": False, "message": f"Failed to save clip: {e}"}
 
+# Tolerance used when matching a note's ``startTime`` against a patch key.
+_TIME_EPSILON = 1e-6
+
+
+def _note_matches(note: Dict[str, Any], key: Dict[str, Any]) -> bool:
+    return (
+        note.get("noteNumber") == key.get("noteNumber")
+        and abs(float(note.get("startTime", 0.0)) - float(key.get("startTime", 0.0))) < _TIME_EPSILON
+    )
+
+
+def _find_note(notes: List[Dict[str, Any]], key: Dict[str, Any]) -> int:
+    for idx, note in enumerate(notes):
+        if _note_matches(note, key):
+            return idx
+    raise ValueError(f"Note {key.get('noteNumber')}@{key.get('startTime')} not found")
+
+
+def _truncate_pitches(notes: List[Dict[str, Any]], pitches: set) -> List[Dict[str, Any]]:
+    """Run :func:`_truncate_overlap_notes` on ``pitches`` only, keeping order.
+
+    Affected notes are copied first because the truncation edits durations in
+    place and the originals may be shared with the cached document.
+    """
+    copies = {id(n): dict(n) for n in notes if n.get("noteNumber") in pitches}
+    if not copies:
+        return notes
+    kept = {id(n) for n in _truncate_overlap_notes(list(copies.values()))}
+    result = []
+    for n in notes:
+        copy = copies.get(id(n))
+        if copy is None:
+            result.append(n)
+        elif id(copy) in kept:
+            result.append(copy)
+    return result
+
+
+def patch_clip(
+    set_path: str,
+    track: int,
+    clip: int,
+    ops: List[Dict[str, Any]],
+    version: str = None,
+    defer: bool = False,
+    tolerance: Optional[float] = None,
+) -> Dict[str, Any]:
+    """Apply incremental note/envelope edits to a clip.
+
+    ``ops`` is a list of operations applied in order:
+
+    * ``{"op": "add", "note": {...}}``
+    * ``{"op": "remove", "key": {"noteNumber", "startTime"}}``
+    * ``{"op": "modify", "key": {...}, "changes": {...}}``
+    * ``{"op": "set_envelope", "parameterId": id, "breakpoints": [...]}``
+    * ``{"op": "remove_envelope", "parameterId": id}``
+    * ``{"op": "region", "end": 8.0, "loop_start": 0.0, "loop_end": 8.0}``
+
+    Notes are identified by pitch and start time. When ``version`` is given
+    and no longer matches the current set the patch is rejected with
+    ``conflict`` set so the client can reload. ``defer`` and ``tolerance``
+    behave as in :func:`save_clip`; the tolerance applies to the breakpoints
+    of ``set_envelope`` operations.
+    """
+    try:
+        current = song_version(set_path)
+        if version is not None and version != current:
+            return {
+                "success": False,
+                "conflict": True,
+                "message": "Set was modified elsewhere; reload the clip",
+                "version": current,
+            }
+
+        song, track_obj, clip_obj = clip_for_update(load_song(set_path), track, clip)
+        notes = list(clip_obj.get("notes", []))
+        envelopes = list(clip_obj.get("envelopes", []))
+        affected: set = set()
+        removed = 0
+
+        for op in ops:
+            kind = op.get("op")
+            if kind == "add":
+                note = dict(op["note"])
+                notes.append(note)
+                affected.add(note.get("noteNumber"))
+            elif kind == "remove":
+                notes.pop(_find_note(notes, op["key"]))
+            elif kind == "modify":
+                idx = _find_note(notes, op["key"])
+                affected.add(notes[idx].get("noteNumber"))
+                notes[idx] = dict(notes[idx], **op.get("changes", {}))
+                affected.add(notes[idx].get("noteNumber"))
+            elif kind == "set_envelope":
+                pid = op["parameterId"]
+                breakpoints = op.get("breakpoints", [])
+                if tolerance is not None:
+                    ranges = _param_ranges(track_param_map(set_path, track, track_obj.get("devices", [])))
+                    breakpoints, count = simplify_breakpoints(
+                        breakpoints, envelope_tolerance(breakpoints, tolerance, ranges.get(pid))
+                    )
+                    removed += count
+                env = {"parameterId": pid, "breakpoints": breakpoints}
+                for i, existing in enumerate(envelopes):
+                    if existing.get("parameterId") == pid:
+                        envelopes[i] = dict(existing, breakpoints=env["breakpoints"])
+                        break
+                else:
+                    envelopes.append(env)
+            elif kind == "remove_envelope":
+                envelopes = [e for e in envelopes if e.get("parameterId") != op["parameterId"]]
+            elif kind == "region":
+                region_info = dict(clip_obj.get("region", {}))
+                region_info["start"] = region_info.get("start", 0.0)
+                region_info["end"] = float(op.get("end", region_info.get("end", 4.0)))
+                loop_info = dict(region_info.get("loop", {}))
+                if "loop_start" in op:
+                    loop_info["start"] = float(op["loop_start"])
+                if "loop_end" in op:
+                    loop_info["end"] = float(op["loop_end"])
+                region_info["loop"] = loop_info
+                clip_obj["region"] = region_info
+            else:
+                raise ValueError(f"Unknown operation: {kind}")
+
+        if affected and track_param_map(set_path, track, track_obj.get("devices", []))["drum"]:
+            notes = _truncate_pitches(notes, affected)
+
+        clip_obj["notes"] = notes
+        clip_obj["envelopes"] = envelopes
+
+        _write_song(set_path, song, defer)
+
+        message = f"Applied {len(ops)} change{'s' if len(ops) != 1 else ''}"
+        if removed:
+            message += f" ({removed} envelope breakpoints simplified away)"
+        return {
+            "success": True,
+            "message": message,
+            "removed_points": removed,
+            "version": song_version(set_path),
+        }
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        return {"success": False, "message": f"Invalid patch: {e}"}
+    except Exception as e:
+        return {"success": False, "message": f"Failed to patch clip: {e}"}
+
+
 def is_read_only(set_path: str) -> bool:
     """Return True if ``set_path`` is not writable."""
     try:
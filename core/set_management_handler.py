@@ -5,6 +5,7 @@ import mido
 from typing import Dict, List, Any, Optional
 
 from core.utils import load_set_template
+from core.restore_handler import place_song
 
 def create_set(set_name):
     """
@@ -86,7 +87,13 @@ def generate_c_major_chord_example(set_name: str, tempo: float = 120.0) -> Dict[
         }
 
 
-def generate_midi_set_from_file(set_name: str, midi_file_path: str, tempo: float = None) -> Dict[str, Any]:
+def generate_midi_set_from_file(
+    set_name: str,
+    midi_file_path: str,
+    tempo: float = None,
+    pad_index: Optional[int] = None,
+    pad_color: int = 1,
+) -> Dict[str, Any]:
     """
     Generate an Ableton Live set from an uploaded MIDI file.
     
@@ -94,6 +101,10 @@ def generate_midi_set_from_file(set_name: str, midi_file_path: str, tempo: float
         set_name: Name for the new set
         midi_file_path: Path to the uploaded MIDI file
         tempo: Tempo in BPM (if None, will try to detect from MIDI or use 120)
+        pad_index: Optional pad (0-31). When given the set is placed directly
+            on that pad with :func:`place_song` instead of being written to
+            a loose ``.abl`` file.
+        pad_color: Pad color used together with ``pad_index``
         
     Returns:
         Result dictionary with success status and message
@@ -204,6 +215,9 @@ def generate_midi_set_from_file(set_name: str, midi_file_path: str, tempo: float
         
         # Update set metadata
         song['tempo'] = tempo
+
+        if pad_index is not None:
+            return place_song(song, set_name, pad_index, pad_color)
         
         # Save the modified set
         output_dir = "/data/UserData/UserLibrary/Sets"
@@ -229,10 +243,19 @@ def generate_midi_set_from_file(set_name: str, midi_file_path: str, tempo: float
 
 
 # --- Drum set generation from MIDI file ---
-def generate_drum_set_from_file(set_name: str, midi_file_path: str, tempo: float = None) -> Dict[str, Any]:
+def generate_drum_set_from_file(
+    set_name: str,
+    midi_file_path: str,
+    tempo: float = None,
+    pad_index: Optional[int] = None,
+    pad_color: int = 1,
+) -> Dict[str, Any]:
     """
     Generate an Ableton Live set from an uploaded drum MIDI file,
     mapping incoming notes to 16 pads starting at MIDI note 36.
+
+    ``pad_index`` and ``pad_color`` behave as in
+    :func:`generate_midi_set_from_file`.
     """
     try:
         # Load the MIDI file
@@ -298,9 +321,9 @@ def generate_drum_set_from_file(set_name: str, midi_file_path: str, tempo: float
         min_note = min(n['noteNumber'] for n in notes)
         mapped_notes = []
         for n in notes:
-            pad_index = (n['noteNumber'] - min_note) % 16
+            drum_pad = (n['noteNumber'] - min_note) % 16
             mapped_notes.append({
-                'noteNumber': 36 + pad_index,
+                'noteNumber': 36 + drum_pad,
                 'startTime': n['startTime'],
                 'duration': n['duration'],
                 'velocity': n['velocity'],
@@ -323,6 +346,8 @@ def generate_drum_set_from_file(set_name: str, midi_file_path: str, tempo: float
 
         # Update tempo and save
         song['tempo'] = tempo
+        if pad_index is not None:
+            return place_song(song, set_name, pad_index, pad_color)
         output_dir = "/data/UserData/UserLibrary/Sets"
         os.makedirs(output_dir, exist_ok=True)
         output_path = os.path.join(output_dir, set_name)
@@ -0,0 +1,234 @@
+"""Batch editing of set pad positions, colors and names.
+
+Move keeps a set's pad in the ``user.song-index`` xattr and its color in
+``user.song-color`` on the set's UUID folder, and its name is the folder
+inside.  :func:`apply_pad_changes` validates a list of operations against the
+current :class:`core.set_registry.SetSnapshot`, computes the final state of
+every affected set and then writes only the differences.  If any write fails
+the writes already made are rolled back so the pads are never left half
+reorganized.
+
+Supported operations (pads are 0-based):
+
+* ``{"op": "move", "from": 3, "to": 10}`` – move a set to a free pad
+* ``{"op": "swap", "a": 3, "b": 10}`` – exchange two pads (either may be empty)
+* ``{"op": "color", "pad": 3, "color": 5}`` – recolor a set
+* ``{"op": "rename", "pad": 3, "name": "New name"}`` – rename a set
+"""
+
+import os
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.config import MSETS_DIRECTORY, MSET_INDEX_RANGE, MSET_COLOR_RANGE
+from core.atomic_write import atomic_open
+from core.restore_handler import (
+    iter_rewritten_sample_uris,
+    sample_uri_prefix,
+    set_sample_uri_pattern,
+)
+from core.set_registry import SetSnapshot, set_registry
+from core import set_writer
+from core.song_cache import invalidate_song
+
+logger = logging.getLogger(__name__)
+
+
+def _valid_name(name: str) -> bool:
+    return bool(name) and os.path.basename(name) == name and name not in (".", "..")
+
+
+def plan_pad_changes(
+    snap: SetSnapshot, ops: List[Dict[str, Any]]
+) -> Tuple[Optional[List[Dict[str, Any]]], Optional[str]]:
+    """Simulate ``ops`` on ``snap`` and return the per-set differences.
+
+    Returns:
+        tuple: (changes, error). ``changes`` lists ``{"uuid", "pad", "color",
+        "name"}`` dicts holding the new values of every set that changed and
+        ``{"old_pad", "old_color", "old_name"}`` with the previous ones.
+    """
+    pads, colors, names = {}, {}, {}
+    for idx in range(MSET_INDEX_RANGE[0], MSET_INDEX_RANGE[1] + 1):
+        entry = snap.by_pad(idx)
+        if entry is None:
+            continue
+        uuid = entry["uuid"]
+        pads[idx] = uuid
+        colors[uuid] = snap.color_map.get(idx)
+        names[uuid] = entry["mset_name"]
+    original = (dict(pads), dict(colors), dict(names))
+
+    def pad_arg(op, key):
+        value = op.get(key)
+        if not isinstance(value, int) or not (MSET_INDEX_RANGE[0] <= value <= MSET_INDEX_RANGE[1]):
+            raise ValueError(f"Invalid pad {value!r} in {op.get('op')} operation")
+        return value
+
+    def occupied(pad):
+        if pad not in pads:
+            raise ValueError(f"Pad {pad + 1} is empty")
+        return pads[pad]
+
+    try:
+        for op in ops:
+            kind = op.get("op")
+            if kind == "move":
+                src, dst = pad_arg(op, "from"), pad_arg(op, "to")
+                uuid = occupied(src)
+                if dst != src and dst in pads:
+                    raise ValueError(f"Pad {dst + 1} is already in use")
+                del pads[src]
+                pads[dst] = uuid
+            elif kind == "swap":
+                a, b = pad_arg(op, "a"), pad_arg(op, "b")
+                if a not in pads and b not in pads:
+                    raise ValueError(f"Pads {a + 1} and {b + 1} are both empty")
+                ua, ub = pads.pop(a, None), pads.pop(b, None)
+                if ua:
+                    pads[b] = ua
+                if ub:
+                    pads[a] = ub
+            elif kind == "color":
+                uuid = occupied(pad_arg(op, "pad"))
+                color = op.get("color")
+                if not isinstance(color, int) or not (MSET_COLOR_RANGE[0] <= color <= MSET_COLOR_RANGE[1]):
+                    raise ValueError(f"Invalid color {color!r}")
+                colors[uuid] = color
+            elif kind == "rename":
+                uuid = occupied(pad_arg(op, "pad"))
+                name = str(op.get("name", "")).strip()
+                if not _valid_name(name):
+                    raise ValueError(f"Invalid set name: {name}")
+                names[uuid] = name
+            else:
+                raise ValueError(f"Unknown operation: {kind}")
+    except ValueError as e:
+        return None, str(e)
+
+    old_pads = {uuid: pad for pad, uuid in original[0].items()}
+    new_pads = {uuid: pad for pad, uuid in pads.items()}
+    changes = []
+    for uuid in sorted(new_pads, key=new_pads.get):
+        old = (old_pads[uuid], original[1][uuid], original[2][uuid])
+        new = (new_pads[uuid], colors[uuid], names[uuid])
+        if old != new:
+            changes.append({
+                "uuid": uuid, "pad": new[0], "color": new[1], "name": new[2],
+                "old_pad": old[0], "old_color": old[1], "old_name": old[2],
+            })
+    return changes, None
+
+
+def _rename_set(uuid: str, old_name: str, new_name: str) -> None:
+    """Rename a set folder and point its sample URIs at the new location.
+
+    The folder is renamed first and Song.abl rewritten inside it; if the
+    rewrite fails the folder is moved back, so a failure never leaves URIs
+    pointing at a folder that does not exist.
+    """
+    uuid_dir = os.path.join(MSETS_DIRECTORY, uuid)
+    old_folder = os.path.join(uuid_dir, old_name)
+    new_folder = os.path.join(uuid_dir, new_name)
+    if os.path.exists(new_folder):
+        raise OSError(f"Set folder {new_folder} already exists")
+    os.rename(old_folder, new_folder)
+    song_path = os.path.join(new_folder, "Song.abl")
+    if not os.path.isfile(song_path):
+        return
+    try:
+        with open(song_path, "r", encoding="utf-8") as src, \
+                atomic_open(song_path, "w", encoding="utf-8") as dst:
+            for piece in iter_rewritten_sample_uris(
+                src, sample_uri_prefix(uuid, new_name), set_sample_uri_pattern(uuid)
+            ):
+                dst.write(piece)
+    except BaseException:
+        try:
+            os.rename(new_folder, old_folder)
+        except OSError as e:
+            logger.error("Could not move %s back to %s: %s", new_folder, old_folder, e)
+        raise
+
+
+def apply_pad_changes(ops: List[Dict[str, Any]], snap: Optional[SetSnapshot] = None) -> Dict[str, Any]:
+    """Apply a batch of pad operations as one transaction.
+
+    Args:
+        ops: Operations as described in the module docstring.
+        snap: Snapshot to validate against. Defaults to the shared registry.
+
+    Returns:
+        dict: ``{"success", "message", "changes"}``.
+    """
+    snap = snap or set_registry.snapshot()
+    changes, error = plan_pad_changes(snap, ops)
+    if error:
+        return {"success": False, "message": error}
+    if not changes:
+        return {"success": True, "message": "No changes", "changes": []}
+
+    # Edits staged for a Song.abl must reach disk before its folder moves,
+    # or a later flush would recreate the old path.
+    for change in changes:
+        if change["old_name"] != change["name"]:
+            song_path = os.path.join(MSETS_DIRECTORY, change["uuid"], change["old_name"], "Song.abl")
+            if not set_writer.commit(song_path):
+                return {
+                    "success": False,
+                    "message": f"Could not save pending edits of {change['old_name']}; set not renamed",
+                }
+            invalidate_song(song_path)
+
+    undo = []
+    try:
+        for change in changes:
+            uuid = change["uuid"]
+            uuid_dir = os.path.join(MSETS_DIRECTORY, uuid)
+            for attr, key in (("user.song-index", "pad"), ("user.song-color", "color")):
+                old, new = change[f"old_{key}"], change[key]
+                if old != new:
+                    os.setxattr(uuid_dir, attr, str(new).encode("utf-8"))
+                    undo.append(("xattr", uuid_dir, attr, old))
+            if change["old_name"] != change["name"]:
+                _rename_set(uuid, change["old_name"], change["name"])
+                undo.append(("rename", uuid, change["name"], change["old_name"]))
+    except OSError as e:
+        logger.error("Pad change failed, rolling back: %s", e)
+        for action in reversed(undo):
+            try:
+                if action[0] == "xattr":
+                    _, uuid_dir, attr, old = action
+                    if old is None:
+                        os.removexattr(uuid_dir, attr)
+                    else:
+                        os.setxattr(uuid_dir, attr, str(old).encode("utf-8"))
+                else:
+                    _rename_set(*action[1:])
+            except OSError as undo_error:
+                logger.error("Rollback step %s failed: %s", action, undo_error)
+        return {"success": False, "message": f"Failed to apply pad changes: {e}"}
+    finally:
+        for change in changes:
+            set_registry.invalidate(change["uuid"])
+
+    return {
+        "success": True,
+        "message": f"Updated {len(changes)} set{'s' if len(changes) != 1 else ''}",
+        "changes": changes,
+    }
+
+
+def pad_layout(snap: Optional[SetSnapshot] = None) -> List[Dict[str, Any]]:
+    """Return the 32 pads with the set (if any) stored on each, 1-based."""
+    snap = snap or set_registry.snapshot()
+    layout = []
+    for idx in range(MSET_INDEX_RANGE[0], MSET_INDEX_RANGE[1] + 1):
+        entry = snap.by_pad(idx)
+        layout.append({
+            "pad": idx + 1,
+            "uuid": entry["uuid"] if entry else None,
+            "name": entry["mset_name"] if entry else None,
+            "color": snap.color_map.get(idx) if entry else None,
+        })
+    return layout
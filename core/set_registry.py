@@ -0,0 +1,96 @@
+"""Process-wide registry of the Move sets stored on the device.
+
+Handlers that draw pad grids or resolve a ``Song.abl`` path back to its pad
+share a single :class:`SetRegistry` instead of rebuilding the set list, color
+map and name map on every request.  The registry is backed by the
+stat-validated index in :mod:`core.list_msets_handler`, so changes made on the
+device itself are picked up, while writes made by this server call
+:meth:`SetRegistry.invalidate` to drop affected entries immediately.
+"""
+
+import os
+import logging
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+from core.config import MSETS_DIRECTORY
+from core import list_msets_handler
+
+logger = logging.getLogger(__name__)
+
+
+def song_path_for(entry: Dict[str, Any]) -> str:
+    """Return the ``Song.abl`` path for a set entry from ``list_msets``."""
+    return os.path.join(MSETS_DIRECTORY, entry["uuid"], entry["mset_name"], "Song.abl")
+
+
+class SetSnapshot:
+    """Immutable view of the sets on the device with precomputed lookups."""
+
+    def __init__(self, msets: List[Dict[str, Any]], used: set, free: List[int]):
+        self.msets = msets
+        self.used = used
+        self.free = free
+        self.color_map: Dict[int, int] = {
+            int(m["mset_id"]): int(m["mset_color"])
+            for m in msets
+            if str(m["mset_color"]).isdigit()
+        }
+        self.name_map: Dict[int, str] = {int(m["mset_id"]): m["mset_name"] for m in msets}
+        self._by_pad = {m["mset_id"]: m for m in msets if 0 <= m["mset_id"] <= 31}
+        self._by_uuid = {m["uuid"]: m for m in msets}
+        self._by_path = {song_path_for(m): m for m in msets}
+
+    def by_pad(self, idx: int) -> Optional[Dict[str, Any]]:
+        """Return the set on pad ``idx`` (0-based) or ``None``."""
+        return self._by_pad.get(idx)
+
+    def by_uuid(self, uuid: str) -> Optional[Dict[str, Any]]:
+        """Return the set stored under ``uuid`` or ``None``."""
+        return self._by_uuid.get(uuid)
+
+    def by_path(self, set_path: str) -> Optional[Dict[str, Any]]:
+        """Return the set whose ``Song.abl`` lives at ``set_path`` or ``None``."""
+        return self._by_path.get(set_path)
+
+    def pad_for_path(self, set_path: str) -> Optional[int]:
+        """Return the pad index for ``set_path`` or ``None`` if unknown."""
+        entry = self.by_path(set_path)
+        return int(entry["mset_id"]) if entry else None
+
+
+class SetRegistry:
+    """Shared, thread-safe cache of :class:`SetSnapshot` objects.
+
+    :meth:`snapshot` revalidates the underlying index (one ``scandir`` plus a
+    ``stat`` per set) and only rebuilds the lookup maps when the list of sets
+    actually changed.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._snapshot: Optional[SetSnapshot] = None
+
+    def snapshot(self) -> SetSnapshot:
+        """Return a snapshot reflecting the current state of the Sets folder."""
+        msets, ids = list_msets_handler.list_msets(return_free_ids=True)
+        with self._lock:
+            current = self._snapshot
+            if current is not None and current.msets == msets:
+                return current
+            snap = SetSnapshot(msets, ids.get("used", set()), ids.get("free", []))
+            self._snapshot = snap
+        logger.debug("Rebuilt set registry snapshot with %d sets", len(msets))
+        return snap
+
+    def invalidate(self, uuid: Optional[str] = None) -> None:
+        """Drop cached state after the server modified a set.
+
+        ``uuid`` limits the index invalidation to a single set folder.
+        """
+        list_msets_handler.invalidate_mset(uuid)
+        with self._lock:
+            self._snapshot = None
+
+
+set_registry = SetRegistry()
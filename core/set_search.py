@@ -0,0 +1,462 @@
+"""Search the contents of every set in the library.
+
+Answering "which set uses this sample / device / tempo / clip?" used to mean
+opening sets one by one in the inspector.  :class:`SetSearchIndex` keeps a
+small SQLite database with one row per set, track, device kind, clip and
+sample reference, built from the ``Song.abl`` files under
+``MSETS_DIRECTORY``.
+
+The index is refreshed incrementally: :meth:`SetSearchIndex.refresh` stats
+each set and only re-reads files whose ``(st_mtime_ns, st_size)`` changed
+since they were indexed, so a refresh after a single edit costs one parse.
+Refreshes run on a background thread (:meth:`SetSearchIndex.start_refresh`)
+and :meth:`SetSearchIndex.search` answers from whatever is indexed so far, so
+queries never wait on parsing.
+
+The same rows double as a per-set summary (tempo, track instruments, clip
+and sample counts, last modified time).  :meth:`SetSearchIndex.pad_summaries`
+reads them for the pad grids with one query and a ``stat`` per set, so
+tooltips never parse a set.
+"""
+
+import json
+import os
+import sqlite3
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from core.config import SET_INDEX_PATH
+from core.index_db import open_index_db
+from core.set_inspector_handler import _track_display_name
+
+logger = logging.getLogger(__name__)
+
+# Bump when the tables or what is extracted from a set change
+SCHEMA_VERSION = 2
+# Minimum seconds between background refreshes started by searches
+REFRESH_INTERVAL = 30.0
+MAX_RESULTS = 200
+
+_SCHEMA = """
+CREATE TABLE sets (
+    path TEXT PRIMARY KEY, uuid TEXT, name TEXT COLLATE NOCASE, pad INTEGER,
+    mtime_ns INTEGER, size INTEGER, tempo REAL,
+    track_count INTEGER, clip_count INTEGER, note_count INTEGER,
+    track_kinds TEXT, sample_count INTEGER
+);
+CREATE TABLE tracks (set_path TEXT, track INTEGER, name TEXT COLLATE NOCASE);
+CREATE TABLE devices (set_path TEXT, track INTEGER, kind TEXT COLLATE NOCASE);
+CREATE TABLE clips (
+    set_path TEXT, track INTEGER, clip INTEGER, name TEXT COLLATE NOCASE,
+    note_count INTEGER
+);
+CREATE TABLE samples (set_path TEXT, track INTEGER, uri TEXT COLLATE NOCASE);
+CREATE INDEX tracks_set ON tracks (set_path);
+CREATE INDEX devices_set ON devices (set_path);
+CREATE INDEX devices_kind ON devices (kind);
+CREATE INDEX clips_set ON clips (set_path);
+CREATE INDEX samples_set ON samples (set_path);
+CREATE INDEX sets_tempo ON sets (tempo);
+"""
+
+_CHILD_TABLES = ("tracks", "devices", "clips", "samples")
+
+# (path, uuid, name, pad) of one set
+SetEntry = Tuple[str, str, str, Optional[int]]
+
+
+def _registry_sets() -> List[SetEntry]:
+    from core.set_registry import set_registry, song_path_for
+
+    return [
+        (song_path_for(m), m["uuid"], m["mset_name"], m["mset_id"] if 0 <= m["mset_id"] <= 31 else None)
+        for m in set_registry.snapshot().msets
+    ]
+
+
+def _walk_devices(obj: Any, kinds: List[str], samples: set) -> None:
+    """Collect device kinds in tree order and sample URIs of a device tree."""
+    if isinstance(obj, dict):
+        kind = obj.get("kind")
+        if isinstance(kind, str) and kind not in kinds:
+            kinds.append(kind)
+        uri = obj.get("sampleUri")
+        if isinstance(uri, str) and uri:
+            samples.add(uri)
+        for value in obj.values():
+            if isinstance(value, (dict, list)):
+                _walk_devices(value, kinds, samples)
+    elif isinstance(obj, list):
+        for item in obj:
+            _walk_devices(item, kinds, samples)
+
+
+def _instrument(kinds: List[str]) -> Optional[str]:
+    """Return the instrument of a track given its device kinds in tree order.
+
+    Move wraps every instrument in an ``instrumentRack``, so the first other
+    device is the instrument itself (``drumRack``, ``drift``, ...).
+    """
+    return next((kind for kind in kinds if kind != "instrumentRack"), None)
+
+
+def extract_rows(song: Dict[str, Any]) -> Dict[str, Any]:
+    """Return the searchable facts of a parsed set."""
+    tracks, devices, clips, samples, track_kinds = [], [], [], [], []
+    for ti, track in enumerate(song.get("tracks") or []):
+        if not isinstance(track, dict):
+            continue
+        tracks.append((ti, _track_display_name(track, ti)))
+        kinds: List[str] = []
+        uris: set = set()
+        _walk_devices(track.get("devices", []), kinds, uris)
+        track_kinds.append(_instrument(kinds))
+        devices.extend((ti, kind) for kind in sorted(kinds))
+        samples.extend((ti, uri) for uri in sorted(uris))
+        for ci, slot in enumerate(track.get("clipSlots") or []):
+            clip = slot.get("clip") if isinstance(slot, dict) else None
+            if clip:
+                clips.append((ti, ci, clip.get("name") or "", len(clip.get("notes") or [])))
+    tempo = song.get("tempo")
+    return {
+        "tempo": float(tempo) if isinstance(tempo, (int, float)) else None,
+        "tracks": tracks,
+        "devices": devices,
+        "clips": clips,
+        "samples": samples,
+        "track_kinds": track_kinds,
+    }
+
+
+class SetSearchIndex:
+    """SQLite backed index of set contents.
+
+    ``list_sets`` returns ``(song_path, uuid, name, pad)`` tuples for the
+    sets to index; it defaults to the shared set registry.
+    """
+
+    def __init__(self, db_path: str, list_sets: Optional[Callable[[], Iterable[SetEntry]]] = None):
+        self.db_path = db_path
+        self._list_sets = list_sets or _registry_sets
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._refresh_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._last_refresh = 0.0
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the connection, creating the database on first use.
+
+        Must be called with ``self._lock`` held.
+        """
+        if self._conn is not None:
+            return self._conn
+        conn = open_index_db(self.db_path, _SCHEMA, SCHEMA_VERSION, ("sets",) + _CHILD_TABLES)
+        self._conn = conn
+        return conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    # -- indexing ---------------------------------------------------------
+
+    def refresh(self) -> Dict[str, int]:
+        """Bring the index in line with the sets on disk.
+
+        Returns counts of ``indexed`` (re-read), ``removed`` and ``unchanged``
+        sets.
+        """
+        with self._refresh_lock:
+            try:
+                return self._refresh()
+            finally:
+                self._last_refresh = time.monotonic()
+
+    def _refresh(self) -> Dict[str, int]:
+        entries = {path: (uuid, name, pad) for path, uuid, name, pad in self._list_sets()}
+        with self._lock:
+            known = {
+                row[0]: row[1:]
+                for row in self._connect().execute("SELECT path, mtime_ns, size, uuid, name, pad FROM sets")
+            }
+
+        counts = {"indexed": 0, "removed": 0, "unchanged": 0}
+        for path in set(known) - set(entries):
+            self._delete(path)
+            counts["removed"] += 1
+
+        for path, (uuid, name, pad) in entries.items():
+            try:
+                st = os.stat(path)
+            except OSError:
+                if path in known:
+                    self._delete(path)
+                    counts["removed"] += 1
+                continue
+            old = known.get(path)
+            if old is not None and old[:2] == (st.st_mtime_ns, st.st_size):
+                if old[2:] != (uuid, name, pad):
+                    with self._lock:
+                        conn = self._connect()
+                        with conn:
+                            conn.execute(
+                                "UPDATE sets SET uuid = ?, name = ?, pad = ? WHERE path = ?",
+                                (uuid, name, pad, path),
+                            )
+                counts["unchanged"] += 1
+                continue
+            try:
+                with open(path, "r") as f:
+                    rows = extract_rows(json.load(f))
+            except Exception as exc:
+                logger.warning("Could not index set %s: %s", path, exc)
+                continue
+            self._store(path, uuid, name, pad, st, rows)
+            counts["indexed"] += 1
+        if counts["indexed"] or counts["removed"]:
+            logger.info("Set search index refreshed: %s", counts)
+        return counts
+
+    def _delete(self, path: str) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM sets WHERE path = ?", (path,))
+                for table in _CHILD_TABLES:
+                    conn.execute(f"DELETE FROM {table} WHERE set_path = ?", (path,))
+
+    def _store(self, path, uuid, name, pad, st, rows) -> None:
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                for table in _CHILD_TABLES:
+                    conn.execute(f"DELETE FROM {table} WHERE set_path = ?", (path,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO sets VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        path, uuid, name, pad, st.st_mtime_ns, st.st_size, rows["tempo"],
+                        len(rows["tracks"]), len(rows["clips"]), sum(c[3] for c in rows["clips"]),
+                        json.dumps(rows["track_kinds"]), len({uri for _, uri in rows["samples"]}),
+                    ),
+                )
+                conn.executemany("INSERT INTO tracks VALUES (?, ?, ?)", [(path, *r) for r in rows["tracks"]])
+                conn.executemany("INSERT INTO devices VALUES (?, ?, ?)", [(path, *r) for r in rows["devices"]])
+                conn.executemany("INSERT INTO clips VALUES (?, ?, ?, ?, ?)", [(path, *r) for r in rows["clips"]])
+                conn.executemany("INSERT INTO samples VALUES (?, ?, ?)", [(path, *r) for r in rows["samples"]])
+
+    def start_refresh(self) -> bool:
+        """Refresh on a background thread unless one is already running."""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return False
+            self._thread = threading.Thread(target=self._refresh_quietly, daemon=True)
+            self._thread.start()
+        return True
+
+    def _refresh_quietly(self) -> None:
+        try:
+            self.refresh()
+        except Exception as exc:
+            logger.error("Set search index refresh failed: %s", exc)
+
+    def refreshing(self) -> bool:
+        thread = self._thread
+        return thread is not None and thread.is_alive()
+
+    # -- queries ----------------------------------------------------------
+
+    def search(
+        self,
+        text: Optional[str] = None,
+        kind: Optional[str] = None,
+        sample: Optional[str] = None,
+        clip: Optional[str] = None,
+        tempo_min: Optional[float] = None,
+        tempo_max: Optional[float] = None,
+        limit: int = 50,
+    ) -> List[Dict[str, Any]]:
+        """Return sets matching every given filter.
+
+        ``text`` matches set, track and clip names and sample URIs,
+        ``kind`` is an exact device kind (e.g. ``drift``), ``sample`` and
+        ``clip`` are substrings of sample URIs and clip names.  Each result
+        lists what matched under ``matches``.
+        """
+        limit = max(1, min(int(limit), MAX_RESULTS))
+        with self._lock:
+            conn = self._connect()
+            sets = {
+                row[0]: {
+                    "path": row[0], "uuid": row[1], "name": row[2], "pad": row[3],
+                    "tempo": row[4], "tracks": row[5], "clips": row[6], "notes": row[7],
+                    "matches": {"tracks": [], "clips": [], "devices": [], "samples": []},
+                }
+                for row in conn.execute(
+                    "SELECT path, uuid, name, pad, tempo, track_count, clip_count, note_count FROM sets"
+                    " WHERE (? IS NULL OR tempo >= ?) AND (? IS NULL OR tempo <= ?)",
+                    (tempo_min, tempo_min, tempo_max, tempo_max),
+                )
+            }
+            candidates = set(sets)
+
+            def matching(sql, params, record):
+                found = set()
+                for row in conn.execute(sql, params):
+                    if row[0] in sets:
+                        found.add(row[0])
+                        record(sets[row[0]]["matches"], row[1:])
+                return found
+
+            def add_track(m, r):
+                m["tracks"].append({"track": r[0], "name": r[1]})
+
+            def add_clip(m, r):
+                m["clips"].append({"track": r[0], "clip": r[1], "name": r[2], "notes": r[3]})
+
+            def add_device(m, r):
+                m["devices"].append({"track": r[0], "kind": r[1]})
+
+            def add_sample(m, r):
+                m["samples"].append({"track": r[0], "uri": r[1]})
+
+            if kind:
+                candidates &= matching(
+                    "SELECT set_path, track, kind FROM devices WHERE kind = ?", (kind,), add_device
+                )
+            if sample:
+                candidates &= matching(
+                    "SELECT set_path, track, uri FROM samples WHERE instr(lower(uri), lower(?))",
+                    (sample,), add_sample,
+                )
+            if clip:
+                candidates &= matching(
+                    "SELECT set_path, track, clip, name, note_count FROM clips"
+                    " WHERE instr(lower(name), lower(?))",
+                    (clip,), add_clip,
+                )
+            if text:
+                needle = (text,)
+                found = {p for p, s in sets.items() if text.lower() in (s["name"] or "").lower()}
+                found |= matching(
+                    "SELECT set_path, track, name FROM tracks WHERE instr(lower(name), lower(?))",
+                    needle, add_track,
+                )
+                if not clip:
+                    found |= matching(
+                        "SELECT set_path, track, clip, name, note_count FROM clips"
+                        " WHERE instr(lower(name), lower(?))",
+                        needle, add_clip,
+                    )
+                if not sample:
+                    found |= matching(
+                        "SELECT set_path, track, uri FROM samples WHERE instr(lower(uri), lower(?))",
+                        needle, add_sample,
+                    )
+                candidates &= found
+
+        results = [sets[p] for p in candidates]
+        results.sort(key=lambda s: (s["pad"] is None, s["pad"] if s["pad"] is not None else 0, s["name"] or ""))
+        return results[:limit]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the number of indexed sets and whether a refresh is running."""
+        with self._lock:
+            count = self._connect().execute("SELECT COUNT(*) FROM sets").fetchone()[0]
+        return {"sets": count, "refreshing": self.refreshing()}
+
+    def search_fresh(self, **filters) -> Dict[str, Any]:
+        """Search and start a background refresh if the index may be stale."""
+        if time.monotonic() - self._last_refresh > REFRESH_INTERVAL:
+            self.start_refresh()
+        start = time.perf_counter()
+        results = self.search(**filters)
+        elapsed = (time.perf_counter() - start) * 1000
+        return dict(self.stats(), results=results, elapsed_ms=round(elapsed, 2))
+
+    def summaries(self, paths: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Return the indexed summary of each set in ``paths``.
+
+        Sets whose ``Song.abl`` changed since it was indexed keep their last
+        summary and a background refresh is started; sets not indexed yet
+        are left out.
+        """
+        paths = list(paths)
+        if not paths:
+            return {}
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT path, mtime_ns, size, tempo, track_kinds, clip_count, sample_count FROM sets"
+            ).fetchall()
+        by_path = {row[0]: row for row in rows}
+        stale = False
+        result = {}
+        for path in paths:
+            row = by_path.get(path)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if row is None or row[1:3] != (st.st_mtime_ns, st.st_size):
+                stale = True
+            if row is None:
+                continue
+            result[path] = {
+                "tempo": row[3],
+                "track_kinds": json.loads(row[4] or "[]"),
+                "clips": row[5],
+                "samples": row[6],
+                "modified": row[1] / 1e9,
+            }
+        if stale:
+            self.start_refresh()
+        return result
+
+    def pad_summaries(self) -> Dict[int, Dict[str, Any]]:
+        """Return summaries keyed by 0-based pad for the sets on the pads.
+
+        Never raises: pad grids render without tooltips if the index is
+        unavailable.
+        """
+        try:
+            from core.set_registry import set_registry, song_path_for
+
+            pads = {
+                song_path_for(m): m
+                for m in set_registry.snapshot().msets
+                if 0 <= m["mset_id"] <= 31
+            }
+            summaries = self.summaries(pads)
+        except Exception as exc:
+            logger.warning("Could not read set summaries: %s", exc)
+            return {}
+        return {
+            pads[path]["mset_id"]: dict(summary, name=pads[path]["mset_name"])
+            for path, summary in summaries.items()
+        }
+
+
+def summary_text(summary: Optional[Dict[str, Any]]) -> str:
+    """Return a one-line description of a set summary for tooltips."""
+    if not summary:
+        return ""
+    parts = []
+    if summary.get("name"):
+        parts.append(summary["name"])
+    if summary.get("tempo") is not None:
+        parts.append(f"{summary['tempo']:g} BPM")
+    kinds = [k for k in summary.get("track_kinds", []) if k]
+    if kinds:
+        parts.append(f"{len(summary['track_kinds'])} tracks ({', '.join(kinds)})")
+    parts.append(f"{summary.get('clips', 0)} clips")
+    parts.append(f"{summary.get('samples', 0)} samples")
+    if summary.get("modified"):
+        parts.append("modified " + time.strftime("%Y-%m-%d %H:%M", time.localtime(summary["modified"])))
+    return " · ".join(parts)
+
+
+set_index = SetSearchIndex(SET_INDEX_PATH)
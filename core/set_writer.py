@@ -0,0 +1,113 @@
+"""Write-behind saving of set documents edited in the Set Inspector.
+
+Dragging an envelope or nudging notes produces a burst of saves.  Writing each
+one means a backup copy, a full ``json.dump`` and a ``latest.txt`` update on
+the device's eMMC.  :func:`stage` instead keeps the edited document in
+:mod:`core.song_cache` and schedules a flush once the set has been idle for
+:data:`IDLE_FLUSH_SECONDS`.  A backup is taken once at the start of an editing
+session (the first edit after :data:`SESSION_IDLE_SECONDS` without any), not
+per request.  :func:`commit` flushes immediately and ends the session.
+"""
+
+import os
+import time
+import atexit
+import logging
+import threading
+from datetime import datetime
+from typing import Any, Dict
+
+from core.set_backup_handler import backup_set, write_latest_timestamp
+from core.song_cache import is_dirty, song_version, stage_song, write_pending
+
+logger = logging.getLogger(__name__)
+
+IDLE_FLUSH_SECONDS = 2.0
+SESSION_IDLE_SECONDS = 300.0
+
+_lock = threading.RLock()
+_sessions: Dict[str, Dict[str, Any]] = {}
+
+
+def stage(set_path: str, song: Dict[str, Any]) -> None:
+    """Record an edit of ``set_path`` and schedule it to be written."""
+    if not os.access(set_path, os.W_OK):
+        raise PermissionError(f"{set_path} is read-only")
+    with _lock:
+        now = time.monotonic()
+        session = _sessions.get(set_path)
+        if session is None or (
+            now - session["last_edit"] > SESSION_IDLE_SECONDS and not is_dirty(set_path)
+        ):
+            # The file on disk is still the version from before this session
+            backup_set(set_path)
+            session = {"started": datetime.now(), "last_flush": None, "error": None, "timer": None}
+            _sessions[set_path] = session
+        stage_song(set_path, song)
+        session["last_edit"] = now
+        _schedule(set_path, session)
+
+
+def _schedule(set_path: str, session: Dict[str, Any]) -> None:
+    if session["timer"] is not None:
+        session["timer"].cancel()
+    timer = threading.Timer(IDLE_FLUSH_SECONDS, flush, args=(set_path,))
+    timer.daemon = True
+    session["timer"] = timer
+    timer.start()
+
+
+def flush(set_path: str) -> bool:
+    """Write staged changes of ``set_path`` now; return ``True`` on success."""
+    with _lock:
+        session = _sessions.get(set_path)
+        if session is not None and session["timer"] is not None:
+            session["timer"].cancel()
+            session["timer"] = None
+        try:
+            if write_pending(set_path):
+                write_latest_timestamp(set_path)
+                if session is not None:
+                    session["last_flush"] = datetime.now()
+            if session is not None:
+                session["error"] = None
+            return True
+        except Exception as e:
+            logger.error("Failed to write %s: %s", set_path, e)
+            if session is not None:
+                session["error"] = str(e)
+            return False
+
+
+def commit(set_path: str) -> bool:
+    """Flush ``set_path`` and end its editing session."""
+    with _lock:
+        ok = flush(set_path)
+        if ok:
+            _sessions.pop(set_path, None)
+        return ok
+
+
+def flush_all() -> None:
+    """Flush every set with staged changes (used on shutdown)."""
+    with _lock:
+        paths = list(_sessions)
+    for path in paths:
+        flush(path)
+
+
+def status(set_path: str) -> Dict[str, Any]:
+    """Return the save state of ``set_path`` for display in the client."""
+    with _lock:
+        session = _sessions.get(set_path)
+        last_flush = session["last_flush"] if session else None
+        return {
+            "dirty": is_dirty(set_path),
+            "session_active": session is not None,
+            "last_flush": last_flush.strftime("%Y-%m-%d %H:%M:%S") if last_flush else None,
+            "error": session["error"] if session else None,
+            "version": song_version(set_path),
+        }
+
+
+atexit.register(flush_all)
@@ -0,0 +1,381 @@
+"""Bounded cache of parsed ``Song.abl`` documents.
+
+The Set Inspector reads the same set over and over while the user moves
+between clips.  :func:`load_song` keeps the most recently used documents in an
+LRU keyed by path and validated against ``(st_mtime_ns, st_size)`` so a set
+changed on the device is parsed again, while repeated reads cost one ``stat``.
+
+Documents returned by :func:`load_song` are shared and must be treated as
+read-only.  Code that edits a set takes a private path to the clip with
+:func:`clip_for_update` (copy-on-write: only the containers on the way to the
+clip are copied) and hands the result to :func:`save_song`, which writes it and
+makes it the cached version, or to :func:`stage_song`, which only keeps it in
+memory until :func:`write_pending` is called (see :mod:`core.set_writer`).
+Staged documents are pinned in the cache and win over the file on disk.
+
+Sets are parsed with :func:`core.song_index.parse_indexed`, which also
+records where each clip lives in the file.  The index outlives the parsed
+document in the LRU, so :func:`load_clip` can decode a single clip and its
+track from disk, and writes that only touched clips splice them into the
+existing text instead of serializing the whole set again.
+
+Values derived from a track's devices (see :func:`track_value`) are kept per
+path and track index.  They survive clip edits and are dropped when anything
+else in the set changes, whether the set was fully parsed or only read
+through :func:`load_clip`.
+"""
+
+import os
+import json
+import logging
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from core import song_index
+from core.atomic_write import atomic_open
+
+logger = logging.getLogger(__name__)
+
+# Number of parsed sets kept in memory.  Song.abl files are typically
+# 100-250 KB on disk and a few MB once parsed.
+MAX_SONGS = 4
+
+# path -> (stamp, song, dirty)
+_songs: "OrderedDict[str, Tuple[Optional[Tuple[int, int]], Dict[str, Any], bool]]" = OrderedDict()
+_lock = Lock()
+_stats = {"hits": 0, "misses": 0, "partial": 0}
+
+# Per-path ``(stamp, counter)`` backing :func:`song_version`.  The boot
+# prefix keeps tokens from a previous server run from ever matching.
+_versions: Dict[str, Tuple[Any, int]] = {}
+_BOOT = os.urandom(4).hex()
+
+# Clips changed since the cached document was last in sync with the file,
+# or ``None`` when something other than clips changed.
+_touched: Dict[str, Optional[Set[Tuple[int, int]]]] = {}
+
+# Per-path counter advanced whenever a set may have changed in a way other
+# than its clips, and the track values computed for that generation:
+# path -> (generation, {(track, name): value}).  The values are small (no
+# device trees) so they are kept for more sets than parsed documents.
+MAX_TRACK_VALUES = 32
+_layouts: Dict[str, int] = {}
+_track_values: "OrderedDict[str, Tuple[int, Dict[Tuple[int, str], Any]]]" = OrderedDict()
+
+
+def _stamp(set_path: str) -> Tuple[int, int]:
+    st = os.stat(set_path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _bump_version(set_path: str, stamp, edited: bool, clips_only: bool = True) -> None:
+    """Advance the version on edits and when the file changed on disk.
+
+    The layout generation advances too unless the change is an edit known to
+    touch nothing but clips.
+    """
+    seen, counter = _versions.get(set_path, (None, 0))
+    if edited or seen != stamp:
+        counter += 1
+    if not clips_only or (seen != stamp and not edited):
+        _layouts[set_path] = _layouts.get(set_path, 0) + 1
+    _versions[set_path] = (stamp, counter)
+
+
+def _read(set_path: str, stamp) -> Dict[str, Any]:
+    with open(set_path, "r", newline="") as f:
+        song, index = song_index.parse_indexed(f.read(), stamp)
+    song_index.remember(set_path, index)
+    logger.debug("Parsed %s", set_path)
+    return song
+
+
+def load_song(set_path: str) -> Dict[str, Any]:
+    """Return the parsed document for ``set_path``; do not mutate it."""
+    stamp = _stamp(set_path)
+    with _lock:
+        cached = _songs.get(set_path)
+        if cached is not None and (cached[2] or cached[0] == stamp):
+            _songs.move_to_end(set_path)
+            _stats["hits"] += 1
+            return cached[1]
+        _stats["misses"] += 1
+
+    song = _read(set_path, stamp)
+    _store(set_path, stamp, song)
+    return song
+
+
+def load_clip(set_path: str, track: int, clip: int) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Return ``(track, clip)`` of ``set_path``; do not mutate them.
+
+    Uses the cached document when there is one.  Otherwise only the track
+    (with its ``clipSlots`` left empty) and the clip are decoded through the
+    file's :class:`core.song_index.SongIndex`, falling back to a full parse
+    if the file has not been indexed in its current state.
+    """
+    stamp = _stamp(set_path)
+    with _lock:
+        cached = _songs.get(set_path)
+        valid = cached is not None and (cached[2] or cached[0] == stamp)
+    if not valid:
+        index = song_index.cached_index(set_path, stamp)
+        if index is not None:
+            try:
+                track_obj, clip_obj = song_index.read_clip(set_path, index, track, clip)
+            except (LookupError, ValueError):
+                pass
+            else:
+                with _lock:
+                    _stats["partial"] += 1
+                    _bump_version(set_path, stamp, False)
+                return track_obj, clip_obj
+    song = load_song(set_path)
+    track_obj = song["tracks"][track]
+    return track_obj, track_obj["clipSlots"][clip]["clip"]
+
+
+def _changed_clips(old: Dict[str, Any], new: Dict[str, Any]) -> Optional[Set[Tuple[int, int]]]:
+    """Return the clips that differ between two copy-on-write versions.
+
+    Relies on unchanged containers being shared (see :func:`clip_for_update`).
+    Returns ``None`` if anything other than clip values differs.
+    """
+    def same_except(a, b, key):
+        return a.keys() == b.keys() and all(b[k] is a[k] for k in b if k != key)
+
+    if old is new:
+        return set()
+    if not isinstance(old, dict) or not isinstance(new, dict) or not same_except(old, new, "tracks"):
+        return None
+    old_tracks, new_tracks = old.get("tracks"), new.get("tracks")
+    if old_tracks is new_tracks:
+        return set()
+    if len(old_tracks) != len(new_tracks):
+        return None
+    changed = set()
+    for ti, (a, b) in enumerate(zip(old_tracks, new_tracks)):
+        if a is b:
+            continue
+        if not same_except(a, b, "clipSlots") or len(a["clipSlots"]) != len(b["clipSlots"]):
+            return None
+        for ci, (x, y) in enumerate(zip(a["clipSlots"], b["clipSlots"])):
+            if x is y:
+                continue
+            if not same_except(x, y, "clip"):
+                return None
+            if x["clip"] is not y["clip"]:
+                changed.add((ti, ci))
+    return changed
+
+
+def _pending_changes(set_path: str, song: Dict[str, Any]) -> Optional[Set[Tuple[int, int]]]:
+    """Return the clips ``song`` changes relative to the file on disk.
+
+    Must be called with ``_lock`` held, before ``song`` is stored.
+    """
+    cached = _songs.get(set_path)
+    touched = _touched.get(set_path)
+    if cached is None or touched is None:
+        return None
+    if not cached[2]:
+        try:
+            if cached[0] != _stamp(set_path):
+                return None
+        except OSError:
+            return None
+    changed = _changed_clips(cached[1], song)
+    return None if changed is None else touched | changed
+
+
+def _store(
+    set_path: str,
+    stamp,
+    song: Dict[str, Any],
+    dirty: bool = False,
+    touched: Optional[Set[Tuple[int, int]]] = None,
+    edited: bool = False,
+) -> None:
+    with _lock:
+        _songs[set_path] = (stamp, song, dirty)
+        _songs.move_to_end(set_path)
+        _touched[set_path] = touched if dirty else set()
+        _bump_version(set_path, stamp, edited, clips_only=not edited or touched is not None)
+        excess = len(_songs) - MAX_SONGS
+        for path in [p for p, entry in _songs.items() if not entry[2]][:max(0, excess)]:
+            del _songs[path]
+            _touched.pop(path, None)
+
+
+def clip_for_update(
+    song: Dict[str, Any], track: int, clip: int
+) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Return ``(song, track, clip)`` copies that are safe to modify.
+
+    Only the containers leading to the clip are copied; everything else is
+    shared with the cached document.  Callers must replace (not mutate in
+    place) any nested value of the returned clip they want to change.
+    """
+    new_song = dict(song)
+    tracks = list(song["tracks"])
+    new_song["tracks"] = tracks
+    track_obj = dict(tracks[track])
+    tracks[track] = track_obj
+    slots = list(track_obj["clipSlots"])
+    track_obj["clipSlots"] = slots
+    slot = dict(slots[clip])
+    slots[clip] = slot
+    clip_obj = dict(slot["clip"])
+    slot["clip"] = clip_obj
+    return new_song, track_obj, clip_obj
+
+
+def _write_atomic(
+    set_path: str, song: Dict[str, Any], touched: Optional[Set[Tuple[int, int]]] = None
+) -> None:
+    """Write ``song`` next to ``set_path`` and rename it into place.
+
+    When ``touched`` lists the only clips that differ from the file and the
+    file still matches its index, just those clips are re-serialized;
+    otherwise the whole document is dumped.
+    """
+    index = None
+    if touched is not None and os.path.exists(set_path):
+        index = song_index.cached_index(set_path, _stamp(set_path))
+    new_index = None
+    with atomic_open(set_path, "w", newline="") as f:
+        if index is not None:
+            with open(set_path, "r", newline="") as src:
+                text = src.read()
+            tracks = song["tracks"]
+            clips = {(t, c): tracks[t]["clipSlots"][c]["clip"] for t, c in touched}
+            try:
+                text, new_index = song_index.splice(text, index, clips)
+            except LookupError:
+                index = None
+            else:
+                f.write(text)
+        if index is None:
+            json.dump(song, f, indent=2)
+    if new_index is not None:
+        new_index.stamp = _stamp(set_path)
+        song_index.remember(set_path, new_index)
+    else:
+        song_index.forget(set_path)
+
+
+def save_song(set_path: str, song: Dict[str, Any]) -> None:
+    """Write ``song`` to ``set_path`` and cache it as the current version."""
+    with _lock:
+        touched = _pending_changes(set_path, song)
+    _write_atomic(set_path, song, touched)
+    _store(set_path, _stamp(set_path), song, touched=touched, edited=True)
+
+
+def stage_song(set_path: str, song: Dict[str, Any]) -> None:
+    """Make ``song`` the current version of ``set_path`` without writing it."""
+    with _lock:
+        cached = _songs.get(set_path)
+        touched = _pending_changes(set_path, song)
+    _store(set_path, cached[0] if cached else None, song, dirty=True, touched=touched, edited=True)
+
+
+def is_dirty(set_path: str) -> bool:
+    """Return ``True`` if ``set_path`` has staged changes not yet written."""
+    with _lock:
+        cached = _songs.get(set_path)
+        return bool(cached and cached[2])
+
+
+def write_pending(set_path: str) -> bool:
+    """Write staged changes for ``set_path``; return ``True`` if anything was written."""
+    with _lock:
+        cached = _songs.get(set_path)
+        touched = _touched.get(set_path)
+    if not cached or not cached[2]:
+        return False
+    song = cached[1]
+    _write_atomic(set_path, song, touched)
+    with _lock:
+        current = _songs.get(set_path)
+        # Only mark clean if no newer edit was staged while writing
+        if current is not None and current[1] is song:
+            stamp = _stamp(set_path)
+            _songs[set_path] = (stamp, song, False)
+            _touched[set_path] = set()
+            _versions[set_path] = (stamp, _versions.get(set_path, (None, 0))[1])
+    return True
+
+
+def song_version(set_path: str) -> str:
+    """Return an opaque token identifying the current version of ``set_path``.
+
+    The token changes with every save or staged edit and whenever the file is
+    found changed on disk.  Clients send it back with edits so changes made in
+    between (from another tab or on the device) are detected instead of
+    silently overwritten.
+    """
+    stamp = _stamp(set_path)
+    with _lock:
+        cached = _songs.get(set_path)
+        if cached is None or not cached[2]:
+            _bump_version(set_path, stamp, False)
+        return f"{_BOOT}-{_versions[set_path][1]:x}"
+
+
+def invalidate_song(set_path: Optional[str] = None) -> None:
+    """Forget ``set_path`` or every cached document if ``None``.
+
+    Staged changes that were not written yet are discarded as well.
+    """
+    with _lock:
+        if set_path is None:
+            _songs.clear()
+            _touched.clear()
+        else:
+            _songs.pop(set_path, None)
+            _touched.pop(set_path, None)
+        if set_path is None:
+            _track_values.clear()
+        else:
+            _track_values.pop(set_path, None)
+    song_index.forget(set_path)
+
+
+def track_value(set_path: str, track: int, name: str, build: Callable[[], Any]) -> Any:
+    """Return the value ``name`` of a track of ``set_path``, computing it once.
+
+    ``build()`` derives the value from the track's devices as last read
+    through :func:`load_song` or :func:`load_clip`; it is called again only
+    after the set changed other than in its clips.  Results are shared
+    between callers; do not modify them.
+    """
+    key = (track, name)
+    with _lock:
+        layout = _layouts.get(set_path)
+        entry = _track_values.get(set_path)
+        if layout is not None and entry is not None and entry[0] == layout and key in entry[1]:
+            _track_values.move_to_end(set_path)
+            return entry[1][key]
+    value = build()
+    if layout is None:
+        return value
+    with _lock:
+        if _layouts.get(set_path) != layout:
+            return value
+        entry = _track_values.get(set_path)
+        if entry is None or entry[0] != layout:
+            entry = (layout, {})
+            _track_values[set_path] = entry
+        entry[1][key] = value
+        _track_values.move_to_end(set_path)
+        while len(_track_values) > MAX_TRACK_VALUES:
+            _track_values.popitem(last=False)
+    return value
+
+
+def cache_info() -> Dict[str, int]:
+    """Return hit/miss/partial-read counters and the number of cached sets."""
+    with _lock:
+        return dict(_stats, size=len(_songs))
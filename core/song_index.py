@@ -0,0 +1,272 @@
+"""Byte ranges of tracks, devices and clips inside a ``Song.abl`` file.
+
+:func:`parse_indexed` parses a set like ``json.loads`` but walks the top of
+the document (the song, its tracks and their clip slots) itself and records
+where every clip, every track and each track's ``clipSlots`` and ``devices``
+start and end.  Everything below that level is still decoded by the C
+decoder through ``raw_decode``, so building the index costs about the same as
+a plain parse.
+
+With a :class:`SongIndex` cached for the file's ``(st_mtime_ns, st_size)``,
+
+* :func:`read_clip` decodes one clip and its track (without the other clips)
+  from the file instead of parsing the whole set, and
+* :func:`splice` writes edited clips back by replacing just their text, so
+  saving a clip does not re-serialize the device trees of every track.
+  Replacement text is indented like the surrounding document, which keeps the
+  output identical to ``json.dump(song, f, indent=2)`` for files written that
+  way (as Move and this project do).
+"""
+
+import json
+import re
+from collections import OrderedDict
+from json.decoder import scanstring
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+# Indexes are small (a few integers per clip) so many more are kept than
+# parsed documents.
+MAX_INDEXES = 32
+
+Span = Tuple[int, int]
+
+_WS = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+_indexes: "OrderedDict[str, SongIndex]" = OrderedDict()
+_lock = Lock()
+
+
+class SongIndex:
+    """Character offsets of the structural parts of one version of a set."""
+
+    def __init__(self, stamp=None):
+        self.stamp = stamp
+        # One dict per track: {"span", "slots", "devices", "clips": {ci: span}}
+        self.tracks: List[Dict[str, Any]] = []
+        # Offsets equal byte offsets only for pure ASCII files
+        self.ascii = True
+
+    def clip_span(self, track: int, clip: int) -> Span:
+        return self.tracks[track]["clips"][clip]
+
+
+def _skip_ws(text: str, i: int) -> int:
+    return _WS.match(text, i).end()
+
+
+def _parse_object(text: str, i: int, value_at) -> Tuple[Dict[str, Any], int]:
+    """Parse the object at ``text[i]``; ``value_at(key, pos)`` decodes values."""
+    obj: Dict[str, Any] = {}
+    i = _skip_ws(text, i + 1)
+    if text[i] == "}":
+        return obj, i + 1
+    while True:
+        if text[i] != '"':
+            raise ValueError(f"Expecting property name at {i}")
+        key, i = scanstring(text, i + 1)
+        i = _skip_ws(text, i)
+        if text[i] != ":":
+            raise ValueError(f"Expecting ':' at {i}")
+        i = _skip_ws(text, i + 1)
+        obj[key], i = value_at(key, i)
+        i = _skip_ws(text, i)
+        if text[i] == ",":
+            i = _skip_ws(text, i + 1)
+        elif text[i] == "}":
+            return obj, i + 1
+        else:
+            raise ValueError(f"Expecting ',' or '}}' at {i}")
+
+
+def _parse_array(text: str, i: int, item_at) -> Tuple[List[Any], int]:
+    """Parse the array at ``text[i]``; ``item_at(index, pos)`` decodes items."""
+    items: List[Any] = []
+    i = _skip_ws(text, i + 1)
+    if text[i] == "]":
+        return items, i + 1
+    while True:
+        item, i = item_at(len(items), i)
+        items.append(item)
+        i = _skip_ws(text, i)
+        if text[i] == ",":
+            i = _skip_ws(text, i + 1)
+        elif text[i] == "]":
+            return items, i + 1
+        else:
+            raise ValueError(f"Expecting ',' or ']' at {i}")
+
+
+def parse_indexed(text: str, stamp=None) -> Tuple[Any, SongIndex]:
+    """Return ``(json.loads(text), index)``."""
+    index = SongIndex(stamp)
+    index.ascii = text.isascii()
+
+    def track_at(ti, i):
+        if text[i] != "{":
+            index.tracks.append({"span": None, "slots": None, "devices": None, "clips": {}})
+            return _decoder.raw_decode(text, i)
+        entry = {"span": None, "slots": None, "devices": None, "clips": {}}
+        index.tracks.append(entry)
+
+        def slot_at(ci, j):
+            if text[j] != "{":
+                return _decoder.raw_decode(text, j)
+
+            def slot_value(key, k):
+                value, end = _decoder.raw_decode(text, k)
+                if key == "clip":
+                    entry["clips"][ci] = (k, end)
+                return value, end
+
+            return _parse_object(text, j, slot_value)
+
+        def track_value(key, j):
+            if key == "clipSlots" and text[j] == "[":
+                value, end = _parse_array(text, j, slot_at)
+                entry["slots"] = (j, end)
+                return value, end
+            value, end = _decoder.raw_decode(text, j)
+            if key == "devices":
+                entry["devices"] = (j, end)
+            return value, end
+
+        value, end = _parse_object(text, i, track_value)
+        entry["span"] = (i, end)
+        return value, end
+
+    def root_value(key, i):
+        if key == "tracks" and text[i] == "[":
+            return _parse_array(text, i, track_at)
+        return _decoder.raw_decode(text, i)
+
+    i = _skip_ws(text, 0)
+    if i < len(text) and text[i] == "{":
+        song, end = _parse_object(text, i, root_value)
+    else:
+        song, end = _decoder.raw_decode(text, i)
+    if _skip_ws(text, end) != len(text):
+        raise ValueError(f"Extra data at {end}")
+    return song, index
+
+
+def remember(set_path: str, index: SongIndex) -> None:
+    """Cache ``index`` as the index of ``set_path`` at ``index.stamp``."""
+    with _lock:
+        _indexes[set_path] = index
+        _indexes.move_to_end(set_path)
+        while len(_indexes) > MAX_INDEXES:
+            _indexes.popitem(last=False)
+
+
+def cached_index(set_path: str, stamp) -> Optional[SongIndex]:
+    """Return the cached index of ``set_path`` if it matches ``stamp``."""
+    with _lock:
+        index = _indexes.get(set_path)
+        if index is None or index.stamp != stamp:
+            return None
+        _indexes.move_to_end(set_path)
+        return index
+
+
+def forget(set_path: Optional[str] = None) -> None:
+    """Drop the index of ``set_path`` or every index if ``None``."""
+    with _lock:
+        if set_path is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(set_path, None)
+
+
+def _read_range(set_path: str, index: SongIndex, span: Span) -> str:
+    start, end = span
+    if index.ascii:
+        with open(set_path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start).decode("ascii")
+    with open(set_path, "r", newline="") as f:
+        return f.read()[start:end]
+
+
+def read_clip(set_path: str, index: SongIndex, track: int, clip: int) -> Tuple[Dict[str, Any], Any]:
+    """Decode track ``track`` (with empty ``clipSlots``) and one of its clips.
+
+    Raises:
+        LookupError: if the index has no such track or clip.
+    """
+    entry = index.tracks[track]
+    if entry["span"] is None or entry["slots"] is None:
+        raise LookupError(f"Track {track} not indexed")
+    start = entry["span"][0]
+    text = _read_range(set_path, index, entry["span"])
+    slots_start, slots_end = entry["slots"]
+    track_obj = json.loads(text[:slots_start - start] + "[]" + text[slots_end - start:])
+    clip_start, clip_end = index.clip_span(track, clip)
+    clip_obj = json.loads(text[clip_start - start:clip_end - start])
+    return track_obj, clip_obj
+
+
+def _serialize(text: str, span: Span, value: Any) -> str:
+    """Serialize ``value`` to replace ``text[span]``, matching its layout."""
+    newline = text.rfind("\n", 0, span[0])
+    if newline < 0:
+        # Compact document on a single line
+        return json.dumps(value)
+    line = text[newline + 1:span[0]]
+    indent = line[:len(line) - len(line.lstrip(" \t"))]
+    return json.dumps(value, indent=2).replace("\n", "\n" + indent)
+
+
+def splice(text: str, index: SongIndex, clips: Dict[Tuple[int, int], Any]) -> Tuple[str, SongIndex]:
+    """Replace the clips in ``clips`` (keyed ``(track, clip)``) in ``text``.
+
+    Returns the new text and an index for it (with ``stamp`` unset).
+
+    Raises:
+        LookupError: if a clip is not in the index.
+    """
+    edits = sorted(
+        (index.clip_span(t, c), _serialize(text, index.clip_span(t, c), value), (t, c))
+        for (t, c), value in clips.items()
+    )
+    pieces = []
+    pos = 0
+    # (old end, cumulative length change after it) for shifting offsets
+    shifts: List[Tuple[int, int]] = []
+    delta = 0
+    new_spans: Dict[Tuple[int, int], Span] = {}
+    for (start, end), replacement, key in edits:
+        pieces.append(text[pos:start])
+        pieces.append(replacement)
+        new_spans[key] = (start + delta, start + delta + len(replacement))
+        delta += len(replacement) - (end - start)
+        shifts.append((end, delta))
+        pos = end
+    pieces.append(text[pos:])
+    new_text = "".join(pieces)
+
+    def shift(p: int) -> int:
+        moved = 0
+        for end, cumulative in shifts:
+            if end > p:
+                break
+            moved = cumulative
+        return p + moved
+
+    def shift_span(span: Optional[Span]) -> Optional[Span]:
+        return None if span is None else (shift(span[0]), shift(span[1]))
+
+    new_index = SongIndex()
+    new_index.ascii = index.ascii and all(r.isascii() for _, r, _ in edits)
+    for ti, entry in enumerate(index.tracks):
+        new_index.tracks.append({
+            "span": shift_span(entry["span"]),
+            "slots": shift_span(entry["slots"]),
+            "devices": shift_span(entry["devices"]),
+            "clips": {
+                ci: new_spans.get((ti, ci)) or shift_span(span)
+                for ci, span in entry["clips"].items()
+            },
+        })
+    return new_text, new_index
@@ -1,9 +1,8 @@
 #!/usr/bin/env python3
 """Core logic for editing synth preset parameter values."""
-import os
-import json
 import logging
 
+from .preset_document import preset_document
 from .synth_preset_inspector_handler import extract_available_parameters
 
 logger = logging.getLogger(__name__)
@@ -18,7 +17,8 @@ def update_parameter_values(
     """Update parameter values in a preset.
 
     Args:
-        preset_path: Path to the source preset.
+        preset_path: Path to the source preset or a
+            :class:`~core.preset_document.PresetDocument`.
         param_updates: Mapping of parameter name to new value (as strings).
         output_path: Optional path for the modified preset. If omitted, the
             source preset is overwritten.
@@ -27,13 +27,13 @@ def update_parameter_values(
         dict with keys:
             - success: bool
             - message: status or error message
-            - path: path to written preset
+            - path: path the preset is (or, for a document, will be) saved to
     """
     try:
-        with open(preset_path, "r") as f:
-            preset_data = json.load(f)
+        document = preset_document(preset_path)
+        preset_data = document.data
 
-        info = extract_available_parameters(preset_path, device_types=device_types)
+        info = extract_available_parameters(document, device_types=device_types)
         if not info["success"]:
             return info
         paths = info.get("parameter_paths", {})
@@ -95,10 +95,7 @@ def update_parameter_values(
                 parent[key] = cast_value(val, orig_val)
             updated += 1
 
-        dest = output_path or preset_path
-        with open(dest, "w") as f:
-            json.dump(preset_data, f, indent=2)
-            f.write("\n")
+        dest = document.commit(output_path)
 
         return {
             "success": True,
@@ -114,7 +111,8 @@ def update_macro_values(preset_path, macro_updates, output_path=None):
     """Update macro values in a preset.
 
     Args:
-        preset_path: Path to the source preset.
+        preset_path: Path to the source preset or a
+            :class:`~core.preset_document.PresetDocument`.
         macro_updates: Mapping of macro index to new value (as strings).
         output_path: Optional path for the modified preset. If omitted, the
             source preset is overwritten.
@@ -123,11 +121,11 @@ def update_macro_values(preset_path, macro_updates, output_path=None):
         dict with keys:
             - success: bool
             - message: status or error message
-            - path: path to written preset
+            - path: path the preset is (or, for a document, will be) saved to
     """
     try:
-        with open(preset_path, "r") as f:
-            preset_data = json.load(f)
+        document = preset_document(preset_path)
+        preset_data = document.data
 
         def cast_value(val_str, original):
             if isinstance(original, bool):
@@ -169,10 +167,7 @@ def update_macro_values(preset_path, macro_updates, output_path=None):
 
         update_macros(preset_data)
 
-        dest = output_path or preset_path
-        with open(dest, "w") as f:
-            json.dump(preset_data, f, indent=2)
-            f.write("\n")
+        dest = document.commit(output_path)
 
         return {
             "success": True,
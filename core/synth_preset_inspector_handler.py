@@ -3,6 +3,9 @@ import os
 import json
 import logging
 from core.cache_manager import get_cache, set_cache
+from core.preset_document import preset_document
+from core.preset_index import preset_index
+from core.schema_registry import load_schema
 
 logger = logging.getLogger(__name__)
 
@@ -36,33 +39,27 @@ WAVETABLE_SPRITES_PATH = os.path.join(
 
 
 def load_drift_schema():
-    """Load parameter metadata for Drift from ``drift_schema.json``."""
-    try:
-        with open(SCHEMA_PATH, "r") as f:
-            return json.load(f)
-    except Exception as exc:
-        logger.warning("Could not load drift schema: %s", exc)
-        return {}
+    """Load parameter metadata for Drift from ``drift_schema.json``.
+
+    The result is shared between callers and must not be modified.
+    """
+    return load_schema(SCHEMA_PATH)
 
 
 def load_wavetable_schema():
-    """Load parameter metadata for Wavetable from ``wavetable_schema.json``."""
-    try:
-        with open(WAVETABLE_SCHEMA_PATH, "r") as f:
-            return json.load(f)
-    except Exception as exc:
-        logger.warning("Could not load wavetable schema: %s", exc)
-        return {}
+    """Load parameter metadata for Wavetable from ``wavetable_schema.json``.
+
+    The result is shared between callers and must not be modified.
+    """
+    return load_schema(WAVETABLE_SCHEMA_PATH)
 
 
 def load_melodic_sampler_schema():
-    """Load parameter metadata for MelodicSampler from ``melodicSampler_schema.json``."""
-    try:
-        with open(MELODIC_SAMPLER_SCHEMA_PATH, "r") as f:
-            return json.load(f)
-    except Exception as exc:
-        logger.warning("Could not load melodic sampler schema: %s", exc)
-        return {}
+    """Load parameter metadata for MelodicSampler from ``melodicSampler_schema.json``.
+
+    The result is shared between callers and must not be modified.
+    """
+    return load_schema(MELODIC_SAMPLER_SCHEMA_PATH)
 
 
 def load_wavetable_sprites():
@@ -115,8 +112,7 @@ def extract_available_parameters(
             - parameters: List of parameter names
     """
     try:
-        with open(preset_path, 'r') as f:
-            preset_data = json.load(f)
+        preset_data = preset_document(preset_path).data
         
         # Set to store unique parameter names
         parameters = set()
@@ -204,8 +200,7 @@ def extract_available_parameters(
 def extract_parameter_values(preset_path, device_types=("drift",)):
     """Return all parameter names and their values from synth presets."""
     try:
-        with open(preset_path, "r") as f:
-            preset_data = json.load(f)
+        preset_data = preset_document(preset_path).data
 
         parameter_values = {}
         synth_device_paths = set()
@@ -280,8 +275,7 @@ def extract_macro_information(preset_path):
             - mapped_parameters: Dict mapping parameter names to their macro indices
     """
     try:
-        with open(preset_path, 'r') as f:
-            preset_data = json.load(f)
+        preset_data = preset_document(preset_path).data
         
         # Initialize macros dictionary
         macros = {}
@@ -418,8 +412,8 @@ def update_preset_macro_names(preset_path, macro_updates):
     """
     try:
         # Load the preset file
-        with open(preset_path, 'r') as f:
-            preset_data = json.load(f)
+        document = preset_document(preset_path)
+        preset_data = document.data
         
         # Find the device parameters where macros are defined
         def find_and_update_macros(data, path=""):
@@ -479,8 +473,7 @@ def update_preset_macro_names(preset_path, macro_updates):
         updated_count = find_and_update_macros(preset_data)
         
         # Write the updated preset back to the file
-        with open(preset_path, 'w') as f:
-            json.dump(preset_data, f, indent=2)
+        document.commit()
         
         return {
             'success': True,
@@ -517,8 +510,8 @@ def update_preset_parameter_mappings(preset_path, parameter_updates):
     """
     try:
         # Load the preset file
-        with open(preset_path, 'r') as f:
-            preset_data = json.load(f)
+        document = preset_document(preset_path)
+        preset_data = document.data
         
         # Track parameters that were updated
         updated_params = []
@@ -557,7 +550,7 @@ def update_preset_parameter_mappings(preset_path, parameter_updates):
             return current
         
         # First, get information about currently mapped parameters
-        macro_info = extract_macro_information(preset_path)
+        macro_info = extract_macro_information(document)
         mapped_parameters = {}
         if macro_info['success']:
             mapped_parameters = macro_info.get('mapped_parameters', {})
@@ -731,8 +724,7 @@ def update_preset_parameter_mappings(preset_path, parameter_updates):
         update_parameter_mappings(preset_data)
         
         # Write the updated preset back to the file
-        with open(preset_path, 'w') as f:
-            json.dump(preset_data, f, indent=2)
+        document.commit()
         
         return {
             'success': True,
@@ -760,8 +752,8 @@ def delete_parameter_mapping(preset_path, param_path):
     """
     try:
         # Load the preset file
-        with open(preset_path, 'r') as f:
-            preset_data = json.load(f)
+        document = preset_document(preset_path)
+        preset_data = document.data
         
         # Helper function to get the object at a specific path
         def get_object_at_path(data, path):
@@ -810,8 +802,7 @@ def delete_parameter_mapping(preset_path, param_path):
                 parent[key] = original_value
                 
                 # Write the updated preset back to the file
-                with open(preset_path, 'w') as f:
-                    json.dump(preset_data, f, indent=2)
+                document.commit()
                 
                 return {
                     'success': True,
@@ -835,8 +826,9 @@ def delete_parameter_mapping(preset_path, param_path):
         }
 
 def scan_for_synth_presets(device_types=("drift",)):
-    """Scan ``Track Presets`` for synth presets using a cache."""
-    cache_key = "synth_presets"
+    """Scan ``Track Presets`` for synth presets using the preset index."""
+    device_types = tuple(device_types)
+    cache_key = "synth_presets:" + ",".join(device_types)
     cached = get_cache(cache_key)
     if cached is not None:
         return {
@@ -851,49 +843,16 @@ def scan_for_synth_presets(device_types=("drift",)):
             presets_dir = "examples/Track Presets"
 
         synth_presets = []
-
-        # Function to recursively search for specific device types
-        def has_device_type(data, device_types):
-            if isinstance(data, dict):
-                if data.get('kind') in device_types:
-                    return data.get('kind')
-                for v in data.values():
-                    result = has_device_type(v, device_types)
-                    if result:
-                        return result
-            elif isinstance(data, list):
-                for item in data:
-                    result = has_device_type(item, device_types)
-                    if result:
-                        return result
-            return None
-
-        # Scan all .ablpreset files in all subdirectories
-        for root, dirs, files in os.walk(presets_dir):
-            for filename in files:
-                if filename.endswith('.ablpreset'):
-                    filepath = os.path.join(root, filename)
-                    try:
-                        with open(filepath, 'r') as f:
-                            preset_data = json.load(f)
-
-                        # Check if preset contains one of the requested devices
-                        device_type = has_device_type(preset_data, device_types)
-                        if device_type:
-                            preset_name = os.path.splitext(filename)[0]
-                            rel = os.path.relpath(filepath, presets_dir)
-                            rel_no_ext = os.path.splitext(rel)[0]
-                            synth_presets.append({
-                                'name': preset_name,
-                                'path': filepath,
-                                'display_path': rel_no_ext,
-                                'type': device_type
-                            })
-                    except Exception as e:
-                        logger.warning("Could not parse preset %s: %s", filename, e)
-                        continue
-
-        set_cache(cache_key, synth_presets)
+        for filepath, device_type in preset_index.find(presets_dir, device_types, (".ablpreset",)):
+            rel = os.path.relpath(filepath, presets_dir)
+            synth_presets.append({
+                'name': os.path.splitext(os.path.basename(filepath))[0],
+                'path': filepath,
+                'display_path': os.path.splitext(rel)[0],
+                'type': device_type
+            })
+
+        set_cache(cache_key, synth_presets, paths=(presets_dir,))
         return {
             "success": True,
             "message": f"Found {len(synth_presets)} synth presets",
@@ -910,8 +869,7 @@ def scan_for_synth_presets(device_types=("drift",)):
 def extract_wavetable_sprites(preset_path):
     """Return the sprite URIs from the first Wavetable device in the preset."""
     try:
-        with open(preset_path, "r") as f:
-            data = json.load(f)
+        data = preset_document(preset_path).data
 
         sprite1 = None
         sprite2 = None
@@ -945,8 +903,8 @@ def extract_wavetable_sprites(preset_path):
 def update_wavetable_sprites(preset_path, sprite1=None, sprite2=None, output_path=None):
     """Update sprite URIs on all Wavetable devices in the preset."""
     try:
-        with open(preset_path, "r") as f:
-            data = json.load(f)
+        document = preset_document(preset_path)
+        data = document.data
 
         sprite1_uri = sprite_name_to_uri(sprite1) if sprite1 is not None else None
         sprite2_uri = sprite_name_to_uri(sprite2) if sprite2 is not None else None
@@ -965,10 +923,7 @@ def update_wavetable_sprites(preset_path, sprite1=None, sprite2=None, output_pat
 
         update(data)
 
-        dest = output_path or preset_path
-        with open(dest, "w") as f:
-            json.dump(data, f, indent=2)
-            f.write("\n")
+        dest = document.commit(output_path)
 
         return {"success": True, "path": dest, "message": "Updated sprites"}
     except Exception as exc:
@@ -978,8 +933,7 @@ def update_wavetable_sprites(preset_path, sprite1=None, sprite2=None, output_pat
 def extract_wavetable_mod_matrix(preset_path):
     """Return modulation matrix information from all Wavetable devices."""
     try:
-        with open(preset_path, "r") as f:
-            data = json.load(f)
+        data = preset_document(preset_path).data
 
         matrix = []
 
@@ -1021,8 +975,8 @@ def extract_wavetable_mod_matrix(preset_path):
 def update_wavetable_mod_matrix(preset_path, matrix, output_path=None):
     """Update modulation matrix data on all Wavetable devices."""
     try:
-        with open(preset_path, "r") as f:
-            data = json.load(f)
+        document = preset_document(preset_path)
+        data = document.data
 
         mods_dict = {}
         for row in matrix:
@@ -1046,10 +1000,7 @@ def update_wavetable_mod_matrix(preset_path, matrix, output_path=None):
 
         update(data)
 
-        dest = output_path or preset_path
-        with open(dest, "w") as f:
-            json.dump(data, f, indent=2)
-            f.write("\n")
+        dest = document.commit(output_path)
 
         return {"success": True, "path": dest, "message": "Updated modulation matrix"}
     except Exception as exc:
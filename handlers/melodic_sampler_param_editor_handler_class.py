@@ -6,6 +6,7 @@ import shutil
 
 from handlers.base_handler import BaseHandler
 from core.file_browser import generate_dir_html
+from core.schema_registry import schema_enums, schema_json
 from core.synth_preset_inspector_handler import (
     extract_parameter_values,
     load_melodic_sampler_schema,
@@ -23,6 +24,7 @@ from core.melodic_sampler_handler import (
     get_melodic_sampler_sample,
     replace_melodic_sampler_sample,
 )
+from core.preset_document import PresetDocument, preset_source
 from core.refresh_handler import refresh_library
 
 DEFAULT_PRESET = os.path.join(
@@ -137,7 +139,7 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
             'param_count': 0,
             'browser_root': base_dir,
             'browser_filter': 'melodicsampler',
-            'schema_json': json.dumps(schema),
+            'schema_json': schema_json(schema),
             'default_preset_path': DEFAULT_PRESET,
             'macro_knobs_html': '',
             'rename_checked': False,
@@ -186,6 +188,7 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
         is_core = preset_path.startswith(CORE_LIBRARY_DIR)
 
         rename_flag = False
+        document = None
         if action == 'save_params':
             try:
                 count = int(form.getvalue('param_count', '0'))
@@ -212,15 +215,18 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
                     directory = NEW_PRESET_DIR
                 output_path = os.path.join(directory, new_name)
                 os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            try:
+                document = PresetDocument.load(preset_path)
+            except Exception as exc:
+                return self.format_error_response(f"Error updating parameters: {exc}")
             result = update_parameter_values(
-                preset_path,
+                document,
                 updates,
                 output_path,
                 device_types=("melodicSampler",),
             )
             if not result['success']:
                 return self.format_error_response(result['message'])
-            preset_path = result['path']
 
             # Handle optional sample replacement
             replace_flag = form.getvalue('replace_sample') in ('on', 'true', '1')
@@ -231,7 +237,7 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
                     if err:
                         logger.error('Sample upload failed: %s', err.get('message'))
                     return self.format_error_response(err.get('message', 'Failed to upload new sample'))
-                res = replace_melodic_sampler_sample(preset_path, new_path)
+                res = replace_melodic_sampler_sample(document, new_path)
                 self.cleanup_upload(new_path)
                 if not res.get('success'):
                     return self.format_error_response(res.get('message', 'Sample replace failed'))
@@ -240,6 +246,12 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
             # Melodic Sampler presets do not use macros. Skip macro name updates
             # and parameter mapping to avoid writing macroMapping entries.
 
+            # Every edit above went to the in-memory document; write it once
+            try:
+                preset_path = document.save()
+            except Exception as exc:
+                return self.format_error_response(f"Error saving preset: {exc}")
+
             message = result['message'] + sample_msg
             if output_path:
                 message += f" Saved to {output_path}"
@@ -261,12 +273,13 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
         else:
             return self.format_error_response("Unknown action")
 
-        values = extract_parameter_values(preset_path, device_types=("melodicSampler",))
+        source = document if document is not None else preset_source(preset_path)
+        values = extract_parameter_values(source, device_types=("melodicSampler",))
         params_html = ''
         param_count = 0
 
         macro_knobs_html = ''
-        macro_info = extract_macro_information(preset_path)
+        macro_info = extract_macro_information(source)
         mapped_params = {}
         macros_json = '[]'
         available_params_json = '[]'
@@ -283,11 +296,11 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
             macros_json = json.dumps(macros_for_json)
 
         param_info = extract_available_parameters(
-            preset_path,
+            source,
             device_types=("melodicSampler",),
             schema_loader=load_melodic_sampler_schema,
         )
-        sample_info = get_melodic_sampler_sample(preset_path)
+        sample_info = get_melodic_sampler_sample(source)
         if param_info['success']:
             params = [p for p in param_info['parameters'] if p not in EXCLUDED_MACRO_PARAMS]
             paths = {k: v for k, v in param_info.get('parameter_paths', {}).items() if k not in EXCLUDED_MACRO_PARAMS}
@@ -341,7 +354,7 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
             'param_count': param_count,
             'browser_root': base_dir,
             'browser_filter': 'melodicsampler',
-            'schema_json': json.dumps(load_melodic_sampler_schema()),
+            'schema_json': schema_json(load_melodic_sampler_schema()),
             'default_preset_path': DEFAULT_PRESET,
             'macro_knobs_html': macro_knobs_html,
             'rename_checked': rename_flag if action == 'save_params' else is_core,
@@ -352,7 +365,7 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
             'sample_path': sample_info.get('sample_path', '') if sample_info.get('success', False) else '',
         }
 
-    def _build_param_item(self, idx, name, value, meta, label=None, hide_label=False, slider=False, extra_classes=""):
+    def _build_param_item(self, idx, name, value, meta, label=None, hide_label=False, slider=False, extra_classes="", options=()):
         p_type = meta.get('type')
         label = label if label is not None else self.LABEL_OVERRIDES.get(name, name)
         classes = 'param-item'
@@ -361,9 +374,9 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
         html = [f'<div class="{classes}" data-name="{name}">']
         if not hide_label:
             html.append(f'<span class="param-label">{label}</span>')
-        if p_type == 'enum' and meta.get('options'):
+        if p_type == 'enum' and options:
             html.append(f'<select class="param-select" name="param_{idx}_value">')
-            for opt in meta['options']:
+            for opt in options:
                 sel = ' selected' if str(value) == str(opt) else ''
                 html.append(f'<option value="{opt}"{sel}>{opt}</option>')
             html.append('</select>')
@@ -416,6 +429,7 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
             mapped_parameters = {}
 
         schema = load_melodic_sampler_schema()
+        enums = schema_enums(schema)
 
         # Build HTML for each parameter keyed by name
         param_items = {}
@@ -428,7 +442,7 @@ class MelodicSamplerParamEditorHandler(BaseHandler):
                 macro_idx = mapped_parameters[name]['macro_index']
                 extra = f'macro-{macro_idx}'
             param_items[name] = self._build_param_item(
-                i, name, val, meta, extra_classes=extra
+                i, name, val, meta, extra_classes=extra, options=enums.get(name, ())
             )
 
         def row(names):
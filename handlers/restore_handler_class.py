@@ -1,9 +1,14 @@
 import os
+import html
+import shutil
 import logging
+import tempfile
 from handlers.base_handler import BaseHandler
-from core.list_msets_handler import list_msets
+from core.set_registry import set_registry
 from core.restore_handler import restore_ablbundle, restore_abl
+from core.batch_restore import BatchRestoreJob, build_plan, expand_uploads
 from core.pad_colors import PAD_COLORS, PAD_COLOR_LABELS, rgb_string
+from core.set_search import set_index, summary_text
 import json
 
 class RestoreHandler(BaseHandler):
@@ -19,10 +24,9 @@ class RestoreHandler(BaseHandler):
             dict: Context for rendering the restore.html template.
         """
         try:
-            msets, ids = list_msets(return_free_ids=True)
-            free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
+            snap = set_registry.snapshot()
+            free_pads = sorted([pad_id + 1 for pad_id in snap.free])
+            pad_grid = self.generate_pad_grid(snap.used, snap.color_map)
             logging.info(f"Available Pads: {free_pads}")
 
             return {
@@ -41,6 +45,16 @@ class RestoreHandler(BaseHandler):
                 "message": "Error retrieving available pads."
             }
 
+    def pad_context(self):
+        """Return pad options, pad grid and color options from the set registry."""
+        snap = set_registry.snapshot()
+        free_pads = sorted([pad_id + 1 for pad_id in snap.free])
+        return {
+            "options": self.generate_pad_options(free_pads),
+            "pad_grid": self.generate_pad_grid(snap.used, snap.color_map),
+            "color_options": self.generate_color_options(),
+        }
+
     def handle_post(self, form):
         """
         Handles POST requests to restore an uploaded set file.
@@ -51,14 +65,7 @@ class RestoreHandler(BaseHandler):
         """
         valid, error_response = self.validate_action(form, "restore_ablbundle")
         if not valid:
-            msets, ids = list_msets(return_free_ids=True)
-            free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-            options = self.generate_pad_options(free_pads)
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
-            error_response["options"] = options
-            error_response["color_options"] = self.generate_color_options()
-            error_response["pad_grid"] = pad_grid
+            error_response.update(self.pad_context())
             return error_response
 
         pad_selected = form.getvalue("mset_index")
@@ -66,51 +73,24 @@ class RestoreHandler(BaseHandler):
 
         # Early validation: pad index
         if not pad_selected or not pad_selected.isdigit():
-            msets, ids = list_msets(return_free_ids=True)
-            free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-            options = self.generate_pad_options(free_pads)
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
-            return self.format_error_response("Invalid pad selection provided.", options=options, pad_grid=pad_grid, color_options=self.generate_color_options())
+            return self.format_error_response("Invalid pad selection provided.", **self.pad_context())
         # Early validation: color
         if not pad_color or not pad_color.isdigit():
-            msets, ids = list_msets(return_free_ids=True)
-            free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-            options = self.generate_pad_options(free_pads)
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
-            return self.format_error_response("Invalid pad color provided.", options=options, pad_grid=pad_grid, color_options=self.generate_color_options())
+            return self.format_error_response("Invalid pad color provided.", **self.pad_context())
 
         pad_selected = int(pad_selected) - 1  # Convert back to internal ID
         pad_color = int(pad_color)
 
         if not (0 <= pad_selected <= 31):
-            msets, ids = list_msets(return_free_ids=True)
-            free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-            options = self.generate_pad_options(free_pads)
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
-            return self.format_error_response("Invalid pad selection. Must be between 1 and 32.", options=options, pad_grid=pad_grid, color_options=self.generate_color_options())
+            return self.format_error_response("Invalid pad selection. Must be between 1 and 32.", **self.pad_context())
         if not (1 <= pad_color <= 25):
-            msets, ids = list_msets(return_free_ids=True)
-            free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-            options = self.generate_pad_options(free_pads)
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
-            return self.format_error_response("Invalid pad color. Must be between 1 and 25.", options=options, pad_grid=pad_grid, color_options=self.generate_color_options())
+            return self.format_error_response("Invalid pad color. Must be between 1 and 25.", **self.pad_context())
 
         success, filepath, error_response = self.handle_file_upload(form, "ablbundle")
         if not success:
-            msets, ids = list_msets(return_free_ids=True)
-            free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-            options = self.generate_pad_options(free_pads)
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
             if error_response is None:
                 error_response = {}
-            error_response["options"] = options
-            error_response["color_options"] = self.generate_color_options()
-            error_response["pad_grid"] = pad_grid
+            error_response.update(self.pad_context())
             return error_response
 
         try:
@@ -122,27 +102,66 @@ class RestoreHandler(BaseHandler):
             if result["success"]:
                 # Add 1 to pad_selected for display since we subtracted 1 earlier
                 result["message"] = result["message"].replace(f"pad ID {pad_selected}", f"pad ID {pad_selected + 1}")
-                msets, ids = list_msets(return_free_ids=True)
-                free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-                options = self.generate_pad_options(free_pads)
-                color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-                pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
-                return self.format_success_response(result["message"], options, pad_grid)
+                context = self.pad_context()
+                return self.format_success_response(result["message"], context["options"], context["pad_grid"])
             else:
-                # Regenerate available pad options on error
-                msets, ids = list_msets(return_free_ids=True)
-                free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-                options = self.generate_pad_options(free_pads)
-                color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-                pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
-                return self.format_error_response(result["message"], options=options, pad_grid=pad_grid, color_options=self.generate_color_options())
+                return self.format_error_response(result["message"], **self.pad_context())
         except Exception as e:
-            msets, ids = list_msets(return_free_ids=True)
-            free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-            options = self.generate_pad_options(free_pads)
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
-            return self.format_error_response(f"Error restoring bundle: {str(e)}", options=options, pad_grid=pad_grid, color_options=self.generate_color_options())
+            return self.format_error_response(f"Error restoring bundle: {str(e)}", **self.pad_context())
+
+    def handle_batch_post(self, form, emit=None, runner=None):
+        """
+        Start a batch restore of several uploaded set files.
+
+        ``form['bundles']`` is a list of uploaded ``.ablbundle``/``.abl``
+        files or ``.zip`` archives of them and ``form['plan']`` an optional
+        JSON list of ``{"file", "pad", "color"}`` entries.  The plan is
+        validated before anything is written; restoring happens in the
+        background (as a task of ``runner``, see :mod:`core.batch_restore`)
+        and progress is reported through ``emit``.
+        """
+        uploads = form.getvalue("bundles") or []
+        if not isinstance(uploads, list):
+            uploads = [uploads]
+        uploads = [u for u in uploads if getattr(u, "filename", None)]
+        if not uploads:
+            return self.format_json_response({"success": False, "message": "No set files uploaded."}, status=400)
+
+        try:
+            entries = json.loads(form.getvalue("plan") or "[]")
+        except ValueError:
+            return self.format_json_response({"success": False, "message": "Invalid plan JSON."}, status=400)
+        if not isinstance(entries, list):
+            return self.format_json_response({"success": False, "message": "Plan must be a list."}, status=400)
+        if not all(isinstance(entry, dict) for entry in entries):
+            return self.format_json_response({"success": False, "message": "Plan entries must be objects."}, status=400)
+
+        work_dir = tempfile.mkdtemp(dir=self.upload_dir)
+        try:
+            paths = []
+            for upload in uploads:
+                path = os.path.join(work_dir, os.path.basename(upload.filename))
+                with open(path, "wb") as f:
+                    shutil.copyfileobj(upload.file, f)
+                paths.append(path)
+            files = expand_uploads(paths, os.path.join(work_dir, "extracted"))
+            if not files:
+                raise ValueError("No .ablbundle or .abl files found in upload.")
+            plan, error = build_plan(files, entries, set_registry.snapshot().free)
+            if error:
+                raise ValueError(error)
+        except Exception as e:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return self.format_json_response({"success": False, "message": str(e)}, status=400)
+
+        job = BatchRestoreJob(plan, emit=emit, work_dir=work_dir, runner=runner).start()
+        logging.info(f"Started batch restore {job.job_id} with {len(plan)} sets")
+        return self.format_json_response({
+            "success": True,
+            "message": f"Restoring {len(plan)} sets",
+            "job_id": job.job_id,
+            "plan": [{"file": p["file"], "pad": p["pad"] + 1, "color": p["color"]} for p in plan],
+        }, status=202)
 
     def generate_pad_options(self, free_pads):
         """
@@ -169,6 +188,7 @@ class RestoreHandler(BaseHandler):
     def generate_pad_grid(self, used_ids, color_map):
         """Return HTML for a 32-pad grid showing occupied pads with colors."""
         cells = []
+        summaries = set_index.pad_summaries()
         for row in range(4):
             for col in range(8):
                 idx = (3 - row) * 8 + col
@@ -177,11 +197,13 @@ class RestoreHandler(BaseHandler):
                 status = 'occupied' if occupied else 'free'
                 disabled = 'disabled' if occupied else ''
                 color_id = color_map.get(idx)
+                tip = summary_text(summaries.get(idx))
+                title = f' title="{html.escape(tip)}"' if tip else ''
                 style = f' style="background-color: {rgb_string(color_id)}"' if color_id else ''
                 label_text = "" if not occupied else ""
                 cells.append(
                     f'<input type="radio" id="restore_pad_{num}" name="mset_index" value="{num}" {disabled}>'
-                    f'<label for="restore_pad_{num}" class="pad-cell {status}"{style}>{label_text}</label>'
+                    f'<label for="restore_pad_{num}" class="pad-cell {status}"{style}{title}>{label_text}</label>'
                 )
         return '<div class="pad-grid">' + ''.join(cells) + '</div>'
 
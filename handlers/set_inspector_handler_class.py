@@ -3,17 +3,22 @@ from core.set_inspector_handler import (
     list_clips,
     get_clip_data,
     save_envelope,
+    patch_clip,
     set_read_only,
     is_read_only,
 )
-from core.list_msets_handler import list_msets
+from core.set_registry import set_registry, song_path_for
+from core import set_writer
+from core.set_diff import diff_backup
+from core.clip_transform import transform_clips
 from core.set_backup_handler import (
     list_backups,
     restore_backup,
     get_current_timestamp,
 )
 from core.pad_colors import rgb_string
-from core.config import MSETS_DIRECTORY
+from core.set_search import set_index, summary_text
+import html
 import json
 import os
 
@@ -28,6 +33,7 @@ class SetInspectorHandler(BaseHandler):
             selected_idx (int, optional): Pad index to mark as selected.
         """
         cells = []
+        summaries = set_index.pad_summaries()
         for row in range(4):
             for col in range(8):
                 idx = (3 - row) * 8 + col
@@ -37,13 +43,15 @@ class SetInspectorHandler(BaseHandler):
                 disabled = '' if has_set else 'disabled'
                 checked = ' checked' if selected_idx is not None and idx == selected_idx else ''
                 color_id = color_map.get(idx)
+                tip = summary_text(summaries.get(idx))
+                title = f' title="{html.escape(tip)}"' if tip else ''
                 style = f' style="background-color: {rgb_string(color_id)}"' if color_id else ''
                 name_attr = (
                     f" data-name=\"{name_map.get(idx, '')}\"" if idx in name_map else ""
                 )
                 cells.append(
                     f'<input type="radio" id="inspect_pad_{num}" name="pad_index" value="{num}"{checked} {disabled}>'
-                    f'<label for="inspect_pad_{num}" class="pad-cell {status}"{style}{name_attr}></label>'
+                    f'<label for="inspect_pad_{num}" class="pad-cell {status}"{style}{title}{name_attr}></label>'
                 )
         return '<div class="pad-grid">' + ''.join(cells) + '</div>'
 
@@ -75,16 +83,8 @@ class SetInspectorHandler(BaseHandler):
         return '<div class="pad-grid">' + ''.join(cells) + '</div>'
 
     def handle_get(self):
-        msets, ids = list_msets(return_free_ids=True)
-        used = ids.get("used", set())
-        color_map = {
-            int(m["mset_id"]): int(m["mset_color"])
-            for m in msets
-            if str(m["mset_color"]).isdigit()
-        }
-        name_map = {int(m["mset_id"]): m["mset_name"] for m in msets}
-        selected_idx = None
-        pad_grid = self.generate_pad_grid(used, color_map, name_map)
+        snap = set_registry.snapshot()
+        pad_grid = self.generate_pad_grid(snap.used, snap.color_map, snap.name_map)
         return {
             "pad_grid": pad_grid,
             "message": "Select a set to inspect",
@@ -103,16 +103,186 @@ class SetInspectorHandler(BaseHandler):
             "read_only": False,
         }
 
+    def envelope_options(self, envelopes, param_map, param_context):
+        """Return ``{"id", "label"}`` entries for the envelope selector."""
+        return [
+            {
+                "id": e.get("parameterId"),
+                "label": (
+                    f'{param_context.get(e.get("parameterId"), "Track")}: '
+                    f'{param_map.get(e.get("parameterId"), e.get("parameterId"))}'
+                ),
+            }
+            for e in envelopes
+        ]
+
+    def _envelope_tolerance(self, value):
+        """Return the envelope simplification tolerance of a save request.
+
+        Saves send ``envelope_tolerance`` as a percentage of the parameter
+        range.  Without it, or with an empty value, nothing is simplified.
+        """
+        if value is None:
+            return None
+        try:
+            percent = float(value)
+        except (TypeError, ValueError):
+            return None
+        return percent / 100.0 if percent >= 0 else None
+
+    def handle_api(self, resource, args):
+        """
+        Return JSON for a single part of the inspector page.
+
+        ``resource`` is ``clip`` (notes, envelopes and region of one clip),
+        ``clips`` (clip list of a set), ``backups`` (backups and current
+        version), ``status`` (write-behind state from
+        :func:`core.set_writer.status`) or ``diff`` (changes since the backup
+        named by ``backup``, or between ``backup`` and ``other``). ``args`` must contain ``set_path`` naming a set known to the
+        set registry; ``clip`` also needs ``track`` and ``clip`` indices.
+        """
+        set_path = args.get("set_path")
+        if not set_path or set_registry.snapshot().by_path(set_path) is None:
+            return self.format_json_response({"success": False, "message": "Unknown set"}, status=404)
+
+        if resource == "clip":
+            try:
+                track_idx = int(args.get("track"))
+                clip_idx = int(args.get("clip"))
+            except (TypeError, ValueError):
+                return self.format_json_response({"success": False, "message": "Invalid clip"}, status=400)
+            result = get_clip_data(set_path, track_idx, clip_idx)
+            if not result.get("success"):
+                return self.format_json_response(result, status=404)
+            result["env_options"] = self.envelope_options(
+                result.get("envelopes", []),
+                result.get("param_map", {}),
+                result.get("param_context", {}),
+            )
+            result["track_index"] = track_idx
+            result["clip_index"] = clip_idx
+            return self.format_json_response(result)
+        if resource == "clips":
+            result = list_clips(set_path)
+            return self.format_json_response(result, status=200 if result.get("success") else 500)
+        if resource == "backups":
+            return self.format_json_response({
+                "success": True,
+                "message": "Backups loaded",
+                "backups": list_backups(set_path),
+                "current_ts": get_current_timestamp(set_path),
+                "read_only": is_read_only(set_path),
+            })
+        if resource == "diff":
+            backup_name = args.get("backup")
+            if not backup_name:
+                return self.format_json_response({"success": False, "message": "Missing backup"}, status=400)
+            result = diff_backup(set_path, backup_name, args.get("other"))
+            return self.format_json_response(result, status=200 if result.get("success") else 404)
+        if resource == "status":
+            return self.format_json_response(dict(
+                set_writer.status(set_path), success=True, message="Status loaded"
+            ))
+        return self.format_json_response({"success": False, "message": f"Unknown resource: {resource}"}, status=404)
+
+    def handle_transform(self, payload):
+        """
+        Run a note transform chain posted as JSON.
+
+        ``payload`` holds ``set_path``, a ``chain`` as accepted by
+        :func:`core.clip_transform.transform_clips` and optionally ``track``
+        and ``clip`` to narrow it to one track or clip, plus ``version``.
+        """
+        payload = payload or {}
+        set_path = payload.get("set_path")
+        if not set_path or set_registry.snapshot().by_path(set_path) is None:
+            return self.format_json_response({"success": False, "message": "Unknown set"}, status=404)
+        try:
+            track_idx = int(payload["track"]) if payload.get("track") is not None else None
+            clip_idx = int(payload["clip"]) if payload.get("clip") is not None else None
+        except (TypeError, ValueError):
+            return self.format_json_response({"success": False, "message": "Invalid clip"}, status=400)
+        if is_read_only(set_path):
+            return self.format_json_response({"success": False, "message": "Set is read-only"}, status=403)
+
+        result = transform_clips(
+            set_path,
+            payload.get("chain"),
+            track_idx,
+            clip_idx,
+            version=payload.get("version"),
+            defer=True,
+        )
+        if result.get("conflict"):
+            status = 409
+        elif not result.get("success"):
+            status = 400
+        else:
+            status = 200
+        return self.format_json_response(result, status=status)
+
+    def handle_commit(self, payload):
+        """Write any buffered edits of ``payload["set_path"]`` to disk now."""
+        payload = payload or {}
+        set_path = payload.get("set_path")
+        if not set_path or set_registry.snapshot().by_path(set_path) is None:
+            return self.format_json_response({"success": False, "message": "Unknown set"}, status=404)
+        if not set_writer.commit(set_path):
+            return self.format_json_response(dict(
+                set_writer.status(set_path), success=False, message="Failed to save set"
+            ), status=500)
+        return self.format_json_response(dict(
+            set_writer.status(set_path), success=True, message="Set saved"
+        ))
+
+    def handle_patch(self, payload):
+        """
+        Apply an incremental clip edit posted as JSON.
+
+        ``payload`` holds ``set_path``, ``track``, ``clip``, the ``version``
+        token returned by the clip API, a list of ``ops`` as accepted by
+        :func:`core.set_inspector_handler.patch_clip` and optionally the
+        ``envelope_tolerance`` percentage.
+        """
+        payload = payload or {}
+        set_path = payload.get("set_path")
+        if not set_path or set_registry.snapshot().by_path(set_path) is None:
+            return self.format_json_response({"success": False, "message": "Unknown set"}, status=404)
+        ops = payload.get("ops")
+        if not isinstance(ops, list):
+            return self.format_json_response({"success": False, "message": "ops must be a list"}, status=400)
+        try:
+            track_idx = int(payload.get("track"))
+            clip_idx = int(payload.get("clip"))
+        except (TypeError, ValueError):
+            return self.format_json_response({"success": False, "message": "Invalid clip"}, status=400)
+        if is_read_only(set_path):
+            return self.format_json_response({"success": False, "message": "Set is read-only"}, status=403)
+
+        result = patch_clip(
+            set_path,
+            track_idx,
+            clip_idx,
+            ops,
+            payload.get("version"),
+            defer=True,
+            tolerance=self._envelope_tolerance(payload.get("envelope_tolerance")),
+        )
+        if result.get("conflict"):
+            status = 409
+        elif not result.get("success"):
+            status = 400
+        else:
+            status = 200
+        return self.format_json_response(result, status=status)
+
     def handle_post(self, form):
         action = form.getvalue("action")
-        msets, ids = list_msets(return_free_ids=True)
-        used = ids.get("used", set())
-        color_map = {
-            int(m["mset_id"]): int(m["mset_color"])
-            for m in msets
-            if str(m["mset_color"]).isdigit()
-        }
-        name_map = {int(m["mset_id"]): m["mset_name"] for m in msets}
+        snap = set_registry.snapshot()
+        used = snap.used
+        color_map = snap.color_map
+        name_map = snap.name_map
+        selected_idx = None
         pad_grid = self.generate_pad_grid(used, color_map, name_map)
 
         if action == "select_set":
@@ -120,24 +290,14 @@ class SetInspectorHandler(BaseHandler):
             set_path = form.getvalue("set_path")
             if pad_val and pad_val.isdigit():
                 idx = int(pad_val) - 1
-                entry = next((m for m in msets if m.get("mset_id") == idx), None)
+                entry = snap.by_pad(idx)
                 if not entry:
                     pad_grid = self.generate_pad_grid(used, color_map, name_map)
                     return self.format_error_response("No set on selected pad", pad_grid=pad_grid)
-                set_path = os.path.join(
-                    MSETS_DIRECTORY,
-                    entry["uuid"],
-                    entry["mset_name"],
-                    "Song.abl",
-                )
+                set_path = song_path_for(entry)
                 selected_idx = idx
             elif set_path:
-                entry = next(
-                    (m for m in msets if os.path.join(MSETS_DIRECTORY, m["uuid"], m["mset_name"], "Song.abl") == set_path),
-                    None,
-                )
-                if entry:
-                    selected_idx = int(entry.get("mset_id"))
+                selected_idx = snap.pad_for_path(set_path)
             if not set_path:
                 pad_grid = self.generate_pad_grid(used, color_map, name_map, selected_idx)
                 return self.format_error_response("No set selected", pad_grid=pad_grid)
@@ -174,12 +334,7 @@ class SetInspectorHandler(BaseHandler):
             if not set_path or not clip_val:
                 pad_grid = self.generate_pad_grid(used, color_map, name_map)
                 return self.format_error_response("Missing parameters", pad_grid=pad_grid)
-            entry = next(
-                (m for m in msets if os.path.join(MSETS_DIRECTORY, m["uuid"], m["mset_name"], "Song.abl") == set_path),
-                None,
-            )
-            if entry:
-                selected_idx = int(entry.get("mset_id"))
+            selected_idx = snap.pad_for_path(set_path)
             track_idx, clip_idx = map(int, clip_val.split(":"))
             result = get_clip_data(set_path, track_idx, clip_idx)
             if not result.get("success"):
@@ -223,6 +378,7 @@ class SetInspectorHandler(BaseHandler):
                 "clip_index": clip_idx,
                 "track_name": result.get("track_name"),
                 "clip_name": result.get("clip_name"),
+                "clip_version": result.get("version"),
                 "drum_track": result.get("is_drum_track"),
                 "backups": backups,
                 "current_ts": get_current_timestamp(set_path),
@@ -236,19 +392,22 @@ class SetInspectorHandler(BaseHandler):
             if not (set_path and clip_val and param_val and env_data):
                 pad_grid = self.generate_pad_grid(used, color_map, name_map)
                 return self.format_error_response("Missing parameters", pad_grid=pad_grid)
-            entry = next(
-                (m for m in msets if os.path.join(MSETS_DIRECTORY, m["uuid"], m["mset_name"], "Song.abl") == set_path),
-                None,
-            )
-            if entry:
-                selected_idx = int(entry.get("mset_id"))
+            selected_idx = snap.pad_for_path(set_path)
             track_idx, clip_idx = map(int, clip_val.split(":"))
             try:
                 breakpoints = json.loads(env_data)
             except Exception:
                 pad_grid = self.generate_pad_grid(used, color_map, name_map, selected_idx)
                 return self.format_error_response("Invalid envelope data", pad_grid=pad_grid)
-            result = save_envelope(set_path, track_idx, clip_idx, int(param_val), breakpoints)
+            result = save_envelope(
+                set_path,
+                track_idx,
+                clip_idx,
+                int(param_val),
+                breakpoints,
+                defer=True,
+                tolerance=self._envelope_tolerance(form.getvalue("envelope_tolerance")),
+            )
             if not result.get("success"):
                 pad_grid = self.generate_pad_grid(used, color_map, name_map, selected_idx)
                 return self.format_error_response(result.get("message"), pad_grid=pad_grid)
@@ -296,6 +455,7 @@ class SetInspectorHandler(BaseHandler):
                 "clip_index": clip_idx,
                 "track_name": clip_data.get("track_name"),
                 "clip_name": clip_data.get("clip_name"),
+                "clip_version": clip_data.get("version"),
                 "backups": backups,
                 "current_ts": get_current_timestamp(set_path),
                 "read_only": ro_state,
@@ -319,12 +479,7 @@ class SetInspectorHandler(BaseHandler):
             ):
                 pad_grid = self.generate_pad_grid(used, color_map, name_map)
                 return self.format_error_response("Missing parameters", pad_grid=pad_grid)
-            entry = next(
-                (m for m in msets if os.path.join(MSETS_DIRECTORY, m["uuid"], m["mset_name"], "Song.abl") == set_path),
-                None,
-            )
-            if entry:
-                selected_idx = int(entry.get("mset_id"))
+            selected_idx = snap.pad_for_path(set_path)
             track_idx, clip_idx = map(int, clip_val.split(":"))
             try:
                 notes = json.loads(notes_data)
@@ -346,6 +501,8 @@ class SetInspectorHandler(BaseHandler):
                 region_end,
                 loop_start,
                 loop_end,
+                defer=True,
+                tolerance=self._envelope_tolerance(form.getvalue("envelope_tolerance")),
             )
             if not result.get("success"):
                 pad_grid = self.generate_pad_grid(used, color_map, name_map, selected_idx)
@@ -389,6 +546,7 @@ class SetInspectorHandler(BaseHandler):
                 "clip_index": clip_idx,
                 "track_name": clip_data.get("track_name"),
                 "clip_name": clip_data.get("clip_name"),
+                "clip_version": clip_data.get("version"),
                 "backups": backups,
                 "current_ts": get_current_timestamp(set_path),
                 "read_only": ro_state,
@@ -399,12 +557,8 @@ class SetInspectorHandler(BaseHandler):
             if not set_path or ro_val not in ("true", "false"):
                 pad_grid = self.generate_pad_grid(used, color_map, name_map)
                 return self.format_error_response("Missing parameters", pad_grid=pad_grid)
-            entry = next(
-                (m for m in msets if os.path.join(MSETS_DIRECTORY, m["uuid"], m["mset_name"], "Song.abl") == set_path),
-                None,
-            )
-            if entry:
-                selected_idx = int(entry.get("mset_id"))
+            selected_idx = snap.pad_for_path(set_path)
+            set_writer.commit(set_path)
             perm_result = set_read_only(set_path, ro_val == "true")
             if not perm_result.get("success"):
                 pad_grid = self.generate_pad_grid(used, color_map, name_map, selected_idx)
@@ -442,12 +596,8 @@ class SetInspectorHandler(BaseHandler):
             if not set_path or not backup_name:
                 pad_grid = self.generate_pad_grid(used, color_map, name_map)
                 return self.format_error_response("Missing parameters", pad_grid=pad_grid)
-            entry = next(
-                (m for m in msets if os.path.join(MSETS_DIRECTORY, m["uuid"], m["mset_name"], "Song.abl") == set_path),
-                None,
-            )
-            if entry:
-                selected_idx = int(entry.get("mset_id"))
+            selected_idx = snap.pad_for_path(set_path)
+            set_writer.commit(set_path)
             if not restore_backup(set_path, backup_name):
                 pad_grid = self.generate_pad_grid(used, color_map, name_map, selected_idx)
                 return self.format_error_response("Backup not found", pad_grid=pad_grid)
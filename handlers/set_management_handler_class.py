@@ -1,15 +1,13 @@
 from handlers.base_handler import BaseHandler
-import os
-import zipfile
-import tempfile
-import shutil
+import html
 import logging
 from core.set_management_handler import (
     create_set, generate_midi_set_from_file, generate_drum_set_from_file,
     generate_c_major_chord_example
 )
-from core.list_msets_handler import list_msets
-from core.restore_handler import restore_ablbundle
+from core.set_registry import set_registry
+from core.set_metadata import apply_pad_changes, pad_layout
+from core.set_search import set_index, summary_text
 from core.pad_colors import PAD_COLORS, PAD_COLOR_LABELS, rgb_string
 import json
 
@@ -20,20 +18,23 @@ class SetManagementHandler(BaseHandler):
         """
         Return context for rendering the MIDI Upload page.
         """
-        # Get available pads
-        msets, ids = list_msets(return_free_ids=True)
-        free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
+        context = self.pad_context()
+        context.update({
+            'message': 'Upload a MIDI file to generate a set',
+            'message_type': 'info'
+        })
+        return context
+
+    def pad_context(self):
+        """Return pad options, color options and pad grid from the set registry."""
+        snap = set_registry.snapshot()
+        free_pads = sorted([pad_id + 1 for pad_id in snap.free])
         pad_options = ''.join(f'<option value="{pad}">{pad}</option>' for pad in free_pads)
         pad_options = '<option value="" disabled selected>-- Select Pad --</option>' + pad_options
-        pad_color_options = self.generate_color_options()
-        color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-        pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
         return {
             'pad_options': pad_options,
-            'pad_color_options': pad_color_options,
-            'pad_grid': pad_grid,
-            'message': 'Upload a MIDI file to generate a set',
-            'message_type': 'info'
+            'pad_color_options': self.generate_color_options(),
+            'pad_grid': self.generate_pad_grid(snap.used, snap.color_map),
         }
 
     def handle_post(self, form):
@@ -43,12 +44,7 @@ class SetManagementHandler(BaseHandler):
         action = form.getvalue('action', 'create')
 
         # Get pad options for error responses
-        msets, ids = list_msets(return_free_ids=True)
-        free_pads = sorted([pad_id + 1 for pad_id in ids.get("free", [])])
-        pad_options = ''.join(f'<option value="{pad}">{pad}</option>' for pad in free_pads)
-        pad_color_options = self.generate_color_options()
-        color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-        pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
+        context = self.pad_context()
 
         if action == 'upload_midi':
             # Generate set from uploaded MIDI file
@@ -56,27 +52,21 @@ class SetManagementHandler(BaseHandler):
             if not set_name:
                 return self.format_error_response(
                     "Missing required parameter: set_name",
-                    pad_options=pad_options,
-                    pad_color_options=pad_color_options,
-                    pad_grid=pad_grid,
+                    **context,
                 )
             
             # Handle file upload
             if 'midi_file' not in form:
                 return self.format_error_response(
                     "No MIDI file uploaded",
-                    pad_options=pad_options,
-                    pad_color_options=pad_color_options,
-                    pad_grid=pad_grid,
+                    **context,
                 )
             
             fileitem = form['midi_file']
             if not fileitem.filename:
                 return self.format_error_response(
                     "No MIDI file selected",
-                    pad_options=pad_options,
-                    pad_color_options=pad_color_options,
-                    pad_grid=pad_grid,
+                    **context,
                 )
             
             # Check file extension
@@ -84,19 +74,32 @@ class SetManagementHandler(BaseHandler):
             if not (filename.endswith('.mid') or filename.endswith('.midi')):
                 return self.format_error_response(
                     "Invalid file type. Please upload a .mid or .midi file",
-                    pad_options=pad_options,
-                    pad_color_options=pad_color_options,
-                    pad_grid=pad_grid,
+                    **context,
                 )
             
+            # Parse pad assignment before generating so the set can be
+            # placed directly into its final folder
+            pad_selected = form.getvalue('pad_index')
+            pad_color = form.getvalue('pad_color')
+            if not pad_selected or not pad_selected.isdigit():
+                return self.format_error_response(
+                    "Invalid pad selection",
+                    **context,
+                )
+            if not pad_color or not pad_color.isdigit():
+                return self.format_error_response(
+                    "Invalid pad color",
+                    **context,
+                )
+            pad_selected_int = int(pad_selected) - 1
+            pad_color_int = int(pad_color)
+
             # Save uploaded file temporarily
             success, filepath, error_response = self.handle_file_upload(form, 'midi_file')
             if not success:
                 return self.format_error_response(
                     error_response.get('message', "Failed to upload MIDI file"),
-                    pad_options=pad_options,
-                    pad_color_options=pad_color_options,
-                    pad_grid=pad_grid,
+                    **context,
                 )
             
             try:
@@ -106,10 +109,18 @@ class SetManagementHandler(BaseHandler):
 
                 # Dispatch based on MIDI type
                 midi_type = form.getvalue('midi_type', 'melodic')
-                if midi_type == 'drum':
-                    result = generate_drum_set_from_file(set_name, filepath, tempo)
-                else:
-                    result = generate_midi_set_from_file(set_name, filepath, tempo)
+                generate = (
+                    generate_drum_set_from_file
+                    if midi_type == 'drum'
+                    else generate_midi_set_from_file
+                )
+                result = generate(
+                    set_name,
+                    filepath,
+                    tempo,
+                    pad_index=pad_selected_int,
+                    pad_color=pad_color_int,
+                )
 
             finally:
                 # Clean up uploaded file
@@ -118,84 +129,92 @@ class SetManagementHandler(BaseHandler):
         else:
             return self.format_error_response(
                 f"Unknown action: {action}",
-                pad_options=pad_options,
-                pad_color_options=pad_color_options,
-                pad_grid=pad_grid,
+                **context,
             )
 
         # Check if the operation was successful
         if not result.get('success'):
             return self.format_error_response(
                 result.get('message', 'Operation failed'),
-                pad_options=pad_options,
-                pad_color_options=pad_color_options,
-                pad_grid=pad_grid,
+                **context,
             )
 
-        # Parse pad assignment
-        pad_selected = form.getvalue('pad_index')
-        pad_color = form.getvalue('pad_color')
-        if not pad_selected or not pad_selected.isdigit():
-            return self.format_error_response(
-                "Invalid pad selection",
-                pad_options=pad_options,
-                pad_color_options=pad_color_options,
-                pad_grid=pad_grid,
-            )
-        if not pad_color or not pad_color.isdigit():
-            return self.format_error_response(
-                "Invalid pad color",
-                pad_options=pad_options,
-                pad_color_options=pad_color_options,
-                pad_grid=pad_grid,
-            )
-        pad_selected_int = int(pad_selected) - 1
-        pad_color_int = int(pad_color)
-        # Prepare bundling of generated set
-        set_path = result.get('path')
-        if not set_path:
-            return self.format_error_response(
-                "Internal error: missing set path",
-                pad_options=pad_options,
-                pad_color_options=pad_color_options,
-                pad_grid=pad_grid,
-            )
-        # Create temp directory for bundling
-        with tempfile.TemporaryDirectory() as tmpdir:
-            song_abl_path = os.path.join(tmpdir, 'Song.abl')
-            shutil.copy(set_path, song_abl_path)
-            # Name bundle based on set name without .abl extension
-            base_path, _ = os.path.splitext(set_path)
-            bundle_path = base_path + '.ablbundle'
-            with zipfile.ZipFile(bundle_path, 'w') as zf:
-                zf.write(song_abl_path, 'Song.abl')
-            # Restore to device
-            restore_result = restore_ablbundle(bundle_path, pad_selected_int, pad_color_int)
-            os.remove(bundle_path)
-        
-        if restore_result.get('success'):
-            # Clean up the original .abl file after successful placement
-            try:
-                os.remove(set_path)
-            except Exception as e:
-                logger.warning("Failed to clean up set file %s: %s", set_path, e)
+        # Refresh pad list after successful placement
+        return self.format_success_response(result['message'], **self.pad_context())
 
-            # Refresh pad list after successful placement
-            msets_updated, updated_ids = list_msets(return_free_ids=True)
-            updated_free_pads = sorted([pad_id + 1 for pad_id in updated_ids.get("free", [])])
-            updated_pad_options = ''.join(f'<option value="{pad}">{pad}</option>' for pad in updated_free_pads)
-            updated_pad_options = '<option value="" disabled selected>-- Select Pad --</option>' + updated_pad_options
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets_updated if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(updated_ids.get("used", set()), color_map)
-            return self.format_success_response(restore_result['message'], pad_options=updated_pad_options, pad_color_options=pad_color_options, pad_grid=pad_grid)
-        else:
-            color_map = {int(m["mset_id"]): int(m["mset_color"]) for m in msets if str(m["mset_color"]).isdigit()}
-            pad_grid = self.generate_pad_grid(ids.get("used", set()), color_map)
-            return self.format_error_response(restore_result.get('message'), pad_options=pad_options, pad_color_options=pad_color_options, pad_grid=pad_grid)
+    def layout_response(self, message="", success=True, status=200):
+        """Return the current pad layout and pad grid as a JSON response."""
+        snap = set_registry.snapshot()
+        return self.format_json_response({
+            "success": success,
+            "message": message,
+            "pads": pad_layout(snap),
+            "pad_grid": self.generate_pad_grid(snap.used, snap.color_map),
+        }, status=status)
+
+    def search_response(self, args):
+        """
+        Search the contents of every set.
+
+        ``args`` may hold ``q`` (names and sample URIs), ``kind`` (device
+        kind), ``sample``, ``clip``, ``tempo_min``, ``tempo_max`` and
+        ``limit``.  Results come from the set search index, which is
+        refreshed in the background when it may be out of date.
+        """
+        filters = {}
+        for key, name in (("q", "text"), ("kind", "kind"), ("sample", "sample"), ("clip", "clip")):
+            value = (args.get(key) or "").strip()
+            if value:
+                filters[name] = value
+        try:
+            for key in ("tempo_min", "tempo_max"):
+                if args.get(key):
+                    filters[key] = float(args.get(key))
+            if args.get("limit"):
+                filters["limit"] = int(args.get("limit"))
+        except ValueError:
+            return self.format_json_response({"success": False, "message": "Invalid number"}, status=400)
+        try:
+            result = set_index.search_fresh(**filters)
+        except Exception as exc:
+            logger.error("Set search failed: %s", exc)
+            return self.format_json_response({"success": False, "message": f"Search failed: {exc}"}, status=500)
+        result["success"] = True
+        return self.format_json_response(result)
+
+    def handle_pad_changes(self, payload):
+        """
+        Apply a batch of pad moves, swaps, recolors and renames.
+
+        ``payload['ops']`` is a list of operations using 1-based pad numbers
+        as shown in the UI. All operations are validated before anything is
+        written and either all of them are applied or none.
+        """
+        ops = (payload or {}).get("ops")
+        if not isinstance(ops, list) or not all(isinstance(op, dict) for op in ops):
+            return self.format_json_response({"success": False, "message": "ops must be a list of operations"}, status=400)
+
+        internal_ops = []
+        for op in ops:
+            op = dict(op)
+            for key in ("from", "to", "a", "b", "pad"):
+                if isinstance(op.get(key), int):
+                    op[key] -= 1
+            internal_ops.append(op)
+
+        result = apply_pad_changes(internal_ops)
+        if not result["success"]:
+            logger.warning("Pad changes rejected: %s", result["message"])
+        return self.layout_response(
+            result["message"],
+            success=result["success"],
+            status=200 if result["success"] else 409,
+        )
 
     def generate_pad_grid(self, used_ids, color_map):
         """Return HTML for a 32-pad grid showing occupied pads with colors."""
         cells = []
+        summaries = set_index.pad_summaries()
         # Pad numbering starts with 1 on the bottom-left
         for row in range(4):
             for col in range(8):
@@ -205,11 +224,13 @@ class SetManagementHandler(BaseHandler):
                 status = 'occupied' if occupied else 'free'
                 disabled = 'disabled' if occupied else ''
                 color_id = color_map.get(idx)
+                tip = summary_text(summaries.get(idx))
+                title = f' title="{html.escape(tip)}"' if tip else ''
                 style = f' style="background-color: {rgb_string(color_id)}"' if color_id else ''
                 label_text = "" if not occupied else ""
                 cells.append(
                     f'<input type="radio" id="pad_{num}" name="pad_index" value="{num}" {disabled}>'
-                    f'<label for="pad_{num}" class="pad-cell {status}"{style}>{label_text}</label>'
+                    f'<label for="pad_{num}" class="pad-cell {status}"{style}{title}>{label_text}</label>'
                 )
         return '<div class="pad-grid">' + ''.join(cells) + '</div>'
 
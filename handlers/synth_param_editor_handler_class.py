@@ -7,6 +7,7 @@ import re
 
 from handlers.base_handler import BaseHandler
 from core.file_browser import generate_dir_html
+from core.schema_registry import schema_enums, schema_json
 from core.synth_preset_inspector_handler import (
     extract_parameter_values,
     load_drift_schema,
@@ -20,6 +21,7 @@ from core.synth_param_editor_handler import (
     update_parameter_values,
     update_macro_values,
 )
+from core.preset_document import PresetDocument, preset_source
 from core.refresh_handler import refresh_library
 
 # Path to the preset used when creating a new preset. Prefer the version in the
@@ -126,7 +128,7 @@ class SynthParamEditorHandler(BaseHandler):
             'param_count': 0,
             'browser_root': base_dir,
             'browser_filter': 'drift',
-            'schema_json': json.dumps(schema),
+            'schema_json': schema_json(schema),
             'default_preset_path': DEFAULT_PRESET,
             'macro_knobs_html': '',
             'rename_checked': False,
@@ -175,6 +177,7 @@ class SynthParamEditorHandler(BaseHandler):
         is_core = preset_path.startswith(CORE_LIBRARY_DIR)
 
         rename_flag = False
+        document = None
         if action == 'save_params':
             try:
                 count = int(form.getvalue('param_count', '0'))
@@ -202,17 +205,20 @@ class SynthParamEditorHandler(BaseHandler):
                     directory = NEW_PRESET_DIR
                 output_path = os.path.join(directory, new_name)
                 os.makedirs(os.path.dirname(output_path), exist_ok=True)
-            result = update_parameter_values(preset_path, updates, output_path)
+            try:
+                document = PresetDocument.load(preset_path)
+            except Exception as exc:
+                return self.format_error_response(f"Error updating parameters: {exc}")
+            result = update_parameter_values(document, updates, output_path)
             if not result['success']:
                 return self.format_error_response(result['message'])
-            preset_path = result['path']
 
             macro_updates = {}
             for i in range(8):
                 val = form.getvalue(f'macro_{i}_value')
                 if val is not None:
                     macro_updates[i] = val
-            macro_result = update_macro_values(preset_path, macro_updates, preset_path)
+            macro_result = update_macro_values(document, macro_updates)
             if not macro_result['success']:
                 return self.format_error_response(macro_result['message'])
 
@@ -227,12 +233,12 @@ class SynthParamEditorHandler(BaseHandler):
 
             # Update macro names
             name_updates = {m.get('index'): m.get('name') for m in macros_data}
-            name_result = update_preset_macro_names(preset_path, name_updates)
+            name_result = update_preset_macro_names(document, name_updates)
             if not name_result['success']:
                 return self.format_error_response(name_result['message'])
 
             # Determine existing mappings to remove
-            existing_info = extract_macro_information(preset_path)
+            existing_info = extract_macro_information(document)
             existing_mapped = existing_info.get('mapped_parameters', {}) if existing_info['success'] else {}
 
             processed = set()
@@ -248,7 +254,7 @@ class SynthParamEditorHandler(BaseHandler):
                             'rangeMax': p.get('rangeMax'),
                         }
                     }
-                    upd = update_preset_parameter_mappings(preset_path, param_updates)
+                    upd = update_preset_parameter_mappings(document, param_updates)
                     if not upd['success']:
                         return self.format_error_response(upd['message'])
                     processed.add(pname)
@@ -256,7 +262,13 @@ class SynthParamEditorHandler(BaseHandler):
 
             # Remove mappings not present anymore
             for pname, info in existing_mapped.items():
-                delete_parameter_mapping(preset_path, info['path'])
+                delete_parameter_mapping(document, info['path'])
+
+            # Every edit above went to the in-memory document; write it once
+            try:
+                preset_path = document.save()
+            except Exception as exc:
+                return self.format_error_response(f"Error saving preset: {exc}")
 
             message = result['message'] + "; " + macro_result['message']
             if output_path:
@@ -279,12 +291,13 @@ class SynthParamEditorHandler(BaseHandler):
         else:
             return self.format_error_response("Unknown action")
 
-        values = extract_parameter_values(preset_path)
+        source = document if document is not None else preset_source(preset_path)
+        values = extract_parameter_values(source)
         params_html = ''
         param_count = 0
 
         macro_knobs_html = ''
-        macro_info = extract_macro_information(preset_path)
+        macro_info = extract_macro_information(source)
         mapped_params = {}
         macros_json = '[]'
         available_params_json = '[]'
@@ -300,7 +313,7 @@ class SynthParamEditorHandler(BaseHandler):
                 macros_for_json.append(mc)
             macros_json = json.dumps(macros_for_json)
 
-        param_info = extract_available_parameters(preset_path)
+        param_info = extract_available_parameters(source)
         if param_info['success']:
             params = [
                 p for p in param_info['parameters'] if p not in EXCLUDED_MACRO_PARAMS
@@ -344,7 +357,7 @@ class SynthParamEditorHandler(BaseHandler):
             'param_count': param_count,
             'browser_root': base_dir,
             'browser_filter': 'drift',
-            'schema_json': json.dumps(load_drift_schema()),
+            'schema_json': schema_json(load_drift_schema()),
             'default_preset_path': DEFAULT_PRESET,
             'macro_knobs_html': macro_knobs_html,
             'rename_checked': rename_flag if action == 'save_params' else is_core,
@@ -531,8 +544,11 @@ class SynthParamEditorHandler(BaseHandler):
     }
 
     def _build_param_item(self, idx, name, value, meta, label=None,
-                           hide_label=False, slider=False, extra_classes=""):
-        """Create HTML for a single parameter control."""
+                           hide_label=False, slider=False, extra_classes="", options=()):
+        """Create HTML for a single parameter control.
+
+        ``options`` lists the choices of an enum parameter.
+        """
         p_type = meta.get("type")
         label = label if label is not None else self.LABEL_OVERRIDES.get(name, name)
 
@@ -552,7 +568,7 @@ class SynthParamEditorHandler(BaseHandler):
                 f'data-target="param_{idx}_value" data-true-value="{true_val}" data-false-value="{false_val}" {checked}>'
             )
             html.append(f'<input type="hidden" name="param_{idx}_value" value="{value}">')
-        elif p_type == "enum" and meta.get("options"):
+        elif p_type == "enum" and options:
             select_class = "param-select"
             if name == "Filter_Type":
                 select_class += " filter-type-select"
@@ -562,7 +578,7 @@ class SynthParamEditorHandler(BaseHandler):
                 short_map = self.OSC_WAVE_SHORT
             elif name == "Lfo_Shape":
                 short_map = self.LFO_WAVE_SHORT
-            for opt in meta["options"]:
+            for opt in options:
                 sel = " selected" if str(value) == str(opt) else ""
                 label_opt = short_map.get(opt, opt)
                 title_attr = f' title="{opt}"' if label_opt != opt else ""
@@ -684,6 +700,7 @@ class SynthParamEditorHandler(BaseHandler):
             mapped_parameters = {}
 
         schema = load_drift_schema()
+        enums = schema_enums(schema)
         sections = {s: [] for s in self.SECTION_ORDER}
         filter_items: dict[str, str] = {}
         osc_items: dict[str, str] = {}
@@ -740,6 +757,7 @@ class SynthParamEditorHandler(BaseHandler):
                 hide_label=hide,
                 slider=slider,
                 extra_classes=extra,
+                options=enums.get(name, ()),
             )
 
             if name == "CyclingEnvelope_Mode":
@@ -3,6 +3,7 @@ import os
 import logging
 import json
 from handlers.base_handler import BaseHandler
+from core.schema_registry import schema_json
 from core.synth_preset_inspector_handler import (
     scan_for_synth_presets, 
     extract_macro_information,
@@ -41,7 +42,7 @@ class SynthPresetInspectorHandler(BaseHandler):
             "selected_preset": None,
             "browser_root": base_dir,
             "browser_filter": 'drift',
-            "schema_json": json.dumps(schema),
+            "schema_json": schema_json(schema),
         }
 
     def handle_post(self, form):
@@ -7,6 +7,7 @@ import re
 
 from handlers.base_handler import BaseHandler
 from core.file_browser import generate_dir_html
+from core.schema_registry import schema_enums, schema_json
 from core.synth_preset_inspector_handler import (
     extract_parameter_values,
     load_wavetable_schema,
@@ -25,6 +26,7 @@ from core.synth_param_editor_handler import (
     update_parameter_values,
     update_macro_values,
 )
+from core.preset_document import PresetDocument, preset_source
 from core.refresh_handler import refresh_library
 
 # Path to the preset used when creating a new preset. Prefer the version in the
@@ -128,7 +130,7 @@ class WavetableParamEditorHandler(BaseHandler):
             'param_count': 0,
             'browser_root': base_dir,
             'browser_filter': 'wavetable',
-            'schema_json': json.dumps(schema),
+            'schema_json': schema_json(schema),
             'default_preset_path': DEFAULT_PRESET,
             'macro_knobs_html': '',
             'rename_checked': False,
@@ -181,6 +183,7 @@ class WavetableParamEditorHandler(BaseHandler):
         is_core = preset_path.startswith(CORE_LIBRARY_DIR)
 
         rename_flag = False
+        document = None
         if action == 'save_params':
             try:
                 count = int(form.getvalue('param_count', '0'))
@@ -208,22 +211,25 @@ class WavetableParamEditorHandler(BaseHandler):
                     directory = NEW_PRESET_DIR
                 output_path = os.path.join(directory, new_name)
                 os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            try:
+                document = PresetDocument.load(preset_path)
+            except Exception as exc:
+                return self.format_error_response(f"Error updating parameters: {exc}")
             result = update_parameter_values(
-                preset_path,
+                document,
                 updates,
                 output_path,
                 device_types=("wavetable",),
             )
             if not result['success']:
                 return self.format_error_response(result['message'])
-            preset_path = result['path']
 
             macro_updates = {}
             for i in range(8):
                 val = form.getvalue(f'macro_{i}_value')
                 if val is not None:
                     macro_updates[i] = val
-            macro_result = update_macro_values(preset_path, macro_updates, preset_path)
+            macro_result = update_macro_values(document, macro_updates)
             if not macro_result['success']:
                 return self.format_error_response(macro_result['message'])
 
@@ -238,12 +244,12 @@ class WavetableParamEditorHandler(BaseHandler):
 
             # Update macro names
             name_updates = {m.get('index'): m.get('name') for m in macros_data}
-            name_result = update_preset_macro_names(preset_path, name_updates)
+            name_result = update_preset_macro_names(document, name_updates)
             if not name_result['success']:
                 return self.format_error_response(name_result['message'])
 
             # Determine existing mappings to remove
-            existing_info = extract_macro_information(preset_path)
+            existing_info = extract_macro_information(document)
             existing_mapped = existing_info.get('mapped_parameters', {}) if existing_info['success'] else {}
 
             processed = set()
@@ -259,7 +265,7 @@ class WavetableParamEditorHandler(BaseHandler):
                             'rangeMax': p.get('rangeMax'),
                         }
                     }
-                    upd = update_preset_parameter_mappings(preset_path, param_updates)
+                    upd = update_preset_parameter_mappings(document, param_updates)
                     if not upd['success']:
                         return self.format_error_response(upd['message'])
                     processed.add(pname)
@@ -267,15 +273,14 @@ class WavetableParamEditorHandler(BaseHandler):
 
             # Remove mappings not present anymore
             for pname, info in existing_mapped.items():
-                delete_parameter_mapping(preset_path, info['path'])
+                delete_parameter_mapping(document, info['path'])
 
             sprite1 = form.getvalue('sprite1')
             sprite2 = form.getvalue('sprite2')
             sprite_res = update_wavetable_sprites(
-                preset_path,
+                document,
                 sprite1 if sprite1 is not None else None,
                 sprite2 if sprite2 is not None else None,
-                preset_path,
             )
             if not sprite_res['success']:
                 return self.format_error_response(sprite_res['message'])
@@ -288,10 +293,16 @@ class WavetableParamEditorHandler(BaseHandler):
                     matrix_data = []
             else:
                 matrix_data = []
-            matrix_res = update_wavetable_mod_matrix(preset_path, matrix_data, preset_path)
+            matrix_res = update_wavetable_mod_matrix(document, matrix_data)
             if not matrix_res['success']:
                 return self.format_error_response(matrix_res['message'])
 
+            # Every edit above went to the in-memory document; write it once
+            try:
+                preset_path = document.save()
+            except Exception as exc:
+                return self.format_error_response(f"Error saving preset: {exc}")
+
             message = result['message'] + "; " + macro_result['message']
             if output_path:
                 message += f" Saved to {output_path}"
@@ -313,12 +324,13 @@ class WavetableParamEditorHandler(BaseHandler):
         else:
             return self.format_error_response("Unknown action")
 
-        values = extract_parameter_values(preset_path, device_types=("wavetable",))
+        source = document if document is not None else preset_source(preset_path)
+        values = extract_parameter_values(source, device_types=("wavetable",))
         params_html = ''
         param_count = 0
 
         macro_knobs_html = ''
-        macro_info = extract_macro_information(preset_path)
+        macro_info = extract_macro_information(source)
         mapped_params = {}
         macros_json = '[]'
         available_params_json = '[]'
@@ -335,7 +347,7 @@ class WavetableParamEditorHandler(BaseHandler):
             macros_json = json.dumps(macros_for_json)
 
         param_info = extract_available_parameters(
-            preset_path,
+            source,
             device_types=("wavetable",),
             schema_loader=load_wavetable_schema,
         )
@@ -374,10 +386,10 @@ class WavetableParamEditorHandler(BaseHandler):
         if browser_html.endswith('</ul>'):
             browser_html = browser_html[:-5] + core_li + '</ul>'
         sprites_json = json.dumps(load_wavetable_sprites())
-        sprite_info = extract_wavetable_sprites(preset_path)
+        sprite_info = extract_wavetable_sprites(source)
         sprite1 = sprite_info.get('sprite1') if sprite_info.get('success', True) else None
         sprite2 = sprite_info.get('sprite2') if sprite_info.get('success', True) else None
-        matrix_info = extract_wavetable_mod_matrix(preset_path)
+        matrix_info = extract_wavetable_mod_matrix(source)
         mod_matrix_json = json.dumps(matrix_info.get('matrix', [])) if matrix_info.get('success', False) else '[]'
         return {
             'message': message,
@@ -388,7 +400,7 @@ class WavetableParamEditorHandler(BaseHandler):
             'param_count': param_count,
             'browser_root': base_dir,
             'browser_filter': 'wavetable',
-            'schema_json': json.dumps(load_wavetable_schema()),
+            'schema_json': schema_json(load_wavetable_schema()),
             'default_preset_path': DEFAULT_PRESET,
             'macro_knobs_html': macro_knobs_html,
             'rename_checked': rename_flag if action == 'save_params' else is_core,
@@ -650,8 +662,11 @@ class WavetableParamEditorHandler(BaseHandler):
         return name
 
     def _build_param_item(self, idx, name, value, meta, label=None,
-                           hide_label=False, slider=False, extra_classes=""):
-        """Create HTML for a single parameter control."""
+                           hide_label=False, slider=False, extra_classes="", options=()):
+        """Create HTML for a single parameter control.
+
+        ``options`` lists the choices of an enum parameter.
+        """
         p_type = meta.get("type")
         label = label if label is not None else self.LABEL_OVERRIDES.get(
             name, self._friendly_label(name)
@@ -664,12 +679,12 @@ class WavetableParamEditorHandler(BaseHandler):
         if not hide_label:
             html.append(f'<span class="param-label">{label}</span>')
 
-        if p_type == "enum" and meta.get("options"):
+        if p_type == "enum" and options:
             select_class = "param-select"
             if re.match(r"Voice_Filter[12]_Type", name):
                 select_class += " filter-type-select"
             html.append(f'<select class="{select_class}" name="param_{idx}_value">')
-            for opt in meta["options"]:
+            for opt in options:
                 sel = " selected" if str(value) == str(opt) else ""
                 disp = opt
                 if name.endswith("_Slope"):
@@ -1070,6 +1085,7 @@ class WavetableParamEditorHandler(BaseHandler):
             mapped_parameters = {}
 
         schema = load_wavetable_schema()
+        enums = schema_enums(schema)
         fx_modes = {1: 'None', 2: 'None'}
         for item in params:
             n = item.get('name')
@@ -1136,6 +1152,7 @@ class WavetableParamEditorHandler(BaseHandler):
                             hide_label=hide,
                             slider=slider,
                             extra_classes=extra,
+                            options=enums.get(name, ()),
                         )
                         subgroups[sec][panel_lbl][base] = html
                         assigned = True
@@ -1150,6 +1167,7 @@ class WavetableParamEditorHandler(BaseHandler):
                     hide_label=hide,
                     slider=slider,
                     extra_classes=extra,
+                    options=enums.get(name, ()),
                 )
                 if sec == "Global":
                     base = name
@@ -9,6 +9,7 @@ from flask import (
     redirect,
     g,
     make_response,
+    Response,
 )
 from flask_socketio import SocketIO, emit
 import os
@@ -21,6 +22,7 @@ import librosa
 import time
 import json
 import io
+import urllib.parse
 import soundfile as sf
 import pyrubberband.pyrb as pyrb
 from core.time_stretch_handler import get_rubberband_binary
@@ -51,7 +53,13 @@ from handlers.set_inspector_handler_class import SetInspectorHandler
 from handlers.m8c_display_handler import M8CDisplayHandler
 from handlers.universal_display_handler import UniversalDisplayHandler
 from core.refresh_handler import refresh_library
-from core.file_browser import generate_dir_html
+from core.file_browser import generate_dir_html, list_directory_page, DEFAULT_PAGE_SIZE
+from core.batch_restore import get_job as get_batch_job
+from core.set_export import export_set
+from core.set_search import set_index
+from core.envelope_simplify import DEFAULT_TOLERANCE
+from core.library_watcher import library_watcher
+from core.config import MSETS_DIRECTORY
 
 logging.basicConfig(
     level=logging.INFO,
@@ -382,6 +390,19 @@ def m8c_ws_get_status():
     emit('status', m8c_handler.get_bridge().get_status())
 
 
+# Batch restore progress is pushed to clients on /restore
+@socketio.on('connect', namespace='/restore')
+def restore_ws_connect():
+    """Handle batch restore WebSocket connection."""
+    logger.info("Restore WebSocket client connected")
+
+
+@socketio.on('disconnect', namespace='/restore')
+def restore_ws_disconnect():
+    """Handle batch restore WebSocket disconnection."""
+    logger.info("Restore WebSocket client disconnected")
+
+
 # Universal Display WebSocket handlers
 @socketio.on('connect', namespace='/display')
 def universal_ws_connect():
@@ -471,22 +492,26 @@ def browse_dir():
     filter_key = request.args.get("filter")
     CORE_LABEL = "Core Library"
     CORE_ROOT = "/data/CoreLibrary/Track Presets"
+    prefix = ""
     if path == CORE_LABEL or path.startswith(CORE_LABEL + os.sep):
-        sub = path[len(CORE_LABEL) :].lstrip(os.sep)
-        html = generate_dir_html(
-            CORE_ROOT,
-            sub,
-            action_url,
-            field_name,
-            action_value,
-            filter_key,
-            path_prefix=CORE_LABEL if CORE_LABEL else "",
-        )
-    else:
-        html = generate_dir_html(
-            root, path, action_url, field_name, action_value, filter_key
+        root = CORE_ROOT
+        path = path[len(CORE_LABEL) :].lstrip(os.sep)
+        prefix = CORE_LABEL
+    if request.args.get("format") == "json":
+        return jsonify(
+            list_directory_page(
+                root,
+                path,
+                filter_key,
+                offset=request.args.get("offset", 0, type=int),
+                limit=request.args.get("limit", DEFAULT_PAGE_SIZE, type=int),
+                query=request.args.get("q", ""),
+                path_prefix=prefix,
+            )
         )
-    return html
+    return generate_dir_html(
+        root, path, action_url, field_name, action_value, filter_key, path_prefix=prefix
+    )
 
 
 @app.route("/reverse", methods=["GET", "POST"])
@@ -519,6 +544,47 @@ def reverse():
     )
 
 
+@app.route("/set-inspector/api/clip/patch", methods=["POST"])
+def set_inspector_patch():
+    resp = set_inspector_handler.handle_patch(request.get_json(silent=True))
+    return (
+        resp["content"],
+        resp.get("status", 200),
+        resp.get("headers", [("Content-Type", "application/json")]),
+    )
+
+
+@app.route("/set-inspector/api/transform", methods=["POST"])
+def set_inspector_transform():
+    resp = set_inspector_handler.handle_transform(request.get_json(silent=True))
+    return (
+        resp["content"],
+        resp.get("status", 200),
+        resp.get("headers", [("Content-Type", "application/json")]),
+    )
+
+
+@app.route("/set-inspector/api/commit", methods=["POST"])
+def set_inspector_commit():
+    # navigator.sendBeacon may not label the body as JSON
+    resp = set_inspector_handler.handle_commit(request.get_json(silent=True, force=True))
+    return (
+        resp["content"],
+        resp.get("status", 200),
+        resp.get("headers", [("Content-Type", "application/json")]),
+    )
+
+
+@app.route("/set-inspector/api/<resource>", methods=["GET"])
+def set_inspector_api(resource):
+    resp = set_inspector_handler.handle_api(resource, request.args)
+    return (
+        resp["content"],
+        resp.get("status", 200),
+        resp.get("headers", [("Content-Type", "application/json")]),
+    )
+
+
 @app.route("/set-inspector", methods=["GET", "POST"])
 def set_inspector_route():
     if request.method == "POST":
@@ -553,6 +619,7 @@ def set_inspector_route():
         backups=result.get("backups", []),
         current_ts=result.get("current_ts"),
         read_only=result.get("read_only", False),
+        envelope_tolerance=DEFAULT_TOLERANCE * 100,
         active_tab="set-inspector",
     )
 
@@ -662,6 +729,67 @@ def restore():
     )
 
 
+@app.route("/restore/batch", methods=["POST"])
+def restore_batch():
+    form_data = request.form.to_dict()
+    form_data["bundles"] = [FileField(f) for f in request.files.getlist("bundles")]
+    form = SimpleForm(form_data)
+
+    def emit_progress(event, data):
+        socketio.emit(event, data, namespace="/restore")
+
+    resp = restore_handler.handle_batch_post(form, emit=emit_progress, runner=socketio)
+    return (
+        resp["content"],
+        resp.get("status", 200),
+        resp.get("headers", [("Content-Type", "application/json")]),
+    )
+
+
+@app.route("/restore/batch/<job_id>", methods=["GET"])
+def restore_batch_status(job_id):
+    job = get_batch_job(job_id)
+    if job is None:
+        return jsonify({"success": False, "message": "Unknown job"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/sets/pads", methods=["GET", "POST"])
+def set_pads():
+    if request.method == "POST":
+        resp = set_management_handler.handle_pad_changes(request.get_json(silent=True))
+    else:
+        resp = set_management_handler.layout_response()
+    return (
+        resp["content"],
+        resp.get("status", 200),
+        resp.get("headers", [("Content-Type", "application/json")]),
+    )
+
+
+@app.route("/sets/search", methods=["GET"])
+def set_search():
+    resp = set_management_handler.search_response(request.args)
+    return (
+        resp["content"],
+        resp.get("status", 200),
+        resp.get("headers", [("Content-Type", "application/json")]),
+    )
+
+
+@app.route("/sets/<mset_uuid>/export", methods=["GET"])
+def export_set_route(mset_uuid):
+    result = export_set(mset_uuid)
+    if not result["success"]:
+        return jsonify(result), 404
+    filename = urllib.parse.quote(result["filename"])
+    return Response(
+        result["stream"],
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment; filename*=UTF-8''{filename}"},
+    )
+
+
 @app.route("/slice", methods=["GET", "POST"])
 def slice_tool():
     message = None
@@ -1189,6 +1317,12 @@ if __name__ == "__main__":
     signal.signal(signal.SIGINT, handle_exit)
 
     warm_up_modules()
+    set_index.start_refresh()
+    # Sets edited on the device are re-indexed without waiting for a search
+    library_watcher.add_listener(
+        lambda paths: any(p.startswith(MSETS_DIRECTORY) for p in paths) and set_index.start_refresh()
+    )
+    library_watcher.start()
 
     host = "0.0.0.0"
     port = read_port()
@@ -1,33 +1,129 @@
+const PAGE_SIZE = 200;
+
 export function initFileBrowser() {
   document.querySelectorAll('.file-browser').forEach(container => {
     const browseUrl = container.dataset.browseUrl || '/browse-dir';
+
+    async function fetchPage(path, offset, query) {
+      const params = new URLSearchParams({
+        format: 'json',
+        root: container.dataset.root,
+        path: path || '',
+        filter: container.dataset.filter || '',
+        offset: String(offset),
+        limit: String(PAGE_SIZE),
+        q: query || ''
+      });
+      const resp = await fetch(`${browseUrl}?${params.toString()}`);
+      return resp.ok ? resp.json() : null;
+    }
+
+    function dirItem(entry) {
+      const li = document.createElement('li');
+      li.className = 'dir closed';
+      li.dataset.path = entry.path;
+      const span = document.createElement('span');
+      span.textContent = `📁 ${entry.name}`;
+      const ul = document.createElement('ul');
+      ul.className = 'hidden';
+      li.append(span, ul);
+      bind(span);
+      return li;
+    }
+
+    function fileItem(entry) {
+      const li = document.createElement('li');
+      li.className = 'file';
+      const form = document.createElement('form');
+      form.method = 'post';
+      form.action = container.dataset.action;
+      form.className = 'file-entry';
+      const action = document.createElement('input');
+      action.type = 'hidden';
+      action.name = 'action';
+      action.value = container.dataset.value;
+      const field = document.createElement('input');
+      field.type = 'hidden';
+      field.name = container.dataset.field;
+      field.value = entry.path;
+      const button = document.createElement('button');
+      button.type = 'submit';
+      button.textContent = `📄 ${entry.name}`;
+      form.append(action, field, button);
+      li.appendChild(form);
+      return li;
+    }
+
+    // Append one page of ``path`` to ``ul``, followed by a "Load more" item
+    // fetching the next page when the listing is not complete.
+    async function loadPage(ul, path, offset, query) {
+      const page = await fetchPage(path, offset, query);
+      if (!page) return false;
+      const items = document.createDocumentFragment();
+      page.entries.forEach(entry => {
+        items.appendChild(entry.type === 'dir' ? dirItem(entry) : fileItem(entry));
+      });
+      if (page.has_more) {
+        const more = document.createElement('li');
+        more.className = 'more';
+        const button = document.createElement('button');
+        button.type = 'button';
+        // Kind-filtered listings stop counting after the page
+        button.textContent = page.total == null
+          ? 'Load more'
+          : `Load more (${page.total - page.offset - page.entries.length} left)`;
+        button.addEventListener('click', async () => {
+          button.disabled = true;
+          if (await loadPage(ul, path, page.offset + page.entries.length, query)) {
+            more.remove();
+          } else {
+            button.disabled = false;
+          }
+        });
+        more.appendChild(button);
+        items.appendChild(more);
+      }
+      ul.appendChild(items);
+      return true;
+    }
+
     function bind(span) {
       span.addEventListener('click', async () => {
         const li = span.parentElement;
         const ul = li.querySelector('ul');
         if (!ul) return;
         if (!ul.dataset.loaded) {
-          const params = new URLSearchParams({
-            root: container.dataset.root,
-            path: li.dataset.path || '',
-            action_url: container.dataset.action,
-            field_name: container.dataset.field,
-            action_value: container.dataset.value,
-            filter: container.dataset.filter || ''
-          });
-          const resp = await fetch(`${browseUrl}?${params.toString()}`);
-          if (resp.ok) {
-            ul.innerHTML = await resp.text();
-            ul.dataset.loaded = 'true';
-            ul.querySelectorAll('.dir > span').forEach(s => bind(s));
-          }
+          if (!(await loadPage(ul, li.dataset.path, 0))) return;
+          ul.dataset.loaded = 'true';
         }
         ul.classList.toggle('hidden');
         li.classList.toggle('open');
         li.classList.toggle('closed');
       });
     }
-    container.querySelectorAll('.file-tree.root .dir > span').forEach(bind);
+
+    const root = container.querySelector('.file-tree.root');
+    if (!root) return;
+    root.querySelectorAll('.dir > span').forEach(bind);
+
+    // Filter the top level by name on the server
+    const search = document.createElement('input');
+    search.type = 'search';
+    search.className = 'file-browser-search';
+    search.placeholder = 'Filter by name';
+    let timer = null;
+    let generation = 0;
+    search.addEventListener('input', () => {
+      clearTimeout(timer);
+      timer = setTimeout(async () => {
+        const current = ++generation;
+        const ul = document.createElement('ul');
+        if (!(await loadPage(ul, root.dataset.path, 0, search.value.trim()))) return;
+        if (current !== generation) return;
+        root.replaceChildren(...ul.childNodes);
+      }, 250);
+    });
+    container.insertBefore(search, root);
   });
 }
 
@@ -23,6 +23,46 @@ export function initSetInspector() {
     });
   }
 
+  // Preview what changed since the selected backup
+  document.querySelectorAll('.backup-diff').forEach(box => {
+    const select = document.getElementById(box.dataset.for);
+    const form = select?.form;
+    if (!select || !form || !window.fetch) return;
+    const showDiff = async () => {
+      const params = new URLSearchParams({
+        set_path: form.querySelector('input[name="set_path"]').value,
+        backup: select.value
+      });
+      box.textContent = 'Comparing…';
+      try {
+        const resp = await fetch(`${form.getAttribute('action')}/api/diff?${params.toString()}`);
+        const data = await resp.json();
+        box.innerHTML = '';
+        if (!data.success) {
+          box.textContent = data.message || 'Comparison failed';
+          return;
+        }
+        if (!data.summary.length) {
+          box.textContent = 'Identical to the current version';
+          return;
+        }
+        const title = document.createElement('div');
+        title.textContent = 'Changes since this backup:';
+        const list = document.createElement('ul');
+        data.summary.forEach(line => {
+          const item = document.createElement('li');
+          item.textContent = line;
+          list.appendChild(item);
+        });
+        box.append(title, list);
+      } catch (err) {
+        box.textContent = 'Comparison failed';
+      }
+    };
+    select.addEventListener('change', showDiff);
+    showDiff();
+  });
+
   // Auto-load clip when a clip cell is clicked
   const clipGrid = document.querySelector('#clipSelectForm .pad-grid');
   const clipNameSpan = document.getElementById('selected-clip-name');
@@ -43,11 +83,11 @@ export function initSetInspector() {
   if (!dataDiv) return;
   const notes = JSON.parse(dataDiv.dataset.notes || '[]');
   const envelopes = JSON.parse(dataDiv.dataset.envelopes || '[]');
-  const region = parseFloat(dataDiv.dataset.region || '4');
-  const loopStart = parseFloat(dataDiv.dataset.loopStart || '0');
-  const loopEnd = parseFloat(dataDiv.dataset.loopEnd || String(region));
-  const paramRanges = JSON.parse(dataDiv.dataset.paramRanges || '{}');
-  const isDrumTrack = dataDiv.dataset.drumTrack === 'true';
+  let region = parseFloat(dataDiv.dataset.region || '4');
+  let loopStart = parseFloat(dataDiv.dataset.loopStart || '0');
+  let loopEnd = parseFloat(dataDiv.dataset.loopEnd || String(region));
+  let paramRanges = JSON.parse(dataDiv.dataset.paramRanges || '{}');
+  let isDrumTrack = dataDiv.dataset.drumTrack === 'true';
   const canvas = document.getElementById('clipCanvas');
   const ctx = canvas.getContext('2d');
   const velCanvas = document.getElementById('velocityCanvas');
@@ -811,39 +851,289 @@ export function initSetInspector() {
   }
 
 
-  if (saveClipForm) saveClipForm.addEventListener('submit', () => {
+  function currentNotes() {
+    const seq = (piano && piano.sequence) || [];
+    return seq.map(ev => {
+      const note = {
+        noteNumber: ev.n,
+        startTime: ev.t / ticksPerBeat,
+        duration: ev.g / ticksPerBeat,
+        velocity: ev.v ?? 100.0,
+        offVelocity: 0.0
+      };
+      if (ev.a) note.automations = ev.a;
+      return note;
+    });
+  }
+
+  function currentEnvelopes() {
+    let envs = envelopes.map(e => ({ parameterId: e.parameterId, breakpoints: e.breakpoints }));
+    if (editing && envSelect && envSelect.value) {
+      const pid = parseInt(envSelect.value);
+      let bps = currentEnv;
+      if (!bps.length && envInfo) {
+        bps = envInfo.breakpoints;
+      }
+      const newEnv = { parameterId: pid, breakpoints: bps };
+      const idx = envs.findIndex(e => e.parameterId === pid);
+      if (idx >= 0) envs[idx] = newEnv; else envs.push(newEnv);
+    }
+    return envs;
+  }
+
+  // Baseline of the clip as last loaded or saved, used to build patches.
+  // Notes are matched on their position in editor ticks, but patch keys use
+  // the stored values so unedited notes are never rewritten.
+  let version = dataDiv.dataset.version || null;
+  let baseline = null;
+  function resetBaseline(storedNotes) {
+    baseline = {
+      notes: storedNotes.map(n => ({
+        key: { noteNumber: n.noteNumber, startTime: n.startTime },
+        tick: `${n.noteNumber}:${Math.round(n.startTime * ticksPerBeat)}`,
+        g: Math.round(n.duration * ticksPerBeat),
+        v: Math.round(n.velocity || 100),
+        a: JSON.stringify(n.automations || null)
+      })),
+      envMap: new Map(envelopes.map(e => [e.parameterId, JSON.stringify(e.breakpoints)])),
+      region: [region, loopStart, loopEnd].map(v => Math.round(v * ticksPerBeat)).join(':')
+    };
+  }
+  resetBaseline(notes);
+
+  function buildPatch() {
+    const ops = [];
+    const byTick = new Map();
+    baseline.notes.forEach(b => {
+      if (!byTick.has(b.tick)) byTick.set(b.tick, []);
+      byTick.get(b.tick).push(b);
+    });
+    const seq = (piano && piano.sequence) || [];
+    const added = [];
+    seq.forEach(ev => {
+      const list = byTick.get(`${ev.n}:${ev.t}`);
+      const b = list && list.shift();
+      if (!b) {
+        added.push(ev);
+        return;
+      }
+      const a = JSON.stringify(ev.a || null);
+      if (b.g !== ev.g || b.v !== Math.round(ev.v ?? 100) || b.a !== a) {
+        const changes = { duration: ev.g / ticksPerBeat, velocity: ev.v ?? 100.0 };
+        if (ev.a) changes.automations = ev.a;
+        ops.push({ op: 'modify', key: b.key, changes });
+      }
+    });
+    byTick.forEach(list => list.forEach(b => ops.push({ op: 'remove', key: b.key })));
+    added.forEach(ev => {
+      const note = {
+        noteNumber: ev.n,
+        startTime: ev.t / ticksPerBeat,
+        duration: ev.g / ticksPerBeat,
+        velocity: ev.v ?? 100.0,
+        offVelocity: 0.0
+      };
+      if (ev.a) note.automations = ev.a;
+      ops.push({ op: 'add', note });
+    });
+    currentEnvelopes().forEach(e => {
+      if (baseline.envMap.get(e.parameterId) !== JSON.stringify(e.breakpoints)) {
+        ops.push({ op: 'set_envelope', parameterId: e.parameterId, breakpoints: e.breakpoints });
+      }
+    });
+    const regionKey = [piano.xrange, piano.markstart, piano.markend].map(Math.round).join(':');
+    if (regionKey !== baseline.region) {
+      ops.push({
+        op: 'region',
+        end: piano.xrange / ticksPerBeat,
+        loop_start: piano.markstart / ticksPerBeat,
+        loop_end: piano.markend / ticksPerBeat
+      });
+    }
+    return ops;
+  }
+
+  async function savePatch() {
+    const clipVal = saveClipForm.querySelector('input[name="clip_select"]').value;
+    const [track, clip] = clipVal.split(':').map(Number);
+    const ops = buildPatch();
+    if (!ops.length) return true;
+    const tolerance = saveClipForm.querySelector('input[name="envelope_tolerance"]');
+    const resp = await fetch(`${saveClipForm.getAttribute('action')}/api/clip/patch`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({
+        set_path: saveClipForm.querySelector('input[name="set_path"]').value,
+        track, clip, version, ops,
+        envelope_tolerance: tolerance ? tolerance.value : ''
+      })
+    });
+    const data = await resp.json();
+    if (resp.status === 409) {
+      alert(data.message || 'Set changed elsewhere, reloading.');
+      await loadClip(track, clip);
+      return true;
+    }
+    if (!data.success) return false;
+    version = data.version;
+    if (data.removed_points) {
+      // Show the simplified envelopes that were actually saved
+      await loadClip(track, clip);
+      watchSaveStatus();
+      return true;
+    }
+    const saved = currentNotes();
+    notes.splice(0, notes.length, ...saved);
+    envelopes.splice(0, envelopes.length, ...currentEnvelopes().map(e => {
+      const prev = envelopes.find(p => p.parameterId === e.parameterId) || {};
+      return { ...prev, ...e };
+    }));
+    region = piano.xrange / ticksPerBeat;
+    loopStart = piano.markstart / ticksPerBeat;
+    loopEnd = piano.markend / ticksPerBeat;
+    resetBaseline(saved);
+    watchSaveStatus();
+    return true;
+  }
+
+  // Edits are buffered on the server and written once the set is idle;
+  // poll until the buffer is flushed so unsaved state stays visible.
+  const saveStatus = document.getElementById('saveStatus');
+  let statusTimer = null;
+  async function watchSaveStatus() {
+    if (!saveStatus) return;
+    clearTimeout(statusTimer);
+    const setPath = saveClipForm.querySelector('input[name="set_path"]').value;
+    const params = new URLSearchParams({ set_path: setPath });
+    try {
+      const resp = await fetch(`${saveClipForm.getAttribute('action')}/api/status?${params.toString()}`);
+      const data = await resp.json();
+      if (data.error) {
+        saveStatus.textContent = `Save failed: ${data.error}`;
+      } else if (data.dirty) {
+        saveStatus.textContent = 'Unsaved changes';
+      } else {
+        saveStatus.textContent = data.last_flush ? `Saved ${data.last_flush}` : '';
+      }
+      if (data.dirty || data.error) statusTimer = setTimeout(watchSaveStatus, 1000);
+    } catch (err) {
+      statusTimer = setTimeout(watchSaveStatus, 2000);
+    }
+  }
+  if (saveStatus && saveClipForm) watchSaveStatus();
+
+  window.addEventListener('pagehide', () => {
+    const setPath = saveClipForm?.querySelector('input[name="set_path"]')?.value;
+    if (!setPath || !navigator.sendBeacon) return;
+    navigator.sendBeacon(
+      `${saveClipForm.getAttribute('action')}/api/commit`,
+      new Blob([JSON.stringify({ set_path: setPath })], { type: 'application/json' })
+    );
+  });
+
+  if (saveClipForm) saveClipForm.addEventListener('submit', ev => {
+    if (version && window.fetch) {
+      // Send only what changed; fall back to a full save if the patch fails
+      ev.preventDefault();
+      savePatch().then(ok => {
+        if (!ok) {
+          version = null;
+          saveClipForm.requestSubmit();
+        }
+      }).catch(() => {
+        version = null;
+        saveClipForm.requestSubmit();
+      });
+      return;
+    }
     if (piano && notesInput) {
-      const seq = piano.sequence || [];
-      notesInput.value = JSON.stringify(seq.map(ev => {
-        const note = {
-          noteNumber: ev.n,
-          startTime: ev.t / ticksPerBeat,
-          duration: ev.g / ticksPerBeat,
-          velocity: ev.v ?? 100.0,
-          offVelocity: 0.0
-        };
-        if (ev.a) note.automations = ev.a;
-        return note;
-      }));
+      notesInput.value = JSON.stringify(currentNotes());
     }
     if (envsInput) {
-      let envs = envelopes.map(e => ({ parameterId: e.parameterId, breakpoints: e.breakpoints }));
-      if (editing && envSelect && envSelect.value) {
-        const pid = parseInt(envSelect.value);
-        let bps = currentEnv;
-        if (!bps.length && envInfo) {
-          bps = envInfo.breakpoints;
-        }
-        const newEnv = { parameterId: pid, breakpoints: bps };
-        const idx = envs.findIndex(e => e.parameterId === pid);
-        if (idx >= 0) envs[idx] = newEnv; else envs.push(newEnv);
-      }
-      envsInput.value = JSON.stringify(envs);
+      envsInput.value = JSON.stringify(currentEnvelopes());
     }
     if (regionInput) regionInput.value = (piano.xrange / ticksPerBeat).toFixed(6);
     if (loopStartInput) loopStartInput.value = (piano.markstart / ticksPerBeat).toFixed(6);
     if (loopEndInput) loopEndInput.value = (piano.markend / ticksPerBeat).toFixed(6);
   });
+
+  // Switch clips in place using the JSON clip API instead of reloading the page
+  async function loadClip(track, clip) {
+    const setPath = saveClipForm?.querySelector('input[name="set_path"]')?.value;
+    if (!setPath || !piano) return;
+    const params = new URLSearchParams({ set_path: setPath, track, clip });
+    const resp = await fetch(`${saveClipForm.getAttribute('action')}/api/clip?${params.toString()}`);
+    const data = await resp.json();
+    if (!data.success) {
+      alert(data.message || 'Failed to load clip');
+      return;
+    }
+    notes.splice(0, notes.length, ...(data.notes || []));
+    envelopes.splice(0, envelopes.length, ...(data.envelopes || []));
+    region = data.region ?? 4.0;
+    loopStart = data.loop_start ?? 0.0;
+    loopEnd = data.loop_end ?? region;
+    paramRanges = data.param_ranges || {};
+    isDrumTrack = !!data.is_drum_track;
+    piano.drumtrack = isDrumTrack;
+    piano.sequence = notes.map(n => ({
+      t: Math.round(n.startTime * ticksPerBeat),
+      n: n.noteNumber,
+      g: Math.round(n.duration * ticksPerBeat),
+      v: Math.round(n.velocity || 100),
+      a: n.automations || null
+    }));
+    piano.xoffset = 0;
+    piano.xrange = region * ticksPerBeat;
+    piano.markstart = loopStart * ticksPerBeat;
+    piano.markend = loopEnd * ticksPerBeat;
+    const { min, max } = notes.length
+      ? { min: Math.min(...notes.map(n => n.noteNumber)),
+          max: Math.max(...notes.map(n => n.noteNumber)) }
+      : { min: 60, max: 71 };
+    piano.yoffset = Math.max(0, min - 2);
+    piano.yrange = Math.max(12, max - min + 5);
+    overlayActive = false;
+    overlayRow = null;
+    ghostNotes = [];
+    removedNotes = [];
+    recomputeOverlay();
+    if (envSelect) {
+      envSelect.innerHTML = '<option value="">No Envelope</option>';
+      (data.env_options || []).forEach(opt => {
+        const o = document.createElement('option');
+        o.value = opt.id;
+        o.textContent = opt.label;
+        envSelect.appendChild(o);
+      });
+    }
+    version = data.version || null;
+    resetBaseline(notes);
+    const clipInput = saveClipForm.querySelector('input[name="clip_select"]');
+    if (clipInput) clipInput.value = `${track}:${clip}`;
+    const trackCrumb = document.getElementById('trackBreadcrumb');
+    if (trackCrumb) trackCrumb.textContent = `Track ${track + 1}: ${data.track_name || ''}`;
+    const clipCrumb = document.getElementById('clipBreadcrumb');
+    if (clipCrumb) clipCrumb.textContent = `Clip ${clip + 1}`;
+    if (piano.redraw) piano.redraw();
+    if (envSelect) envSelect.dispatchEvent(new Event('change'));
+  }
+
+  const miniClipGrid = document.querySelector('#miniClipForm .pad-grid');
+  if (miniClipGrid) {
+    miniClipGrid.querySelectorAll('input[name="clip_select"]').forEach(radio => {
+      const label = miniClipGrid.querySelector(`label[for="${radio.id}"]`);
+      if (!label || radio.disabled) return;
+      label.addEventListener('click', ev => {
+        ev.preventDefault();
+        ev.stopPropagation();
+        radio.checked = true;
+        const [track, clip] = radio.value.split(':').map(Number);
+        loadClip(track, clip);
+      });
+    });
+  }
+
   if (envSelect && envSelect.value) {
     envSelect.dispatchEvent(new Event('change'));
   } else {
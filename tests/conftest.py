@@ -0,0 +1,37 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import list_msets_handler, restore_handler, set_metadata, set_registry
+from core.preset_index import preset_index
+from core.set_search import set_index
+
+
+@pytest.fixture(autouse=True)
+def index_databases(tmp_path, monkeypatch):
+    """Keep the SQLite indexes of each test in its temporary directory."""
+    for index, name in ((preset_index, "preset_index.sqlite3"), (set_index, "set_index.sqlite3")):
+        monkeypatch.setattr(index, "db_path", str(tmp_path / "index" / name))
+        monkeypatch.setattr(index, "_conn", None)
+    yield
+    # Pad grids refresh a stale index in the background; let that finish
+    # before the temporary directory goes away.
+    thread = set_index._thread
+    if thread is not None:
+        thread.join()
+    for index in (preset_index, set_index):
+        index.close()
+
+
+@pytest.fixture
+def sets_dir(tmp_path, monkeypatch):
+    """Point every module reading ``MSETS_DIRECTORY`` at an empty ``Sets`` dir."""
+    path = tmp_path / "Sets"
+    path.mkdir()
+    for mod in (list_msets_handler, restore_handler, set_registry, set_metadata):
+        monkeypatch.setattr(mod, "MSETS_DIRECTORY", str(path))
+    set_registry.set_registry.invalidate()
+    return path
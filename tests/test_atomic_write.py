@@ -0,0 +1,47 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import atomic_write as aw
+
+
+def test_replace_keeps_mode_and_owner(tmp_path, monkeypatch):
+    path = tmp_path / "Song.abl"
+    path.write_text("old")
+    os.chmod(path, 0o600)
+    st = os.stat(path)
+    chowned = []
+    monkeypatch.setattr(aw.os, "chown", lambda p, uid, gid: chowned.append((uid, gid)))
+
+    aw.write_atomic(str(path), "new")
+    assert path.read_text() == "new"
+    assert os.stat(path).st_mode & 0o7777 == 0o600
+    assert chowned == [(st.st_uid, st.st_gid)]
+
+    aw.write_atomic(str(tmp_path / "new.bin"), b"\x00")
+    assert os.stat(tmp_path / "new.bin").st_mode & 0o7777 == aw.NEW_FILE_MODE
+
+
+def test_failed_write_leaves_file_untouched(tmp_path):
+    path = tmp_path / "preset.json"
+    path.write_text("keep")
+    with pytest.raises(RuntimeError):
+        with aw.atomic_open(str(path)) as f:
+            f.write("partial")
+            raise RuntimeError("boom")
+    assert path.read_text() == "keep"
+    assert os.listdir(tmp_path) == ["preset.json"]
+
+
+def test_concurrent_writers_do_not_share_temp_files(tmp_path):
+    path = tmp_path / "preset.json"
+    payloads = [str(i) * 100_000 for i in range(8)]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda data: aw.write_atomic(str(path), data), payloads))
+    assert path.read_text() in payloads
+    assert os.listdir(tmp_path) == ["preset.json"]
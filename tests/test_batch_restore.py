@@ -0,0 +1,84 @@
+import os
+import sys
+import zipfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import batch_restore as br
+from core import set_registry as sr
+
+SONG = '{"tracks": [{"sampleUri": "Samples/kick.wav"}]}'
+
+
+def make_bundle(path):
+    with zipfile.ZipFile(path, "w") as zf:
+        zf.writestr("Song.abl", SONG)
+        zf.writestr("Samples/kick.wav", b"RIFF")
+    return str(path)
+
+
+def test_build_plan_validates_and_autoassigns():
+    files = ["/u/a.ablbundle", "/u/b.abl", "/u/c.abl"]
+    plan, error = br.build_plan(files, [{"file": "b.abl", "pad": 5, "color": 3}], [0, 1, 4])
+    assert error is None
+    assert [(p["file"], p["pad"], p["color"]) for p in plan] == [
+        ("b.abl", 4, 3), ("a.ablbundle", 0, 1), ("c.abl", 1, 1),
+    ]
+
+    _, error = br.build_plan(files, [{"file": "a.ablbundle", "pad": 3}], [0, 1, 4])
+    assert "already in use" in error
+    _, error = br.build_plan(files, [
+        {"file": "a.ablbundle", "pad": 1}, {"file": "b.abl", "pad": 1},
+    ], [0, 1, 4])
+    assert "more than once" in error
+    _, error = br.build_plan(files, [], [0, 1])
+    assert "Not enough free pads" in error
+    _, error = br.build_plan(files, [{"file": "x.abl", "pad": 1}], [0, 1, 4])
+    assert "unknown file" in error
+
+
+def test_batch_job_restores_archive(monkeypatch, tmp_path, sets_dir):
+    refreshes = []
+    monkeypatch.setattr(br, "refresh_library", lambda: refreshes.append(1) or (True, "ok"))
+
+    archive = tmp_path / "backup.zip"
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.write(make_bundle(tmp_path / "One.ablbundle"), "One.ablbundle")
+        zf.write(make_bundle(tmp_path / "Two.ablbundle"), "sets/Two.ablbundle")
+        zf.writestr("readme.txt", "ignored")
+    raw = tmp_path / "Three.abl"
+    raw.write_text(SONG)
+
+    work_dir = tmp_path / "work"
+    files = br.expand_uploads([str(archive), str(raw)], str(work_dir))
+    assert sorted(os.path.basename(f) for f in files) == ["One.ablbundle", "Three.abl", "Two.ablbundle"]
+
+    plan, error = br.build_plan(files, [{"file": "Three.abl", "pad": 10, "color": 4}],
+                                sr.set_registry.snapshot().free)
+    assert error is None
+
+    events = []
+    job = br.BatchRestoreJob(plan, emit=lambda e, d: events.append((e, d)), work_dir=str(work_dir))
+    job.start().join(10)
+
+    assert job.status == "completed"
+    assert br.get_job(job.job_id) is job
+    assert refreshes == [1]
+    assert [e for e, _ in events] == ["restore_progress"] * 3 + ["restore_complete"]
+    assert events[-1][1]["completed"] == 3
+    assert not work_dir.exists()
+
+    snap = sr.set_registry.snapshot()
+    assert snap.name_map == {0: "One", 1: "Two", 9: "Three"}
+    assert snap.color_map[9] == 4
+
+
+def test_finished_jobs_are_forgotten(monkeypatch):
+    monkeypatch.setattr(br, "refresh_library", lambda: (True, "ok"))
+    job = br.BatchRestoreJob([]).start()
+    assert job.join(10)
+    assert br.get_job(job.job_id) is job
+
+    monkeypatch.setattr(br, "JOB_RETENTION", 0)
+    assert br.get_job(job.job_id) is None
@@ -16,3 +16,32 @@ def test_set_get_invalidate():
     cm.set_cache("b", 2)
     cm.invalidate_cache()
     assert cm.get_cache("b") is None
+
+
+def test_invalidate_prefix():
+    cm.set_cache("x:1", 1)
+    cm.set_cache("x:2", 2)
+    cm.set_cache("y:1", 3)
+    cm.invalidate_cache(prefix="x:")
+    assert cm.get_cache("x:1") is None
+    assert cm.get_cache("x:2") is None
+    assert cm.get_cache("y:1") == 3
+
+
+def test_invalidate_paths(tmp_path):
+    samples = tmp_path / "Samples"
+    presets = tmp_path / "Presets"
+    cm.set_cache("samples", 1, paths=[str(samples)])
+    cm.set_cache("preset", 2, paths=[str(presets / "a.ablpreset")])
+    cm.set_cache("plain", 3)
+
+    assert cm.invalidate_paths([str(samples / "kick.wav")]) == ["samples"]
+    assert cm.get_cache("preset") == 2
+    # Removing a folder affects entries built from files inside it
+    assert cm.invalidate_paths([str(presets)]) == ["preset"]
+
+    cm.set_cache("samples", 1, paths=[str(samples)])
+    cm.invalidate_unwatched([str(tmp_path)])
+    assert cm.get_cache("samples") == 1
+    assert cm.get_cache("plain") is None
+    cm.invalidate_cache()
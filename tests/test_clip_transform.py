@@ -0,0 +1,98 @@
+import copy
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import clip_transform as ct
+from core import song_cache
+from core.set_inspector_handler import _truncate_overlap_notes
+
+
+def note(pitch, start, duration=0.5, velocity=100.0, **extra):
+    return dict({"noteNumber": pitch, "startTime": start, "duration": duration, "velocity": velocity}, **extra)
+
+
+def make_clip(notes):
+    return {
+        "notes": notes,
+        "envelopes": [{"parameterId": 1, "breakpoints": [{"time": 0.0, "value": 0.0}, {"time": 4.0, "value": 1.0}]}],
+        "region": {"start": 0.0, "end": 4.0, "loop": {"start": 0.0, "end": 4.0}},
+    }
+
+
+def test_chain_is_applied_in_order():
+    clip = make_clip([note(60, 0.1, automations={"x": 1}), note(127, 1.9, velocity=120.0)])
+    ct.apply_chain(clip, [
+        {"op": "transpose", "semitones": 2},
+        {"op": "quantize", "grid": 0.5},
+        {"op": "velocity", "scale": 2.0},
+    ])
+    assert [(n["noteNumber"], n["startTime"], n["velocity"]) for n in clip["notes"]] == [
+        (62, 0.0, 127.0), (127, 2.0, 127.0)
+    ]
+    assert clip["notes"][0]["automations"] == {"x": 1}
+
+
+def test_reverse_and_stretch_cover_region_and_envelopes():
+    clip = make_clip([note(60, 0.0, 1.0)])
+    ct.apply_chain(clip, [{"op": "reverse"}])
+    assert clip["notes"][0]["startTime"] == 3.0
+    assert [bp["time"] for bp in clip["envelopes"][0]["breakpoints"]] == [0.0, 4.0]
+    assert [bp["value"] for bp in clip["envelopes"][0]["breakpoints"]] == [1.0, 0.0]
+
+    ct.apply_chain(clip, [{"op": "stretch", "factor": 2}])
+    assert clip["notes"][0]["startTime"] == 6.0
+    assert clip["notes"][0]["duration"] == 2.0
+    assert clip["region"]["end"] == 8.0 and clip["region"]["loop"]["end"] == 8.0
+
+
+def test_humanize_is_seeded():
+    a = make_clip([note(60, float(i)) for i in range(4)])
+    b = copy.deepcopy(a)
+    chain = [{"op": "humanize", "timing": 0.05, "velocity": 10, "seed": 3}]
+    ct.apply_chain(a, chain)
+    ct.apply_chain(b, chain)
+    assert a["notes"] == b["notes"]
+    assert all(1 <= n["velocity"] <= 127 for n in a["notes"])
+
+
+def test_truncate_overlaps_matches_reference():
+    rng = random.Random(5)
+    for _ in range(20):
+        notes = [
+            note(rng.choice([36, 38, 42]), rng.choice([0.0, 0.25, 0.5, 1.0, 1.5]), rng.choice([0.25, 1.0, 2.0]))
+            for _ in range(12)
+        ]
+        expected = _truncate_overlap_notes(copy.deepcopy(notes))
+        arr = ct.truncate_overlaps(ct.notes_to_array(notes))
+        assert ct.array_to_notes(arr, notes) == expected
+
+
+def test_transform_track_writes_once(tmp_path):
+    path = tmp_path / "Song.abl"
+    drum = {"kind": "drumRack"}
+    song = {"tracks": [
+        {"devices": [drum], "clipSlots": [
+            {"clip": make_clip([note(36, 0.0, 1.0), note(36, 0.5, 1.0)])},
+            {"clip": None},
+            {"clip": make_clip([note(38, 1.0)])},
+        ]},
+        {"devices": [], "clipSlots": [{"clip": make_clip([note(60, 0.0)])}]},
+    ]}
+    path.write_text(json.dumps(song))
+    song_cache.invalidate_song()
+
+    result = ct.transform_clips(str(path), [{"op": "transpose", "semitones": 1}], track=0)
+    assert result["success"]
+    assert [(c["track"], c["clip"]) for c in result["clips"]] == [(0, 0), (0, 2)]
+    saved = json.loads(path.read_text())
+    first = saved["tracks"][0]["clipSlots"][0]["clip"]["notes"]
+    assert [(n["noteNumber"], n["duration"]) for n in first] == [(37, 0.5), (37, 1.0)]
+    assert saved["tracks"][1]["clipSlots"][0]["clip"]["notes"][0]["noteNumber"] == 60
+
+    assert not ct.transform_clips(str(path), [{"op": "explode"}])["success"]
+    stale = ct.transform_clips(str(path), [{"op": "reverse"}], version="old")
+    assert stale["conflict"]
@@ -104,7 +104,7 @@ def test_scan_for_drum_rack_presets(monkeypatch, tmp_path):
     monkeypatch.setattr(drih.os, "walk", fake_walk)
     monkeypatch.setattr(drih, "get_cache", lambda k: None)
     captured = {}
-    monkeypatch.setattr(drih, "set_cache", lambda k, v: captured.setdefault("data", v))
+    monkeypatch.setattr(drih, "set_cache", lambda k, v, paths=None: captured.setdefault("data", v))
 
     result = drih.scan_for_drum_rack_presets()
     assert result["success"]
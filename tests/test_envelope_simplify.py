@@ -0,0 +1,97 @@
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import song_cache
+from core import set_inspector_handler as sih
+from core.envelope_simplify import simplify_breakpoints, simplify_envelopes
+
+
+def bp(time, value):
+    return {"time": time, "value": value}
+
+
+def test_simplify_stays_within_tolerance():
+    times = np.linspace(0.0, 4.0, 400)
+    values = np.sin(times) * 10
+    points = [bp(float(t), float(v)) for t, v in zip(times, values)]
+    kept, removed = simplify_breakpoints(points, 0.05)
+    assert removed == len(points) - len(kept) and len(kept) < 40
+    assert kept[0] is points[0] and kept[-1] is points[-1]
+    rebuilt = np.interp(times, [p["time"] for p in kept], [p["value"] for p in kept])
+    assert np.max(np.abs(rebuilt - values)) <= 0.05 + 1e-9
+
+
+def test_steps_are_kept_and_lines_collapse():
+    points = [bp(0.0, 0.0), bp(1.0, 1.0), bp(2.0, 2.0), bp(2.0, 5.0), bp(3.0, 5.0), bp(4.0, 5.0)]
+    kept, removed = simplify_breakpoints(points, 0.0)
+    assert [(p["time"], p["value"]) for p in kept] == [(0.0, 0.0), (2.0, 2.0), (2.0, 5.0), (4.0, 5.0)]
+    assert removed == 2
+    assert simplify_breakpoints(points[:2], 1.0) == (points[:2], 0)
+
+
+def test_tolerance_is_relative_to_parameter_range():
+    points = [bp(0.0, 0.0), bp(1.0, 0.4), bp(2.0, 0.0)]
+    envs = [{"parameterId": 7, "breakpoints": points}]
+    assert simplify_envelopes(envs, 0.01, {7: {"min": 0.0, "max": 100.0}})[1] == 1
+    assert simplify_envelopes(envs, 0.01, {7: {"min": 0.0, "max": 1.0}})[1] == 0
+
+
+def test_save_clip_reports_removed_points(tmp_path):
+    path = tmp_path / "Song.abl"
+    path.write_text(json.dumps({"tracks": [{"devices": [], "clipSlots": [{"clip": {"notes": []}}]}]}))
+    song_cache.invalidate_song()
+    ramp = [bp(i / 10, i / 10) for i in range(41)]
+    envs = [{"parameterId": 1, "breakpoints": ramp}]
+
+    result = sih.save_clip(str(path), 0, 0, [], envs, 4.0, 0.0, 4.0, tolerance=0.005)
+    assert result["success"] and result["removed_points"] == 39
+    saved = json.loads(path.read_text())["tracks"][0]["clipSlots"][0]["clip"]
+    assert len(saved["envelopes"][0]["breakpoints"]) == 2
+
+    result = sih.save_envelope(str(path), 0, 0, 1, ramp)
+    assert result["removed_points"] == 0
+    saved = json.loads(path.read_text())["tracks"][0]["clipSlots"][0]["clip"]
+    assert len(saved["envelopes"][0]["breakpoints"]) == 41
+
+
+def test_save_clip_only_simplifies_edited_envelopes(tmp_path):
+    ramp = [bp(i / 10, i / 10) for i in range(41)]
+    recorded = {"parameterId": 2, "breakpoints": ramp}
+    clip = {"notes": [], "envelopes": [recorded]}
+    path = tmp_path / "Song.abl"
+    path.write_text(json.dumps({"tracks": [{"devices": [], "clipSlots": [{"clip": clip}]}]}))
+    song_cache.invalidate_song()
+
+    envs = [dict(recorded), {"parameterId": 1, "breakpoints": ramp}]
+    result = sih.save_clip(str(path), 0, 0, [], envs, 4.0, 0.0, 4.0, tolerance=0.005)
+    assert result["removed_points"] == 39
+    saved = json.loads(path.read_text())["tracks"][0]["clipSlots"][0]["clip"]["envelopes"]
+    assert [len(e["breakpoints"]) for e in saved] == [41, 2]
+
+
+def test_patch_clip_simplifies_set_envelope_ops(tmp_path):
+    from handlers.set_inspector_handler_class import SetInspectorHandler
+
+    path = tmp_path / "Song.abl"
+    path.write_text(json.dumps({"tracks": [{"devices": [], "clipSlots": [{"clip": {"notes": []}}]}]}))
+    song_cache.invalidate_song()
+    ramp = [bp(i / 10, i / 10) for i in range(41)]
+    op = {"op": "set_envelope", "parameterId": 1, "breakpoints": ramp}
+
+    result = sih.patch_clip(str(path), 0, 0, [op])
+    assert result["success"] and result["removed_points"] == 0
+    result = sih.patch_clip(str(path), 0, 0, [op], tolerance=0.005)
+    assert result["removed_points"] == 39
+    saved = json.loads(path.read_text())["tracks"][0]["clipSlots"][0]["clip"]["envelopes"]
+    assert len(saved[0]["breakpoints"]) == 2
+
+    # Simplification only happens when a save asks for it
+    handler = SetInspectorHandler()
+    assert handler._envelope_tolerance(None) is None
+    assert handler._envelope_tolerance("") is None
+    assert handler._envelope_tolerance("0.5") == 0.005
@@ -5,10 +5,10 @@ import sys
 
 sys.path.append(str(Path(__file__).resolve().parents[1]))
 
-from core.file_browser import _list_directory, _check_json_file, _has_kind
+from core.file_browser import _list_directory, _check_json_file, _has_kind, generate_dir_html, list_directory_page
 
 
-def test_list_directory_cache(tmp_path):
+def test_list_directory_sees_new_files(tmp_path):
     # create directory structure
     (tmp_path / "sub").mkdir()
     (tmp_path / "a.txt").write_text("x")
@@ -16,7 +16,7 @@ def test_list_directory_cache(tmp_path):
     assert dirs == ["sub"]
     assert "a.txt" in files
 
-    # add new file to invalidate cache
+    # listings are read fresh on every call
     (tmp_path / "b.txt").write_text("y")
     dirs2, files2 = _list_directory(str(tmp_path), "")
     assert "b.txt" in files2
@@ -28,6 +28,69 @@ def test_list_directory_missing(tmp_path):
     assert dirs == [] and files == []
 
 
+def test_list_directory_page(tmp_path):
+    (tmp_path / "Kicks").mkdir()
+    (tmp_path / "loops").mkdir()
+    for i in range(5):
+        (tmp_path / f"kick{i}.wav").write_text("x")
+    (tmp_path / "snare.wav").write_text("x")
+    (tmp_path / "notes.txt").write_text("x")
+
+    page = list_directory_page(str(tmp_path), "", "wav", offset=0, limit=4)
+    assert [e["name"] for e in page["entries"]] == ["Kicks", "loops", "kick0.wav", "kick1.wav"]
+    assert page["entries"][0] == {"type": "dir", "name": "Kicks", "path": "Kicks"}
+    assert page["entries"][2]["path"] == str(tmp_path / "kick0.wav")
+    assert page["total"] == 8 and page["has_more"]
+
+    rest = list_directory_page(str(tmp_path), "", "wav", offset=4, limit=4)
+    assert [e["name"] for e in rest["entries"]] == ["kick2.wav", "kick3.wav", "kick4.wav", "snare.wav"]
+    assert not rest["has_more"]
+
+    found = list_directory_page(str(tmp_path), "", "wav", query="KICK")
+    assert [e["name"] for e in found["entries"]] == ["Kicks"] + [f"kick{i}.wav" for i in range(5)]
+
+    prefixed = list_directory_page(str(tmp_path), "Kicks", path_prefix="Core Library")
+    assert prefixed["path"] == os.path.join("Core Library", "Kicks")
+    assert prefixed["entries"] == [] and not prefixed["has_more"]
+
+
+def test_kind_filtered_page_checks_only_needed_files(tmp_path, monkeypatch):
+    import core.file_browser as fb
+
+    root = tmp_path / "presets"
+    root.mkdir()
+    for i in range(10):
+        (root / f"p{i}.ablpreset").write_text(json.dumps({"kind": "drift"}))
+    checked = []
+    real_filter = fb._file_filter
+
+    def counting_filter(base_dir, rel_path, files, filter_key):
+        checked.extend(files)
+        return real_filter(base_dir, rel_path, files, filter_key)
+
+    monkeypatch.setattr(fb, "DEFAULT_PAGE_SIZE", 2)
+    monkeypatch.setattr(fb, "_file_filter", counting_filter)
+
+    page = list_directory_page(str(root), "", "drift", limit=3)
+    assert [e["name"] for e in page["entries"]] == ["p0.ablpreset", "p1.ablpreset", "p2.ablpreset"]
+    assert page["has_more"] and page["total"] is None
+    assert len(checked) == 4
+
+    last = list_directory_page(str(root), "", "drift", offset=8, limit=3)
+    assert [e["name"] for e in last["entries"]] == ["p8.ablpreset", "p9.ablpreset"]
+    assert not last["has_more"] and last["total"] == 10
+
+
+def test_generate_dir_html_matches_page(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.wav").write_text("x")
+    html = generate_dir_html(str(tmp_path), "", "/reverse", "wav_file", "reverse_file", "wav")
+    assert html.startswith('<ul class="file-tree root" data-path="">')
+    assert '<li class="dir closed" data-path="sub"><span>📁 sub</span>' in html
+    assert f'name="wav_file" value="{tmp_path / "a.wav"}"' in html
+    assert html.endswith("</ul>")
+
+
 def test_check_json_file_caching(tmp_path, monkeypatch):
     p = tmp_path / "preset.json"
     p.write_text(json.dumps({"kind": "drift"}))
@@ -36,11 +99,11 @@ def test_check_json_file_caching(tmp_path, monkeypatch):
     # patch json.load to ensure it isn't called when cached
     def fail_load(f):
         raise AssertionError("json.load called")
-    monkeypatch.setattr("core.file_browser.json.load", fail_load)
+    monkeypatch.setattr("core.preset_index.json.load", fail_load)
     assert _check_json_file(str(p), "drift") is True
 
     # updating the file should trigger a reload
-    monkeypatch.setattr("core.file_browser.json.load", lambda f: {})
+    monkeypatch.setattr("core.preset_index.json.load", lambda f: {})
     p.write_text("{}")
     import time
     time.sleep(0.01)
@@ -57,3 +120,26 @@ def test_has_kind_nested():
     data = {"x": [{"kind": "drift"}, {"y": {"kind": "other"}}]}
     assert _has_kind(data, "drift") is True
     assert _has_kind(data, "missing") is False
+
+
+def test_kind_prefilter(tmp_path, monkeypatch):
+    from core.file_browser import _kind_prefilter
+
+    p = tmp_path / "preset.ablpreset"
+    p.write_text(json.dumps({"kind": "instrumentRack", "chains": [{"kind": "drift"}]}, indent=2))
+    assert _kind_prefilter(str(p), "drift") is None
+    assert _kind_prefilter(str(p), "wavetable") is False
+
+    # Escapes could spell the token, so the file must be parsed
+    p.write_text('{"kind": "w\\u0061vetable"}')
+    assert _kind_prefilter(str(p), "wavetable") is None
+    assert _check_json_file(str(p), "wavetable") is True
+
+    # Ruled-out files are never parsed
+    def fail_load(f):
+        raise AssertionError("json.load called")
+    monkeypatch.setattr("core.preset_index.json.load", fail_load)
+    q = tmp_path / "other.json"
+    q.write_text(json.dumps({"kind": "drumRack"}))
+    assert _check_json_file(str(q), "drift") is False
+    assert _kind_prefilter(str(tmp_path / "missing.json"), "drift") is None
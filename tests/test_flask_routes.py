@@ -122,6 +122,71 @@ def test_restore_post(client, monkeypatch):
     assert resp.status_code == 200
     assert b'restored' in resp.data
 
+def test_restore_batch_post(client, monkeypatch):
+    captured = {}
+    def fake_batch(form, emit=None, runner=None):
+        captured['names'] = [f.filename for f in form['bundles']]
+        return {'status': 202, 'content': '{"success": true, "job_id": "abc"}'}
+    monkeypatch.setattr(move_webserver.restore_handler, 'handle_batch_post', fake_batch)
+    data = {'bundles': [(io.BytesIO(b'a'), 'a.abl'), (io.BytesIO(b'b'), 'b.ablbundle')]}
+    resp = client.post('/restore/batch', data=data, content_type='multipart/form-data')
+    assert resp.status_code == 202
+    assert resp.get_json()['job_id'] == 'abc'
+    assert captured['names'] == ['a.abl', 'b.ablbundle']
+    assert client.get('/restore/batch/missing').status_code == 404
+
+def test_restore_batch_streams_progress(client, monkeypatch, sets_dir, tmp_path):
+    from core import batch_restore
+
+    monkeypatch.setattr(batch_restore, 'refresh_library', lambda: (True, 'refreshed'))
+    monkeypatch.setattr(move_webserver.restore_handler, 'upload_dir', str(tmp_path))
+    socket = move_webserver.socketio.test_client(move_webserver.app, namespace='/restore')
+    assert socket.is_connected('/restore')
+
+    song = b'{"tracks": []}'
+    data = {
+        'bundles': [(io.BytesIO(song), 'One.abl'), (io.BytesIO(song), 'Two.abl')],
+        'plan': '[{"file": "Two.abl", "pad": 5, "color": 3}]',
+    }
+    resp = client.post('/restore/batch', data=data, content_type='multipart/form-data')
+    assert resp.status_code == 202
+    job = batch_restore.get_job(resp.get_json()['job_id'])
+    assert job.join(10)
+
+    received = socket.get_received('/restore')
+    names = [r['name'] for r in received]
+    assert names == ['restore_progress', 'restore_progress', 'restore_complete']
+    assert received[-1]['args'][0]['status'] == 'completed'
+    assert received[-1]['args'][0]['refresh_message'] == 'refreshed'
+    socket.disconnect(namespace='/restore')
+
+    data = {'bundles': [(io.BytesIO(song), 'One.abl')], 'plan': '["One.abl"]'}
+    resp = client.post('/restore/batch', data=data, content_type='multipart/form-data')
+    assert resp.status_code == 400
+    assert resp.get_json()['message'] == 'Plan entries must be objects.'
+
+def test_set_export_route(client, monkeypatch):
+    def fake_export(mset_uuid):
+        if mset_uuid != 'abc':
+            return {'success': False, 'message': 'not found'}
+        return {'success': True, 'message': '', 'filename': 'My Set.ablbundle', 'stream': iter([b'PK', b'\x03\x04'])}
+    monkeypatch.setattr(move_webserver, 'export_set', fake_export)
+    resp = client.get('/sets/abc/export')
+    assert resp.status_code == 200
+    assert resp.data == b'PK\x03\x04'
+    assert "My%20Set.ablbundle" in resp.headers['Content-Disposition']
+    assert client.get('/sets/nope/export').status_code == 404
+
+def test_set_pads_post(client, monkeypatch):
+    captured = {}
+    def fake_changes(payload):
+        captured['payload'] = payload
+        return {'status': 409, 'content': '{"success": false}'}
+    monkeypatch.setattr(move_webserver.set_management_handler, 'handle_pad_changes', fake_changes)
+    resp = client.post('/sets/pads', json={'ops': [{'op': 'swap', 'a': 1, 'b': 2}]})
+    assert resp.status_code == 409
+    assert captured['payload'] == {'ops': [{'op': 'swap', 'a': 1, 'b': 2}]}
+
 def test_slice_post(client, monkeypatch):
     def fake_handle_post(form):
         return {'message': 'sliced', 'message_type': 'success'}
@@ -748,3 +813,30 @@ def test_set_inspector_post(client, monkeypatch):
 
 
 
+
+def test_set_search_route(client, monkeypatch):
+    captured = {}
+    def fake_search(**filters):
+        captured.update(filters)
+        return {'sets': 1, 'refreshing': False, 'results': [], 'elapsed_ms': 0.1}
+    monkeypatch.setattr(move_webserver.set_index, 'search_fresh', fake_search)
+    resp = client.get('/sets/search?q=kick&kind=drift&tempo_min=120')
+    assert resp.status_code == 200
+    assert resp.get_json()['success']
+    assert captured == {'text': 'kick', 'kind': 'drift', 'tempo_min': 120.0}
+    assert client.get('/sets/search?tempo_max=fast').status_code == 400
+
+
+def test_browse_dir_json(client, tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.wav").write_text("x")
+    (tmp_path / "b.wav").write_text("x")
+    resp = client.get('/browse-dir', query_string={
+        'root': str(tmp_path), 'format': 'json', 'filter': 'wav', 'limit': 2,
+    })
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [e['name'] for e in data['entries']] == ['sub', 'a.wav']
+    assert data['has_more'] and data['total'] == 3
+    html = client.get('/browse-dir', query_string={'root': str(tmp_path), 'filter': 'wav'})
+    assert b'b.wav' in html.data
@@ -0,0 +1,58 @@
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import cache_manager as cm
+from core.library_watcher import LibraryWatcher
+
+
+def _wait_for(predicate, timeout=3.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_invalidates_changed_paths(tmp_path, use_inotify):
+    samples = tmp_path / "Samples"
+    presets = tmp_path / "Track Presets"
+    samples.mkdir()
+    presets.mkdir()
+    watcher = LibraryWatcher([samples, presets], poll_interval=0.05, use_inotify=use_inotify)
+    seen = []
+    watcher.add_listener(seen.extend)
+    assert watcher.start()
+    try:
+        if use_inotify and watcher.mode != "inotify":
+            pytest.skip("inotify not available")
+        cm.set_cache("wav", ["a.wav"], paths=[samples])
+        cm.set_cache("presets", [], paths=[presets])
+        cm.set_cache("other", 1)
+
+        (samples / "new").mkdir()
+        (samples / "new" / "b.wav").write_bytes(b"x")
+        assert _wait_for(lambda: cm.get_cache("wav") is None)
+        assert cm.get_cache("presets") == []
+        assert _wait_for(lambda: str(samples / "new" / "b.wav") in seen)
+
+        # sync() makes a change visible before returning
+        (presets / "p.ablpreset").write_text("{}")
+        watcher.sync()
+        assert cm.get_cache("presets") is None
+
+        cm.set_cache("wav", ["a.wav"], paths=[samples])
+        assert watcher.refresh_caches()
+        assert cm.get_cache("wav") == ["a.wav"]
+        assert cm.get_cache("other") is None
+    finally:
+        watcher.stop()
+        cm.invalidate_cache()
+    assert not watcher.running
+    assert not watcher.refresh_caches()
@@ -1,3 +1,4 @@
+import os
 import sys
 from pathlib import Path
 
@@ -38,3 +39,46 @@ def test_list_msets_and_free(monkeypatch, tmp_path):
     free = lmh.list_msets_free()
     assert 0 not in free and 31 not in free
     assert len(free) == 30
+
+
+def test_get_xattr_value_native(monkeypatch, tmp_path):
+    monkeypatch.setattr(lmh, "MSETS_DIRECTORY", str(tmp_path))
+    (tmp_path / "uuid1").mkdir()
+    os.setxattr(tmp_path / "uuid1", "user.song-index", b"5")
+    assert lmh.get_xattr_value("uuid1", "user.song-index") == "5"
+    assert lmh.get_xattr_value("uuid1", "user.song-color") == "Unknown"
+    assert lmh.get_xattr_value("missing", "user.song-index") == "Unknown"
+
+
+def test_list_msets_index_reuses_unchanged_sets(monkeypatch, tmp_path):
+    monkeypatch.setattr(lmh, "MSETS_DIRECTORY", str(tmp_path))
+    (tmp_path / "uuid1" / "SetA").mkdir(parents=True)
+    (tmp_path / "uuid2" / "SetB").mkdir(parents=True)
+    values = {"uuid1": "0", "uuid2": "3"}
+    calls = []
+
+    def fake_get_xattr(rel, attr):
+        calls.append(rel)
+        return values[rel] if attr == "user.song-index" else "1"
+
+    monkeypatch.setattr(lmh, "get_xattr_value", fake_get_xattr)
+
+    first = lmh.list_msets()
+    assert [m["mset_id"] for m in first] == [0, 3]
+    calls.clear()
+
+    second = lmh.list_msets()
+    assert second == first
+    assert calls == []
+
+    # Renaming the set folder bumps the UUID directory's mtime
+    (tmp_path / "uuid2" / "SetB").rename(tmp_path / "uuid2" / "SetC")
+    third = lmh.list_msets()
+    assert set(calls) == {"uuid2"}
+    assert third[1]["mset_name"] == "SetC"
+
+    # Explicit invalidation forces a re-read
+    calls.clear()
+    lmh.invalidate_mset("uuid1")
+    lmh.list_msets()
+    assert set(calls) == {"uuid1"}
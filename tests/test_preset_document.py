@@ -0,0 +1,84 @@
+import json
+import shutil
+from pathlib import Path
+
+from core import preset_document as pd
+from core.preset_document import PresetDocument
+from core.synth_param_editor_handler import update_parameter_values, update_macro_values
+from core.synth_preset_inspector_handler import (
+    extract_macro_information,
+    update_preset_parameter_mappings,
+    delete_parameter_mapping,
+)
+from handlers import synth_param_editor_handler_class as speh
+
+EXAMPLE = Path(__file__).resolve().parents[1] / "examples" / "Track Presets" / "Drift" / "Analog Shape - Core.json"
+
+
+class SimpleForm(dict):
+    def getvalue(self, name, default=None):
+        return self.get(name, default)
+
+
+def test_document_edits_are_written_once(tmp_path):
+    src = tmp_path / "preset.ablpreset"
+    shutil.copy(EXAMPLE, src)
+    original = src.read_bytes()
+    out = tmp_path / "copy.ablpreset"
+
+    doc = PresetDocument.load(str(src))
+    result = update_parameter_values(doc, {"Oscillator1_Shape": "0.25"}, str(out))
+    assert result["success"] and result["path"] == str(out)
+    assert update_macro_values(doc, {0: "0.5"})["success"]
+    assert update_preset_parameter_mappings(
+        doc, {1: {"parameter": "Oscillator1_Shape", "rangeMin": "0.1", "rangeMax": "0.9"}}
+    )["success"]
+    # Nothing touches the disk until save()
+    assert not out.exists() and doc.dirty
+
+    mapped = extract_macro_information(doc)["mapped_parameters"]
+    assert mapped["Oscillator1_Shape"]["macro_index"] == 1
+    assert doc.save() == str(out)
+    assert src.read_bytes() == original
+    assert not list(tmp_path.glob("*.tmp"))
+
+    saved = extract_macro_information(str(out))
+    assert saved["mapped_parameters"]["Oscillator1_Shape"]["macro_index"] == 1
+    assert json.loads(out.read_text()) == doc.data
+
+    # Path callers keep writing straight through
+    assert delete_parameter_mapping(str(out), mapped["Oscillator1_Shape"]["path"])["success"]
+    assert "Oscillator1_Shape" not in extract_macro_information(str(out))["mapped_parameters"]
+
+
+def test_save_params_parses_preset_once(tmp_path, monkeypatch):
+    src = tmp_path / "preset.ablpreset"
+    shutil.copy(EXAMPLE, src)
+    monkeypatch.setattr(speh, "refresh_library", lambda: (True, "ok"))
+    monkeypatch.setattr(speh, "generate_dir_html", lambda *a, **k: "")
+    loads = []
+    real_load = json.load
+    monkeypatch.setattr(pd.json, "load", lambda f: loads.append(1) or real_load(f))
+    writes = []
+    real_write = pd.write_preset
+    monkeypatch.setattr(pd, "write_preset", lambda p, d: writes.append(p) or real_write(p, d))
+
+    form = SimpleForm({
+        "action": "save_params",
+        "preset_select": str(src),
+        "param_count": "1",
+        "param_0_name": "Oscillator1_Shape",
+        "param_0_value": "0.75",
+        "macro_0_value": "0.3",
+        "macros_data": json.dumps([
+            {"index": 2, "name": "Shape", "parameters": [{"name": "Oscillator1_Shape"}]},
+        ]),
+    })
+    result = speh.SynthParamEditorHandler().handle_post(form)
+
+    assert result["message_type"] == "success"
+    assert len(loads) == 1 and writes == [str(src)]
+    info = extract_macro_information(str(src))
+    assert info["mapped_parameters"]["Oscillator1_Shape"]["macro_index"] == 2
+    assert info["macros"][2]["name"] == "Shape"
+    assert '"Shape"' in result["macros_json"]
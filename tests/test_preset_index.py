@@ -0,0 +1,81 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import preset_index as pi
+from core import synth_preset_inspector_handler as spih
+from core.cache_manager import invalidate_cache
+
+
+def write_preset(path, kind, macro=None, sample=None):
+    device = {"kind": kind, "parameters": {}}
+    if macro:
+        device["parameters"]["Macro0"] = {"value": 0.0, "customName": macro}
+    if sample:
+        device["deviceData"] = {"sampleUri": sample}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"kind": "instrumentRack", "chains": [{"devices": [device]}]}))
+
+
+def test_describe_preset():
+    data = {"kind": "instrumentRack", "chains": [{"devices": [
+        {"kind": "drift", "parameters": {"Macro2": {"customName": "Cutoff"}, "Macro3": 0.5}},
+        {"kind": "drumCell", "deviceData": {"sampleUri": "ableton:/a.wav"}},
+    ]}]}
+    assert pi.describe_preset(data) == {
+        "kinds": ["instrumentRack", "drift", "drumCell"],
+        "macros": {2: "Cutoff"},
+        "samples": ["ableton:/a.wav"],
+    }
+
+
+def test_index_is_incremental_and_persistent(tmp_path, monkeypatch):
+    root = tmp_path / "Track Presets"
+    write_preset(root / "a" / "Lead.ablpreset", "drift", macro="Bright")
+    write_preset(root / "Pad.ablpreset", "wavetable")
+    write_preset(root / "Kit.json", "drumRack", sample="ableton:/kick.wav")
+    (root / "Broken.ablpreset").write_text("{")
+    db = str(tmp_path / "presets.sqlite3")
+
+    index = pi.PresetIndex(db)
+    found = index.find(str(root), ["drift", "wavetable"])
+    assert found == [(str(root / "Pad.ablpreset"), "wavetable"), (str(root / "a" / "Lead.ablpreset"), "drift")]
+    entry = index.lookup([str(root / "a" / "Lead.ablpreset")])[str(root / "a" / "Lead.ablpreset")]
+    assert entry["macros"] == {0: "Bright"}
+    index.close()
+
+    # A new instance reads nothing that did not change
+    loads = []
+    real_load = json.load
+    monkeypatch.setattr(pi.json, "load", lambda f: loads.append(f.name) or real_load(f))
+    index = pi.PresetIndex(db)
+    assert index.find(str(root), ["drumRack"]) == [(str(root / "Kit.json"), "drumRack")]
+    assert loads == []
+
+    write_preset(root / "Pad.ablpreset", "drift")
+    os.utime(root / "Pad.ablpreset", ns=(1, 1))
+    (root / "a" / "Lead.ablpreset").unlink()
+    assert index.find(str(root), ["drift"]) == [(str(root / "Pad.ablpreset"), "drift")]
+    assert loads == [str(root / "Pad.ablpreset")]
+    assert index.lookup([str(root / "Broken.ablpreset")])[str(root / "Broken.ablpreset")]["valid"] is False
+
+    # Scanning only .ablpreset files keeps the rows of .json presets
+    loads.clear()
+    index.scan(str(root), (".ablpreset",))
+    assert index.find(str(root), ["drumRack"]) == [(str(root / "Kit.json"), "drumRack")]
+    assert loads == []
+
+
+def test_synth_scan_is_cached_per_device_type(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_preset(tmp_path / "examples" / "Track Presets" / "Lead.ablpreset", "drift")
+    write_preset(tmp_path / "examples" / "Track Presets" / "Pad.ablpreset", "wavetable")
+    invalidate_cache()
+    drift = spih.scan_for_synth_presets(("drift",))["presets"]
+    wavetable = spih.scan_for_synth_presets(("wavetable",))["presets"]
+    assert [p["name"] for p in drift] == ["Lead"]
+    assert [p["name"] for p in wavetable] == ["Pad"]
+    invalidate_cache()
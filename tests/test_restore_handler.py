@@ -0,0 +1,79 @@
+import io
+import json
+import os
+import sys
+import zipfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import restore_handler as rh
+from core import set_registry as sr
+
+SONG = '{"tracks": [{"sampleUri": "Samples/kick.wav"}, {"sampleUri" : "Samples/a%20b.wav"}, {"sampleUri": null}]}'
+
+
+def test_rewrite_sample_uris_across_chunks(monkeypatch):
+    monkeypatch.setattr(rh, "_REWRITE_CHUNK", 3)
+    out = io.StringIO()
+    rh.rewrite_sample_uris(io.StringIO(SONG), out, "ableton:/x/Samples/")
+    assert out.getvalue() == SONG.replace('"Samples/', '"ableton:/x/Samples/')
+
+
+def test_restore_ablbundle(tmp_path, sets_dir):
+    bundle = tmp_path / "My Set.ablbundle"
+    with zipfile.ZipFile(bundle, "w") as zf:
+        zf.writestr("Song.abl", SONG)
+        zf.writestr("Samples/kick.wav", b"RIFF")
+        zf.writestr("../evil.txt", b"x")
+
+    result = rh.restore_ablbundle(str(bundle), 4, 7)
+    assert result["success"], result["message"]
+
+    (uuid_dir,) = list(sets_dir.iterdir())
+    folder = uuid_dir / "My Set"
+    song = (folder / "Song.abl").read_text()
+    assert f'ableton:/user-library/Sets/{uuid_dir.name}/My%20Set/Samples/kick.wav' in song
+    assert (folder / "Samples" / "kick.wav").read_bytes() == b"RIFF"
+    assert (folder / "evil.txt").exists()
+    assert not (tmp_path / "evil.txt").exists()
+    assert os.getxattr(uuid_dir, "user.song-index") == b"4"
+    assert os.getxattr(uuid_dir, "user.song-color") == b"7"
+    assert os.getxattr(uuid_dir, "user.local-cloud-state") == b"notSynced"
+
+    # The pad is now taken
+    assert 4 not in sr.set_registry.snapshot().free
+    again = rh.restore_ablbundle(str(bundle), 4, 7)
+    assert not again["success"] and "already in use" in again["message"]
+
+
+def test_restore_abl_and_bad_bundle_cleanup(tmp_path, sets_dir):
+
+    bad = tmp_path / "Broken.ablbundle"
+    bad.write_bytes(b"not a zip")
+    result = rh.restore_ablbundle(str(bad), 0, 1)
+    assert not result["success"]
+    assert result["message"] == "Error: Invalid .ablbundle file."
+    assert list(sets_dir.iterdir()) == []
+
+    abl = tmp_path / "Raw.abl"
+    abl.write_text(SONG)
+    result = rh.restore_abl(str(abl), 0, 1)
+    assert result["success"], result["message"]
+    (uuid_dir,) = list(sets_dir.iterdir())
+    song = (uuid_dir / "Raw" / "Song.abl").read_text()
+    assert song.count("ableton:/user-library/Sets/") == 2
+
+
+def test_place_song(sets_dir):
+    song = {"tracks": [{"sampleUri": "Samples/kick.wav"}, {"sampleUri": "ableton:/packs/x.wav"}]}
+
+    assert not rh.place_song(dict(song), "../bad", 1, 1)["success"]
+
+    result = rh.place_song(song, "Gen.abl", 1, 2)
+    assert result["success"], result["message"]
+    (uuid_dir,) = list(sets_dir.iterdir())
+    data = json.loads((uuid_dir / "Gen" / "Song.abl").read_text())
+    assert data["tracks"][0]["sampleUri"] == f"ableton:/user-library/Sets/{uuid_dir.name}/Gen/Samples/kick.wav"
+    assert data["tracks"][1]["sampleUri"] == "ableton:/packs/x.wav"
+    assert sr.set_registry.snapshot().by_pad(1)["mset_name"] == "Gen"
@@ -0,0 +1,54 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import schema_registry as reg
+from core.synth_preset_inspector_handler import load_drift_schema
+
+
+def test_schema_loaded_once_and_revalidated(tmp_path, monkeypatch):
+    path = tmp_path / "schema.json"
+    path.write_text(json.dumps({
+        "Gain": {"type": "number", "min": 0, "max": 2, "unit": "dB"},
+        "Mode": {"type": "enum", "min": None, "max": None, "options": ["A", "B"]},
+    }))
+    loads = []
+    real_load = json.load
+    monkeypatch.setattr(reg.json, "load", lambda f: loads.append(1) or real_load(f))
+
+    first = reg.load_schema(str(path))
+    assert reg.load_schema(str(path)) is first
+    assert len(loads) == 1
+    assert reg.schema_ranges(first) == {"Gain": {"min": 0.0, "max": 2.0, "unit": "dB"}}
+    assert reg.schema_ranges(first) is reg.schema_ranges(first)
+    assert reg.schema_enums(first) == {"Mode": ("A", "B")}
+    assert json.loads(reg.schema_json(first)) == first
+
+    path.write_text(json.dumps({"Gain": {"type": "number", "min": 0, "max": 4}}))
+    os.utime(path, ns=(1, 1))
+    second = reg.load_schema(str(path))
+    assert second is not first and len(loads) == 2
+    assert reg.schema_ranges(second)["Gain"]["max"] == 4.0
+
+    # Unregistered dicts still work, they are just not memoized
+    assert reg.schema_ranges({"X": {"min": 1, "max": 3}})["X"]["max"] == 3.0
+    assert reg.load_schema(str(tmp_path / "missing.json")) == {}
+
+
+def test_drift_loader_is_shared():
+    assert load_drift_schema() is load_drift_schema()
+
+
+def test_editor_renders_enum_options_from_schema():
+    from handlers import melodic_sampler_param_editor_handler_class as mod
+
+    options = reg.schema_enums(mod.load_melodic_sampler_schema())["Voice_Filter_Type"]
+    assert len(options) > 1
+    handler = mod.MelodicSamplerParamEditorHandler()
+    html = handler.generate_params_html([{"name": "Voice_Filter_Type", "value": options[-1]}])
+    for opt in options[:-1]:
+        assert f'<option value="{opt}">{opt}</option>' in html
+    assert f'<option value="{options[-1]}" selected>{options[-1]}</option>' in html
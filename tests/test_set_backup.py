@@ -13,6 +13,7 @@ from core.set_backup_handler import (
     get_current_timestamp,
     write_latest_timestamp,
 )
+from core import set_backup_handler as sbh
 from core.set_inspector_handler import save_clip, save_envelope
 
 
@@ -77,3 +78,58 @@ def test_get_current_timestamp(tmp_path):
     write_latest_timestamp(str(set_path), ts)
     expected = datetime.strptime(ts, "%Y%m%dT%H%M%S%f").strftime("%Y-%m-%d %H:%M:%S")
     assert get_current_timestamp(str(set_path)) == expected
+
+
+def test_backups_are_deduplicated_and_compressed(tmp_path, monkeypatch):
+    monkeypatch.setattr(sbh, "MAX_BACKUPS", 3)
+    set_file = tmp_path / "Song.abl"
+    body = json.dumps({"tracks": [{"name": "T" * 2000}]})
+    for i in range(5):
+        set_file.write_text(body if i % 2 == 0 else body + " ")
+        backup_set(str(set_file))
+
+    backup_dir = tmp_path / "backups"
+    assert not list(backup_dir.glob("*" + BACKUP_EXT))
+    index = json.loads((backup_dir / "index.json").read_text())["backups"]
+    assert len(index) == 3
+    objects = list((backup_dir / "objects").iterdir())
+    assert len(objects) == 2
+    assert all(o.stat().st_size < len(body) / 4 for o in objects)
+
+    names = [b["name"] for b in list_backups(str(set_file), limit=0)]
+    assert names == [e["name"] for e in reversed(index)]
+    assert restore_backup(str(set_file), names[1])
+    assert set_file.read_text() == body + " "
+    assert not restore_backup(str(set_file), "missing" + BACKUP_EXT)
+
+
+def test_legacy_backups_are_migrated(tmp_path):
+    set_file = tmp_path / "Song.abl"
+    set_file.write_text("current")
+    backup_dir = tmp_path / "backups"
+    backup_dir.mkdir()
+    legacy = backup_dir / ("Song.abl.20240101T000000000000" + BACKUP_EXT)
+    legacy.write_text("old")
+
+    backups = list_backups(str(set_file))
+    assert [b["name"] for b in backups] == [legacy.name]
+    assert not legacy.exists()
+    assert restore_backup(str(set_file), legacy.name)
+    assert set_file.read_text() == "old"
+
+
+def test_restore_keeps_mode_and_owner(tmp_path, monkeypatch):
+    set_file = tmp_path / "Song.abl"
+    set_file.write_text("original")
+    backup_set(str(set_file))
+    name = list_backups(str(set_file))[0]['name']
+    set_file.write_text("edited")
+    os.chmod(set_file, 0o600)
+    st = os.stat(set_file)
+    chowned = []
+    monkeypatch.setattr(sbh.os, "chown", lambda p, uid, gid: chowned.append((p, uid, gid)))
+
+    assert restore_backup(str(set_file), name)
+    assert set_file.read_text() == "original"
+    assert os.stat(set_file).st_mode & 0o7777 == 0o600
+    assert (st.st_uid, st.st_gid) in [(uid, gid) for _, uid, gid in chowned]
@@ -0,0 +1,73 @@
+import copy
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import set_diff, song_cache
+from core.set_backup_handler import backup_set, list_backups
+
+
+def note(pitch, start, duration=0.25, velocity=100.0):
+    return {"noteNumber": pitch, "startTime": start, "duration": duration, "velocity": velocity}
+
+
+def make_song():
+    clips = []
+    for i in range(3):
+        clips.append({"clip": {
+            "name": f"Clip{i + 1}",
+            "notes": [note(36 + i, float(b)) for b in range(4)],
+            "envelopes": [{"parameterId": 1, "breakpoints": [{"time": 0.0, "value": 0.5}]}],
+            "region": {"end": 4.0, "loop": {"start": 0.0, "end": 4.0}},
+        }})
+    return {"tracks": [{"name": "Drums", "devices": [], "clipSlots": clips + [{"clip": None}]}]}
+
+
+def test_diff_notes_classifies_changes():
+    old = [note(60, 0.0), note(62, 1.0), note(64, 2.0), note(65, 3.0)]
+    new = [note(60, 0.0), note(62, 1.5), note(64, 2.0, velocity=50.0), note(67, 3.0)]
+    delta = set_diff.diff_notes(old, new)
+    assert delta["counts"] == {"added": 1, "removed": 1, "moved": 1, "modified": 1}
+    assert delta["moved"][0]["from"]["startTime"] == 1.0
+    assert delta["moved"][0]["to"]["startTime"] == 1.5
+    assert delta["added"][0]["noteNumber"] == 67
+    assert delta["removed"][0]["noteNumber"] == 65
+
+
+def test_diff_songs_skips_unchanged_clips():
+    old = make_song()
+    new = copy.deepcopy(old)
+    clip = new["tracks"][0]["clipSlots"][1]["clip"]
+    clip["notes"] = [dict(n, startTime=n["startTime"] + 0.5) for n in clip["notes"]]
+    clip["envelopes"][0]["breakpoints"] = [{"time": 0.0, "value": 0.9}]
+    new["tracks"][0]["clipSlots"][3]["clip"] = {"name": "New", "notes": [], "envelopes": []}
+
+    result = set_diff.diff_songs(old, new)
+    assert result["unchanged_clips"] == 2
+    assert [(c["clip"], c["status"]) for c in result["clips"]] == [(1, "changed"), (3, "added")]
+    assert result["summary"] == [
+        "clip 1:2 (Clip2), 4 notes moved, 1 envelope changed",
+        "clip 1:4 (New) added",
+    ]
+    assert set_diff.diff_songs(old, copy.deepcopy(old))["summary"] == []
+
+
+def test_diff_backup_against_current(tmp_path):
+    path = tmp_path / "Song.abl"
+    song = make_song()
+    path.write_text(json.dumps(song))
+    backup_set(str(path))
+    song["tracks"][0]["name"] = "Beat"
+    del song["tracks"][0]["clipSlots"][0]["clip"]["notes"][0]
+    path.write_text(json.dumps(song))
+    song_cache.invalidate_song()
+
+    name = list_backups(str(path))[0]["name"]
+    result = set_diff.diff_backup(str(path), name)
+    assert result["success"]
+    assert result["summary"] == ["track 1 renamed", "clip 1:1 (Clip1), 1 note removed"]
+    assert result["clips"][0]["notes"]["removed"] == [note(36, 0.0)]
+
+    assert not set_diff.diff_backup(str(path), "missing.ablbak")["success"]
@@ -0,0 +1,38 @@
+import io
+import sys
+import zipfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import restore_handler as rh
+from core import set_export
+
+SONG = '{"tracks": [{"sampleUri": "Samples/kick.wav"}, {"sampleUri" : "Samples/a%20b.wav"}, {"sampleUri": null}]}'
+
+
+def test_export_round_trip(monkeypatch, tmp_path, sets_dir):
+    monkeypatch.setattr(set_export, "_COPY_CHUNK", 2)
+    bundle = tmp_path / "My Set.ablbundle"
+    other = '{"sampleUri": "ableton:/user-library/Sets/other/X/Samples/y.wav"}'
+    with zipfile.ZipFile(bundle, "w") as zf:
+        zf.writestr("Song.abl", SONG[:-1] + ', ' + other + '}')
+        zf.writestr("Samples/kick.wav", b"RIFF1234")
+        zf.writestr("Samples/a b.wav", b"RIFFab")
+        zf.writestr("Samples/unused.wav", b"RIFF")
+    assert rh.restore_ablbundle(str(bundle), 0, 3)["success"]
+
+    (uuid_dir,) = list(sets_dir.iterdir())
+    result = set_export.export_set(uuid_dir.name)
+    assert result["filename"] == "My Set.ablbundle"
+    chunks = list(result["stream"])
+    assert len(chunks) > 3
+
+    with zipfile.ZipFile(io.BytesIO(b"".join(chunks))) as zf:
+        assert zf.namelist() == ["Song.abl", "Samples/kick.wav", "Samples/a b.wav"]
+        assert zf.getinfo("Samples/kick.wav").compress_type == zipfile.ZIP_STORED
+        assert zf.read("Samples/kick.wav") == b"RIFF1234"
+        song = zf.read("Song.abl").decode()
+    assert song == SONG[:-1] + ', ' + other + '}'
+
+    assert not set_export.export_set("missing")["success"]
@@ -195,3 +195,72 @@ def test_set_read_only_round_trip(tmp_path):
     for p in (song, sample_file, sample_dir, root, root.parent):
         assert os.stat(p).st_mode & 0o222 != 0
     assert not sih.is_read_only(str(song))
+
+
+def test_handle_api(monkeypatch, tmp_path):
+    from core import list_msets_handler as lmh
+    from core import set_registry as sr
+
+    for mod in (lmh, sr):
+        monkeypatch.setattr(mod, "MSETS_DIRECTORY", str(tmp_path))
+    set_dir = tmp_path / "uuid1" / "My Set"
+    set_dir.mkdir(parents=True)
+    os.setxattr(tmp_path / "uuid1", "user.song-index", b"2")
+    set_path = str(set_dir / "Song.abl")
+    create_simple_set(set_path, with_params=True)
+    sr.set_registry.invalidate()
+
+    handler = SetInspectorHandler()
+    resp = handler.handle_api("clip", {"set_path": set_path, "track": "0", "clip": "0"})
+    data = json.loads(resp["content"])
+    assert resp["status"] == 200
+    assert data["clip_name"] == "Clip1"
+    assert data["env_options"] == [{"id": 1, "label": "Track: Osc1Gain"}]
+
+    data = json.loads(handler.handle_api("clips", {"set_path": set_path})["content"])
+    assert data["clips"][0]["name"] == "Clip1"
+    data = json.loads(handler.handle_api("backups", {"set_path": set_path})["content"])
+    assert data["backups"] == []
+
+    assert handler.handle_api("clip", {"set_path": "/etc/passwd"})["status"] == 404
+    assert handler.handle_api("clip", {"set_path": set_path, "track": "x"})["status"] == 400
+    sr.set_registry.invalidate()
+
+
+def test_patch_clip(tmp_path):
+    set_path = tmp_path / "Song.abl"
+    clip = {
+        "notes": [
+            {"noteNumber": 36, "startTime": 0.0, "duration": 1.0, "velocity": 100.0},
+            {"noteNumber": 38, "startTime": 0.0, "duration": 2.0, "velocity": 100.0},
+            {"noteNumber": 38, "startTime": 1.0, "duration": 0.5, "velocity": 100.0},
+        ],
+        "envelopes": [],
+        "region": {"end": 4.0, "loop": {"start": 0.0, "end": 4.0}},
+    }
+    track = {"devices": [{"kind": "drumRack"}], "clipSlots": [{"clip": clip}]}
+    set_path.write_text(json.dumps({"tracks": [track]}))
+
+    version = sih.get_clip_data(str(set_path), 0, 0)["version"]
+    result = sih.patch_clip(str(set_path), 0, 0, [
+        {"op": "add", "note": {"noteNumber": 36, "startTime": 0.5, "duration": 1.0, "velocity": 90.0}},
+        {"op": "modify", "key": {"noteNumber": 36, "startTime": 0.0}, "changes": {"velocity": 50.0}},
+        {"op": "set_envelope", "parameterId": 7, "breakpoints": [{"time": 0.0, "value": 1.0}]},
+        {"op": "region", "end": 8.0, "loop_end": 8.0},
+    ], version)
+    assert result["success"], result["message"]
+    assert result["version"] != version
+
+    saved = json.loads(set_path.read_text())["tracks"][0]["clipSlots"][0]["clip"]
+    by_key = {(n["noteNumber"], n["startTime"]): n for n in saved["notes"]}
+    # Pitch 36 was edited and gets truncated, pitch 38 is left untouched
+    assert by_key[(36, 0.0)]["duration"] == 0.5
+    assert by_key[(38, 0.0)]["duration"] == 2.0
+    assert by_key[(36, 0.0)]["velocity"] == 50.0
+    assert saved["envelopes"] == [{"parameterId": 7, "breakpoints": [{"time": 0.0, "value": 1.0}]}]
+    assert saved["region"] == {"end": 8.0, "loop": {"start": 0.0, "end": 8.0}, "start": 0.0}
+
+    stale = sih.patch_clip(str(set_path), 0, 0, [{"op": "remove", "key": {"noteNumber": 36, "startTime": 0.0}}], version)
+    assert stale["conflict"] and not stale["success"]
+    missing = sih.patch_clip(str(set_path), 0, 0, [{"op": "remove", "key": {"noteNumber": 60, "startTime": 0.0}}])
+    assert not missing["success"] and "not found" in missing["message"]
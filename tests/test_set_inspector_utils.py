@@ -1,4 +1,5 @@
 import json
+import os
 from pathlib import Path
 import sys
 
@@ -28,3 +29,60 @@ def test_contains_drum_rack():
     track = {"devices": [{"kind": "drumRack", "chains": []}]}
     assert sih._contains_drum_rack(track)
     assert not sih._contains_drum_rack({"devices": [{"kind": "drift"}]})
+
+
+def test_track_param_map_is_cached_per_set_and_track(tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from core import song_cache
+
+    devices = [{"kind": "drumRack", "chains": [
+        {"kind": "drumCell", "Gain": {"id": 1}},
+        {"kind": "drumCell", "Pan": {"id": 2}},
+    ]}]
+    clip = {"notes": [], "envelopes": [], "region": {"end": 4.0}}
+    song = {"tracks": [
+        {"devices": devices, "clipSlots": [{"clip": clip}]},
+        {"devices": [{"kind": "drift"}], "clipSlots": [{"clip": clip}]},
+    ]}
+    path = tmp_path / "Song.abl"
+    path.write_text(json.dumps(song, indent=2))
+    song_cache.invalidate_song()
+
+    walks = []
+    real_collect = sih._collect_param_ids
+
+    def collect(obj, mapping, context, prefix="Track", pad_counter=None):
+        if pad_counter is None:
+            walks.append(1)
+        real_collect(obj, mapping, context, prefix, pad_counter)
+
+    monkeypatch.setattr(sih, "_collect_param_ids", collect)
+
+    # Push the parsed document out of the cache so clips are read partially
+    song_cache.load_song(str(path))
+    monkeypatch.setattr(song_cache, "MAX_SONGS", 1)
+    other = tmp_path / "Other.abl"
+    other.write_text(json.dumps({"tracks": []}))
+    song_cache.load_song(str(other))
+    partial = song_cache.cache_info()["partial"]
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(lambda _: sih.get_clip_data(str(path), 0, 0), range(5)))
+    assert all(r["param_context"] == {1: "Pad1", 2: "Pad2"} for r in results)
+    assert all(r["is_drum_track"] for r in results)
+    assert song_cache.cache_info()["partial"] == partial + 5
+    assert song_cache.cache_info()["size"] == 1
+    assert len(walks) <= 4  # racing first readers may each build the map
+    walks.clear()
+    first = sih.get_clip_data(str(path), 0, 0)
+    assert walks == []
+    assert not sih.get_clip_data(str(path), 1, 0)["is_drum_track"]
+
+    # Clip edits keep the map, other changes rebuild it
+    assert sih.save_clip(str(path), 0, 0, [], [], 8.0, 0.0, 8.0)["success"]
+    walks.clear()
+    assert sih.get_clip_data(str(path), 0, 0)["param_map"] == first["param_map"]
+    assert walks == []
+    song["tracks"][0]["devices"] = [{"kind": "drift"}]
+    path.write_text(json.dumps(song, indent=2))
+    os.utime(path, ns=(1, 1))
+    assert not sih.get_clip_data(str(path), 0, 0)["is_drum_track"]
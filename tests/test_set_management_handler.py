@@ -84,3 +84,31 @@ def test_generate_drum_set_from_file(monkeypatch, tmp_path):
     assert len(data["tracks"][0]["clipSlots"][0]["clip"]["notes"]) == 1
     assert data["tracks"][0]["clipSlots"][0]["clip"]["notes"][0]["noteNumber"] == 36
 
+
+
+def test_generate_midi_set_places_on_pad(monkeypatch, tmp_path, sets_dir):
+    import os
+    monkeypatch.setattr(sm, "load_set_template", lambda p: {
+        "tracks": [{"clipSlots": [{"clip": {"notes": [], "region": {"end": 0, "loop": {"end": 0}}}}]}],
+        "tempo": 0
+    })
+    midi_path = tmp_path / "x.mid"
+    mid = mido.MidiFile()
+    track = mido.MidiTrack()
+    mid.tracks.append(track)
+    track.append(mido.Message("note_on", note=60, velocity=100, time=0))
+    track.append(mido.Message("note_off", note=60, velocity=0, time=480))
+    mid.save(midi_path)
+
+    result = sm.generate_midi_set_from_file("Placed", str(midi_path), 100.0, pad_index=2, pad_color=5)
+    assert result["success"], result["message"]
+    (uuid_dir,) = list(sets_dir.iterdir())
+    song_path = uuid_dir / "Placed" / "Song.abl"
+    assert result["path"] == str(song_path)
+    with open(song_path) as f:
+        data = json.load(f)
+    assert data["tempo"] == 100.0
+    assert os.getxattr(uuid_dir, "user.song-index") == b"2"
+    assert os.getxattr(uuid_dir, "user.song-color") == b"5"
+    # No loose .abl or bundle is left behind
+    assert [p.name for p in sets_dir.iterdir()] == [uuid_dir.name]
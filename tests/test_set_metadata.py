@@ -0,0 +1,110 @@
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import restore_handler as rh
+from core import set_metadata as sm
+from core import set_registry as sr
+from core import set_writer
+from core.song_cache import load_song
+
+
+def make_sets():
+    for name, pad, color in (("A", 0, 1), ("B", 1, 2), ("C", 5, 3)):
+        song = {"tracks": [{"sampleUri": "Samples/k.wav"}]}
+        assert rh.place_song(song, name, pad, color)["success"]
+
+
+def layout():
+    return {p["pad"]: (p["name"], p["color"]) for p in sm.pad_layout() if p["uuid"]}
+
+
+def test_apply_pad_changes(sets_dir):
+    make_sets()
+    c_uuid = sr.set_registry.snapshot().by_pad(5)["uuid"]
+    result = sm.apply_pad_changes([
+        {"op": "swap", "a": 0, "b": 1},
+        {"op": "move", "from": 5, "to": 9},
+        {"op": "color", "pad": 9, "color": 7},
+        {"op": "rename", "pad": 9, "name": "Renamed Set"},
+    ])
+    assert result["success"], result["message"]
+    assert layout() == {1: ("B", 2), 2: ("A", 1), 10: ("Renamed Set", 7)}
+
+    song = sr.song_path_for(sr.set_registry.snapshot().by_uuid(c_uuid))
+    assert f"/Sets/{c_uuid}/Renamed%20Set/Samples/k.wav" in open(song).read()
+
+
+def test_conflicts_leave_pads_untouched(sets_dir):
+    make_sets()
+    before = layout()
+    for ops in (
+        [{"op": "move", "from": 0, "to": 1}],
+        [{"op": "color", "pad": 3, "color": 2}],
+        [{"op": "swap", "a": 0, "b": 1}, {"op": "rename", "pad": 0, "name": "../x"}],
+        [{"op": "color", "pad": 0, "color": 99}],
+    ):
+        assert not sm.apply_pad_changes(ops)["success"]
+    assert layout() == before
+
+
+def test_failed_write_rolls_back(monkeypatch, sets_dir):
+    make_sets()
+    before = layout()
+
+    def fail_rename(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(sm, "_rename_set", fail_rename)
+    result = sm.apply_pad_changes([
+        {"op": "swap", "a": 0, "b": 1},
+        {"op": "rename", "pad": 5, "name": "Taken"},
+    ])
+    assert not result["success"]
+    assert layout() == before
+
+
+def test_rename_flushes_staged_edits(monkeypatch, sets_dir):
+    make_sets()
+    entry = sr.set_registry.snapshot().by_pad(0)
+    song_path = sr.song_path_for(entry)
+    song = dict(load_song(song_path), tempo=133)
+    set_writer.stage(song_path, song)
+
+    assert sm.apply_pad_changes([{"op": "rename", "pad": 0, "name": "Moved"}])["success"]
+    new_path = sr.song_path_for(sr.set_registry.snapshot().by_uuid(entry["uuid"]))
+    with open(new_path) as f:
+        assert json.load(f)["tempo"] == 133
+    assert song_path not in set_writer._sessions
+    assert not (sets_dir / entry["uuid"] / "A").exists()
+
+    monkeypatch.setattr(set_writer, "commit", lambda path: False)
+    result = sm.apply_pad_changes([{"op": "rename", "pad": 0, "name": "Again"}])
+    assert not result["success"]
+    assert layout()[1][0] == "Moved"
+
+
+def test_failed_rename_keeps_sample_uris(monkeypatch, sets_dir):
+    make_sets()
+    entry = sr.set_registry.snapshot().by_pad(0)
+    song_path = sr.song_path_for(entry)
+    with open(song_path) as f:
+        before = f.read()
+
+    def fail_rename(src, dst):
+        raise OSError("cross-device link")
+    with monkeypatch.context() as m:
+        m.setattr(sm.os, "rename", fail_rename)
+        assert not sm.apply_pad_changes([{"op": "rename", "pad": 0, "name": "Moved"}])["success"]
+    with open(song_path) as f:
+        assert f.read() == before
+
+    # A failed rewrite moves the folder back
+    def fail_rewrite(*args):
+        raise OSError("disk full")
+    monkeypatch.setattr(sm, "iter_rewritten_sample_uris", fail_rewrite)
+    assert not sm.apply_pad_changes([{"op": "rename", "pad": 0, "name": "Moved"}])["success"]
+    assert not (sets_dir / entry["uuid"] / "Moved").exists()
+    with open(song_path) as f:
+        assert f.read() == before
@@ -0,0 +1,57 @@
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import list_msets_handler as lmh
+from core import set_registry as sr
+
+
+def make_set(root, uuid, name, pad, color):
+    path = root / uuid / name
+    path.mkdir(parents=True)
+    os.setxattr(root / uuid, "user.song-index", str(pad).encode())
+    os.setxattr(root / uuid, "user.song-color", str(color).encode())
+
+
+def test_snapshot_lookups(monkeypatch, tmp_path):
+    monkeypatch.setattr(lmh, "MSETS_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(sr, "MSETS_DIRECTORY", str(tmp_path))
+    make_set(tmp_path, "uuid1", "SetA", 0, 3)
+    make_set(tmp_path, "uuid2", "SetB", 5, 7)
+
+    registry = sr.SetRegistry()
+    snap = registry.snapshot()
+    assert snap.used == {0, 5}
+    assert 0 not in snap.free and len(snap.free) == 30
+    assert snap.color_map == {0: 3, 5: 7}
+    assert snap.name_map == {0: "SetA", 5: "SetB"}
+    assert snap.by_pad(5)["uuid"] == "uuid2"
+    assert snap.by_pad(1) is None
+    assert snap.by_uuid("uuid1")["mset_name"] == "SetA"
+    song = str(tmp_path / "uuid2" / "SetB" / "Song.abl")
+    assert sr.song_path_for(snap.by_pad(5)) == song
+    assert snap.pad_for_path(song) == 5
+    assert snap.pad_for_path("/nope/Song.abl") is None
+
+    # Unchanged sets reuse the same snapshot object
+    assert registry.snapshot() is snap
+
+
+def test_snapshot_picks_up_changes(monkeypatch, tmp_path):
+    monkeypatch.setattr(lmh, "MSETS_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(sr, "MSETS_DIRECTORY", str(tmp_path))
+    make_set(tmp_path, "uuid1", "SetA", 0, 3)
+
+    registry = sr.SetRegistry()
+    snap = registry.snapshot()
+    assert snap.used == {0}
+
+    os.setxattr(tmp_path / "uuid1", "user.song-index", b"9")
+    make_set(tmp_path, "uuid2", "SetB", 1, 2)
+    registry.invalidate()
+    snap2 = registry.snapshot()
+    assert snap2 is not snap
+    assert snap2.used == {1, 9}
+    assert snap2.by_pad(9)["uuid"] == "uuid1"
@@ -0,0 +1,90 @@
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import set_search
+
+
+def make_library(tmp_path, names):
+    entries = []
+    for pad, name in enumerate(names):
+        path = tmp_path / f"uuid{pad}" / name / "Song.abl"
+        path.parent.mkdir(parents=True)
+        shutil.copy(f"examples/Sets/{name}.abl", path)
+        entries.append((str(path), f"uuid{pad}", name, pad))
+    return entries
+
+
+def test_index_and_search(tmp_path):
+    entries = make_library(tmp_path, ["automation", "808"])
+    index = set_search.SetSearchIndex(str(tmp_path / "db" / "index.sqlite3"), lambda: entries)
+    assert index.refresh() == {"indexed": 2, "removed": 0, "unchanged": 0}
+
+    song = json.loads(Path(entries[0][0]).read_text())
+    rows = set_search.extract_rows(song)
+    kind = rows["devices"][0][1]
+    hits = index.search(kind=kind)
+    assert entries[0][0] in [h["path"] for h in hits]
+    assert all(d["kind"] == kind for h in hits for d in h["matches"]["devices"])
+
+    tempo = song["tempo"]
+    assert [h["path"] for h in index.search(tempo_min=tempo, tempo_max=tempo)] == [
+        e[0] for e in entries if json.loads(Path(e[0]).read_text())["tempo"] == tempo
+    ]
+    assert [h["name"] for h in index.search(text="808")] == ["808"]
+    if rows["samples"]:
+        uri = rows["samples"][0][1]
+        hit = index.search(sample=uri.upper())[0]
+        assert any(s["uri"] == uri for s in hit["matches"]["samples"])
+    assert index.search(text="no such thing anywhere") == []
+
+
+def test_refresh_is_incremental(tmp_path):
+    entries = make_library(tmp_path, ["automation", "808"])
+    index = set_search.SetSearchIndex(str(tmp_path / "index.sqlite3"), lambda: entries)
+    index.refresh()
+    assert index.refresh() == {"indexed": 0, "removed": 0, "unchanged": 2}
+
+    path = Path(entries[0][0])
+    song = json.loads(path.read_text())
+    song["tracks"][0]["clipSlots"][0]["clip"] = {"name": "Findme", "notes": [{}, {}]}
+    path.write_text(json.dumps(song))
+    os.utime(path, ns=(1, 1))
+    del entries[1]
+    assert index.refresh() == {"indexed": 1, "removed": 1, "unchanged": 0}
+    hit = index.search(clip="findme")[0]
+    assert hit["matches"]["clips"] == [{"track": 0, "clip": 0, "name": "Findme", "notes": 2}]
+    assert index.stats()["sets"] == 1
+    index.close()
+
+    # A new connection reads the same database
+    reopened = set_search.SetSearchIndex(str(tmp_path / "index.sqlite3"), lambda: entries)
+    assert reopened.refresh()["unchanged"] == 1
+
+
+def test_summaries_and_pad_tooltips(tmp_path, monkeypatch):
+    entries = make_library(tmp_path, ["pitchbend"])
+    index = set_search.SetSearchIndex(str(tmp_path / "index.sqlite3"), lambda: entries)
+    path = entries[0][0]
+    assert index.summaries([path]) == {}
+    index._thread.join()
+
+    summary = index.summaries([path])[path]
+    assert summary["track_kinds"] == ["drumRack", "melodicSampler", "drift", "drift"]
+    assert summary["tempo"] == json.loads(Path(path).read_text())["tempo"]
+    assert summary["clips"] >= 1 and summary["modified"] == os.stat(path).st_mtime_ns / 1e9
+
+    # Reading summaries parses nothing
+    monkeypatch.setattr(set_search.json, "load", lambda f: 1 / 0)
+    assert index.summaries([path])[path] == summary
+
+    from handlers.set_inspector_handler_class import SetInspectorHandler
+    import handlers.set_inspector_handler_class as sihc
+
+    monkeypatch.setattr(sihc.set_index, "pad_summaries", lambda: {0: dict(summary, name="Bend")})
+    grid = SetInspectorHandler().generate_pad_grid({0}, {}, {0: "Bend"})
+    assert 'title="Bend · ' in grid and "drumRack, melodicSampler" in grid
@@ -0,0 +1,85 @@
+import json
+import os
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import song_cache
+from core import set_inspector_handler as sih
+
+
+def write_set(path, notes=None):
+    clip = {"name": "Clip1", "notes": notes or [], "envelopes": [
+        {"parameterId": 1, "breakpoints": [{"time": 0.0, "value": 0.5}]}
+    ], "region": {"end": 4.0, "loop": {"start": 0.0, "end": 4.0}}}
+    song = {"tracks": [{"name": "T", "devices": [], "clipSlots": [{"clip": clip}, {"clip": None}]}]}
+    Path(path).write_text(json.dumps(song, indent=2))
+
+
+def test_repeated_reads_skip_parser(tmp_path):
+    path = tmp_path / "Song.abl"
+    write_set(path)
+    song_cache.invalidate_song()
+    misses = song_cache.cache_info()["misses"]
+
+    for _ in range(3):
+        assert sih.get_clip_data(str(path), 0, 0)["success"]
+        assert sih.list_clips(str(path))["success"]
+    assert song_cache.cache_info()["misses"] == misses + 1
+
+    # get_clip_data decorates envelopes on a copy only
+    cached = song_cache.load_song(str(path))
+    assert "rangeMin" not in cached["tracks"][0]["clipSlots"][0]["clip"]["envelopes"][0]
+
+    # An external change is picked up through the stat stamp
+    write_set(path, notes=[{"noteNumber": 60, "startTime": 0.0, "duration": 1.0}])
+    os.utime(path, ns=(1, 1))
+    assert len(sih.get_clip_data(str(path), 0, 0)["notes"]) == 1
+    assert song_cache.cache_info()["misses"] == misses + 2
+
+
+def test_save_is_copy_on_write(tmp_path):
+    path = tmp_path / "Song.abl"
+    write_set(path)
+    song_cache.invalidate_song()
+    before = song_cache.load_song(str(path))
+    before_clip = before["tracks"][0]["clipSlots"][0]["clip"]
+
+    assert sih.save_envelope(str(path), 0, 0, 1, [{"time": 1.0, "value": 0.1}])["success"]
+    assert sih.save_clip(str(path), 0, 0, [], [], 8.0, 0.0, 8.0)["success"]
+
+    # The previously handed out document is untouched
+    assert before_clip["envelopes"][0]["breakpoints"] == [{"time": 0.0, "value": 0.5}]
+    assert before_clip["region"] == {"end": 4.0, "loop": {"start": 0.0, "end": 4.0}}
+
+    after = song_cache.load_song(str(path))
+    assert after is not before
+    assert after == json.loads(path.read_text())
+    assert after["tracks"][0]["clipSlots"][0]["clip"]["region"]["end"] == 8.0
+
+
+def test_lru_bound(tmp_path, monkeypatch):
+    monkeypatch.setattr(song_cache, "MAX_SONGS", 2)
+    song_cache.invalidate_song()
+    paths = []
+    for i in range(3):
+        p = tmp_path / f"{i}.abl"
+        write_set(p)
+        paths.append(str(p))
+        song_cache.load_song(str(p))
+    assert song_cache.cache_info()["size"] == 2
+
+
+def test_save_keeps_mode_and_owner(tmp_path, monkeypatch):
+    path = tmp_path / "Song.abl"
+    write_set(path)
+    os.chmod(path, 0o640)
+    st = os.stat(path)
+    chowned = []
+    monkeypatch.setattr(song_cache.os, "chown", lambda p, uid, gid: chowned.append((uid, gid)))
+    song_cache.invalidate_song()
+
+    assert sih.save_clip(str(path), 0, 0, [], [], 8.0, 0.0, 8.0)["success"]
+    assert chowned == [(st.st_uid, st.st_gid)]
+    assert os.stat(path).st_mode & 0o7777 == 0o640
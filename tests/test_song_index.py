@@ -0,0 +1,80 @@
+import io
+import json
+import sys
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+
+from core import song_cache, song_index
+from core import set_inspector_handler as sih
+
+
+def test_parse_indexed_matches_json_and_records_spans():
+    for src in Path("examples/Sets").glob("*.abl"):
+        text = src.read_text()
+        song, index = song_index.parse_indexed(text)
+        assert song == json.loads(text)
+        for ti, track in enumerate(song["tracks"]):
+            for ci, slot in enumerate(track["clipSlots"]):
+                start, end = index.clip_span(ti, ci)
+                assert json.loads(text[start:end]) == slot.get("clip")
+            start, end = index.tracks[ti]["devices"]
+            assert json.loads(text[start:end]) == track["devices"]
+
+
+def test_splice_matches_full_dump():
+    text = json.dumps(json.loads(Path("examples/Sets/automation.abl").read_text()), indent=2)
+    song, index = song_index.parse_indexed(text)
+    clips = {}
+    for ti, track in enumerate(song["tracks"]):
+        for ci, slot in enumerate(track["clipSlots"]):
+            if slot.get("clip"):
+                slot["clip"]["notes"] = slot["clip"].get("notes", [])[:1]
+                clips[(ti, ci)] = slot["clip"]
+    new_text, new_index = song_index.splice(text, index, clips)
+    expected = io.StringIO()
+    json.dump(song, expected, indent=2)
+    assert new_text == expected.getvalue()
+    assert new_index.tracks == song_index.parse_indexed(new_text)[1].tracks
+
+
+def test_compact_and_non_ascii_files(tmp_path):
+    path = tmp_path / "Song.abl"
+    song = {"name": "Säge", "tracks": [{"name": "Ä", "devices": [], "clipSlots": [
+        {"clip": {"name": "é", "notes": []}}, {"clip": None}
+    ]}]}
+    path.write_text(json.dumps(song))
+    song_cache.invalidate_song()
+    song_cache.load_song(str(path))
+
+    assert sih.save_clip(str(path), 0, 0, [{"noteNumber": 60, "startTime": 0.0, "duration": 1.0}],
+                         [], 4.0, 0.0, 4.0)["success"]
+    saved = json.loads(path.read_text())
+    assert saved["tracks"][0]["clipSlots"][0]["clip"]["notes"][0]["noteNumber"] == 60
+    assert saved["name"] == "Säge"
+    assert "\n" not in path.read_text()
+
+
+def test_clip_read_without_full_parse(tmp_path, monkeypatch):
+    src = Path("examples/Sets/automation.abl")
+    path = tmp_path / "Song.abl"
+    path.write_bytes(src.read_bytes())
+    song_cache.invalidate_song()
+    song = song_cache.load_song(str(path))
+    ti, ci = next(
+        (t, c) for t, track in enumerate(song["tracks"])
+        for c, slot in enumerate(track["clipSlots"]) if slot.get("clip")
+    )
+    expected = sih.get_clip_data(str(path), ti, ci)
+
+    # Push the parsed document out of the cache; the index stays
+    monkeypatch.setattr(song_cache, "MAX_SONGS", 1)
+    other = tmp_path / "Other.abl"
+    other.write_text(json.dumps({"tracks": []}))
+    song_cache.load_song(str(other))
+    before = song_cache.cache_info()
+
+    assert sih.get_clip_data(str(path), ti, ci) == expected
+    after = song_cache.cache_info()
+    assert after["misses"] == before["misses"]
+    assert after["partial"] == before["partial"] + 1
@@ -99,7 +99,7 @@ def test_scan_for_synth_presets(monkeypatch, tmp_path):
     monkeypatch.setattr(spih.os, "walk", fake_walk)
     monkeypatch.setattr(spih, "get_cache", lambda k: None)
     captured = {}
-    monkeypatch.setattr(spih, "set_cache", lambda k, v: captured.setdefault("data", v))
+    monkeypatch.setattr(spih, "set_cache", lambda k, v, paths=None: captured.setdefault("data", v))
 
     result = spih.scan_for_synth_presets()
     assert result["success"]
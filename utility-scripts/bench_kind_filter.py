@@ -0,0 +1,82 @@
+"""Benchmark the file browser's preset kind filters.
+
+Compares, for every kind filter over ``examples/Track Presets`` (or a folder
+given on the command line):
+
+* ``full parse`` – ``json.load`` plus ``_has_kind`` for every file, as the
+  browser used to do,
+* ``prefilter`` – only the mmap token search of :func:`_kind_prefilter`,
+* ``cold`` – :func:`_kind_filter` with an empty preset index and cache, and
+* ``warm`` – :func:`_kind_filter` once the index and cache are populated.
+
+Run from the repository root: ``python utility-scripts/bench_kind_filter.py``.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import file_browser  # noqa: E402
+from core.cache_manager import invalidate_cache  # noqa: E402
+from core.preset_index import PresetIndex  # noqa: E402
+
+
+def _timed(func, repeat=5):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best * 1000
+
+
+def main(root="examples/Track Presets"):
+    paths = [
+        os.path.join(dirpath, name)
+        for dirpath, _, names in os.walk(root)
+        for name in names
+        if file_browser._is_preset(name)
+    ]
+    print(f"{len(paths)} presets under {root}")
+    print(f"{'filter':<16}{'matches':>8}{'full parse':>12}{'prefilter':>12}{'cold':>10}{'warm':>10}  (ms)")
+
+    for key, kind in file_browser.KIND_FILTERS.items():
+        def full_parse():
+            found = set()
+            for path in paths:
+                with open(path, "r") as f:
+                    if file_browser._has_kind(json.load(f), kind):
+                        found.add(path)
+            return found
+
+        def prefilter():
+            invalidate_cache(prefix=file_browser._CACHE_PREFIX)
+            return {p for p in paths if file_browser._kind_prefilter(p, kind) is not False}
+
+        expected, full_ms = _timed(full_parse)
+        candidates, pre_ms = _timed(prefilter)
+        assert expected <= candidates
+
+        with tempfile.TemporaryDirectory() as tmp:
+            def cold():
+                invalidate_cache(prefix=file_browser._CACHE_PREFIX)
+                file_browser.preset_index = PresetIndex(os.path.join(tmp, f"{time.perf_counter_ns()}.sqlite3"))
+                matches = file_browser._kind_filter(paths, kind)
+                return {p for p in paths if matches(p)}
+
+            found, cold_ms = _timed(cold)
+            assert found == expected
+            _, warm_ms = _timed(lambda: file_browser._kind_filter(paths, kind))
+            file_browser.preset_index.close()
+
+        print(f"{key:<16}{len(expected):>8}{full_ms:>12.1f}{pre_ms:>12.1f}{cold_ms:>10.1f}{warm_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:])
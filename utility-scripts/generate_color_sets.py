@@ -8,7 +8,6 @@ numerical color IDs displayed on the device.
 
 import argparse
 import os
-import shutil
 import tempfile
 import zipfile
 import sys
@@ -33,17 +32,11 @@ def create_dummy_bundle() -> str:
     Returns:
         Path to the created bundle file.
     """
-    temp_dir = tempfile.mkdtemp()
-    try:
-        song_path = os.path.join(temp_dir, 'Song.abl')
-        shutil.copy(EXAMPLE_SET, song_path)
-        fd, bundle_path = tempfile.mkstemp(suffix='.ablbundle')
-        os.close(fd)
-        with zipfile.ZipFile(bundle_path, 'w') as zf:
-            zf.write(song_path, arcname='Song.abl')
-        return bundle_path
-    finally:
-        shutil.rmtree(temp_dir)
+    fd, bundle_path = tempfile.mkstemp(suffix='.ablbundle')
+    os.close(fd)
+    with zipfile.ZipFile(bundle_path, 'w') as zf:
+        zf.write(EXAMPLE_SET, arcname='Song.abl')
+    return bundle_path
 
 
 def main(start_color: int, end_color: int) -> None: